@@ -0,0 +1,413 @@
+"""
+Capacity test for the Streamlit page.
+
+Starts the app locally, or targets a running instance with --url. It connects N
+simulated brokers over Streamlit's websocket protocol and logs each one in
+through the password gate. Each broker then moves random sidebar sliders and
+number inputs, pausing for a random think time between moves.
+
+For each concurrency level it records:
+- rerun latency: from sending a widget change to the server's script_finished
+- server CPU (% of one core) and resident memory (RSS), sampled from /proc
+- memory per session: the page's own estimate of its session_state plus
+  figures (perf.deep_size, read from the metrics endpoint), and the growth of
+  the server's RSS per connected session
+
+The run ends with a capacity report; --output also saves it as JSON. The
+instrumented server computes payload and session sizes on every rerun, which
+costs a few ms per rerun. --no-metrics turns that off for production-like
+latency, at the price of the per-session estimate.
+
+Requires the websockets package, which is installed with Streamlit's server.
+CPU and RSS sampling need Linux /proc and a server started by this tool.
+
+Usage:
+    python app_load_test.py --users 1,10,50,100 --duration 60
+    python app_load_test.py --url http://staging:8501 --password "$APP_PASSWORD" --users 10,50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stay_vs_go_app.py')
+
+DEFAULT_USERS = (1, 10, 50, 100)
+DEFAULT_RAMP = 10.0
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_PASSWORD = "HHI2026"  # the page's fallback when no password secret is set
+
+# Delta paths start with the root container; 1 is the sidebar
+SIDEBAR = 1
+
+FINISHED_EARLY_FOR_RERUN = 2
+
+
+def _require_websockets():
+    try:
+        import websockets
+    except ImportError:
+        raise ImportError("The load test requires websockets: pip install websockets") from None
+    return websockets
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ServerSampler:
+    """CPU seconds and resident bytes of a local server process, read from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self._page = os.sysconf('SC_PAGE_SIZE')
+
+    def sample(self):
+        """(cpu_seconds, rss_bytes), or None when /proc is unavailable"""
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/statm') as f:
+                resident = int(f.read().split()[1])
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15 of stat; fields[0] here is field 3
+        return (int(fields[11]) + int(fields[12])) / self._ticks, resident * self._page
+
+
+class Widget:
+    """One sidebar input the simulated broker can move"""
+
+    def __init__(self, kind, element):
+        self.kind = kind
+        self.id = element.id
+        self.label = element.label
+        self.integer = element.data_type == 0
+        self.step = element.step or 1
+        if kind == 'slider':
+            self.low, self.high = element.min, element.max
+            self.value = element.default[0]
+        else:
+            self.low = element.min if element.has_min else None
+            self.high = element.max if element.has_max else None
+            self.value = element.default
+
+    def moved(self, rng):
+        """The value after dragging or clicking 1-3 steps either way, within bounds"""
+        value = self.value + rng.choice((-3, -2, -1, 1, 2, 3)) * self.step
+        if self.low is not None:
+            value = max(self.low, value)
+        if self.high is not None:
+            value = min(self.high, value)
+        return int(round(value)) if self.integer else round(value, 10)
+
+
+class Session:
+    """One simulated browser tab on the page"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/').replace('http://', 'ws://').replace('https://', 'wss://') + '/_stcore/stream'
+        self.ws = None
+        self.elements = {}
+        self.values = {}
+
+    async def connect(self):
+        websockets = _require_websockets()
+        self.ws = await websockets.connect(self.url, max_size=None, subprotocols=['streamlit'])
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, triggers=()):
+        """Send the widget values (plus one-shot button triggers) and wait for the page to finish; returns seconds"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        for label, value in self.values.items():
+            kind, element, _ = self.elements.get(label, (None, None, None))
+            if element is None:
+                continue
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = element.id
+            if kind == 'slider':
+                state.double_array_value.data.append(value)
+            elif kind == 'number_input' and element.data_type == 0:
+                state.int_value = int(value)
+            elif kind == 'number_input':
+                state.double_value = value
+            else:
+                state.string_value = value
+        for label in triggers:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = self.elements[label][1].id
+            state.trigger_value = True
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self.ws.recv())
+            kind = reply.WhichOneof('type')
+            if kind == 'new_session':
+                # A script run is starting; collect the widgets it draws
+                self.elements = {}
+            elif kind == 'delta' and reply.delta.WhichOneof('type') == 'new_element':
+                element = reply.delta.new_element
+                element_kind = element.WhichOneof('type')
+                if element_kind in ('slider', 'number_input', 'text_input', 'button'):
+                    widget = getattr(element, element_kind)
+                    self.elements[widget.label] = (element_kind, widget, reply.metadata.delta_path[0])
+            elif kind == 'script_finished' and reply.script_finished != FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start
+
+    async def login(self, password):
+        """Open the page and submit the password; returns seconds until the dashboard is drawn"""
+        await self.rerun()
+        if "Enter Password" not in self.elements:
+            return 0.0
+        self.values["Enter Password"] = password
+        seconds = await self.rerun(triggers=["Login"])
+        del self.values["Enter Password"]
+        if "Enter Password" in self.elements:
+            raise RuntimeError("Login failed - check --password")
+        return seconds
+
+    def sidebar_inputs(self):
+        return [Widget(kind, element) for kind, element, root in self.elements.values()
+                if root == SIDEBAR and kind in ('slider', 'number_input')]
+
+    async def move(self, rng):
+        """Change one random sidebar input and wait for the rerun; returns seconds"""
+        widget = rng.choice(self.sidebar_inputs())
+        widget.value = self.values.get(widget.label, widget.value)
+        self.values[widget.label] = widget.moved(rng)
+        return await self.rerun()
+
+
+async def _broker(url, password, seed, delay, deadline, think, timeout, latencies, logins, errors):
+    rng = random.Random(seed)
+    session = Session(url)
+    try:
+        await asyncio.sleep(delay)
+        await session.connect()
+        logins.append(await asyncio.wait_for(session.login(password), timeout))
+        while True:
+            await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+            if time.monotonic() >= deadline:
+                break
+            latencies.append(await asyncio.wait_for(session.move(rng), timeout))
+    except asyncio.TimeoutError:
+        errors.append(f"No response within {timeout:.0f}s")
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+    finally:
+        await session.close()
+
+
+def fetch_metrics(metrics_url):
+    """The page's perf summary from its /metrics.json endpoint, or None"""
+    if not metrics_url:
+        return None
+    try:
+        with urllib.request.urlopen(metrics_url.rstrip('/') + '/metrics.json', timeout=10) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+
+async def run_level(url, users, duration, think, password, seed=0, ramp=0.0, timeout=DEFAULT_TIMEOUT,
+                    sampler=None, metrics_url=None, baseline_rss=None):
+    """
+    Drive users concurrent sessions for duration seconds after a ramp-up, during which
+    their logins are spread evenly; returns one row of the capacity report. A session
+    whose login or rerun takes longer than timeout counts as an error and stops.
+    """
+    latencies, logins, errors = [], [], []
+    rss_samples = []
+    before = sampler.sample() if sampler else None
+    start = time.monotonic()
+    deadline = start + ramp + duration
+    brokers = asyncio.gather(*(_broker(url, password, seed + i, ramp * i / users, deadline, think, timeout,
+                                       latencies, logins, errors) for i in range(users)))
+    while not brokers.done():
+        if sampler:
+            sample = sampler.sample()
+            if sample:
+                rss_samples.append(sample[1])
+        await asyncio.wait([brokers], timeout=1.0)
+    await brokers
+    elapsed = time.monotonic() - start
+    after = sampler.sample() if sampler else None
+
+    row = {
+        'users': users,
+        'reruns': len(latencies),
+        'reruns_per_second': round(len(latencies) / elapsed, 2),
+        'errors': len(errors),
+        'p50_ms': None, 'p95_ms': None, 'p99_ms': None,
+        'login_p50_ms': round(float(np.median(logins)) * 1000, 1) if logins else None,
+        'cpu_percent': None, 'rss_mb': None, 'rss_per_session_mb': None, 'session_kb': None,
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        row.update(p50_ms=round(float(p50), 1), p95_ms=round(float(p95), 1), p99_ms=round(float(p99), 1))
+    if before and after:
+        row['cpu_percent'] = round((after[0] - before[0]) / elapsed * 100, 1)
+    if rss_samples:
+        peak = max(rss_samples)
+        row['rss_mb'] = round(peak / 1e6, 1)
+        if baseline_rss:
+            row['rss_per_session_mb'] = round((peak - baseline_rss) / users / 1e6, 2)
+    metrics = fetch_metrics(metrics_url)
+    if metrics and metrics.get('session_bytes', {}).get('count'):
+        row['session_kb'] = round(metrics['session_bytes']['p50'] / 1000, 1)
+    if errors:
+        row['first_error'] = errors[0]
+    return row
+
+
+def start_server(port, metrics_port=None):
+    """Run the page with `streamlit run` on port; returns the process once it answers health checks"""
+    env = dict(os.environ, HHI_SCENARIO_DB=os.environ.get('HHI_SCENARIO_DB', ':memory:'))
+    if metrics_port:
+        env['HHI_PERF_PORT'] = str(metrics_port)
+    # The server logs every rerun's warnings; a file (unlike an unread pipe) never fills up and blocks it
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f"Streamlit exited: {log.read().decode(errors='replace')[-500:]}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=2) as response:
+                if response.read().strip() == b'ok':
+                    return process
+        except OSError:
+            time.sleep(0.25)
+    process.kill()
+    raise RuntimeError("Streamlit did not become healthy within 60s")
+
+
+async def run_load_test(url, levels, duration, think, password, seed=0, ramp=DEFAULT_RAMP, timeout=DEFAULT_TIMEOUT,
+                        sampler=None, metrics_url=None):
+    """Warm the server with one session, then run each concurrency level in turn"""
+    await run_level(url, 1, 0, think, password, seed, timeout=timeout)
+    baseline = sampler.sample() if sampler else None
+    report = []
+    for users in levels:
+        row = await run_level(url, users, duration, think, password, seed, ramp, timeout, sampler, metrics_url,
+                              baseline_rss=baseline[1] if baseline else None)
+        print(_format_row(row), flush=True)
+        report.append(row)
+    return report
+
+
+def capacity(report, target_p95_ms):
+    """Largest level whose p95 latency met the target without errors, or 0"""
+    passing = [row['users'] for row in report
+               if not row['errors'] and row['p95_ms'] is not None and row['p95_ms'] <= target_p95_ms]
+    return max(passing, default=0)
+
+
+COLUMNS = (('users', 'users'), ('reruns', 'reruns'), ('reruns_per_second', 'reruns/s'), ('p50_ms', 'p50 ms'),
+           ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'), ('login_p50_ms', 'login ms'), ('cpu_percent', 'CPU %'),
+           ('rss_mb', 'RSS MB'), ('rss_per_session_mb', 'MB/session'), ('session_kb', 'state KB'),
+           ('errors', 'errors'))
+
+
+def _format_row(row):
+    return '  '.join(f"{'-' if row.get(key) is None else row[key]:>{max(len(title), 6)}}" for key, title in COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capacity test: N simulated brokers on the Streamlit page")
+    parser.add_argument('--users', default=','.join(map(str, DEFAULT_USERS)),
+                        help="Comma-separated concurrency levels (default 1,10,50,100)")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds per level (default 60)")
+    parser.add_argument('--think', type=float, default=2.0,
+                        help="Mean seconds between a broker's input changes (default 2)")
+    parser.add_argument('--ramp', type=float, default=DEFAULT_RAMP,
+                        help="Seconds over which each level's logins are spread (default 10)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds a rerun may take before its session counts as an error (default 30)")
+    parser.add_argument('--url', help="Test a running instance instead of starting one (no CPU/RSS sampling)")
+    parser.add_argument('--metrics-url', help="The instance's HHI_PERF_PORT endpoint, with --url")
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--no-metrics', action='store_true',
+                        help="Start the app without per-rerun size metrics (no per-session memory estimate)")
+    parser.add_argument('--target-p95', type=float, default=1000.0,
+                        help="Rerun p95 in ms a level must meet to count as served (default 1000)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(n) for n in args.users.split(',')]
+    except ValueError:
+        parser.error("--users must be comma-separated integers")
+    if any(n < 1 for n in levels) or args.duration <= 0 or args.timeout <= 0 or args.think < 0 or args.ramp < 0:
+        parser.error("--users, --duration and --timeout must be positive, --think and --ramp non-negative")
+    try:
+        _require_websockets()
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    process = sampler = None
+    url, metrics_url = args.url, args.metrics_url
+    if url is None:
+        port = _free_port()
+        metrics_port = None if args.no_metrics else _free_port()
+        process = start_server(port, metrics_port)
+        url = f'http://127.0.0.1:{port}'
+        metrics_url = metrics_port and f'http://127.0.0.1:{metrics_port}'
+        sampler = ServerSampler(process.pid)
+        if sampler.sample() is None:
+            sampler = None
+
+    print(f"{len(levels)} levels x {args.duration:.0f}s (+{args.ramp:.0f}s ramp-up) against {url}, "
+          f"think time {args.think}s")
+    print('  '.join(f"{title:>{max(len(title), 6)}}" for _, title in COLUMNS))
+    try:
+        report = asyncio.run(run_load_test(url, levels, args.duration, args.think, args.password, args.seed,
+                                           args.ramp, args.timeout, sampler, metrics_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    served = capacity(report, args.target_p95)
+    print(f"Capacity: {served} concurrent users with rerun p95 <= {args.target_p95:.0f}ms and no errors"
+          + (" (the largest level tested)" if served and served == max(levels) else ""))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'url': url, 'duration_s': args.duration,
+                       'think_s': args.think, 'target_p95_ms': args.target_p95, 'capacity_users': served,
+                       'levels': report}, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
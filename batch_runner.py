@@ -0,0 +1,185 @@
+"""
+Headless portfolio batch runner.
+
+Reads a CSV or Parquet file with one row per lease decision, prices it in
+fixed-size chunks through the vectorized engine and streams the results to CSV
+or Parquet, so memory stays flat regardless of file size.
+
+Input columns mirror the sidebar (see lease_engine.SCENARIO_FIELDS); missing
+columns or blank cells fall back to the sidebar defaults. Any other columns
+(e.g. a lease or tenant ID) are copied through to the output.
+
+Usage:
+    python batch_runner.py portfolio.csv results.parquet --chunk-size 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import lease_engine
+import lease_metrics
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+RESULT_COLUMNS = ('renewal_npv', 'relocation_npv', 'npv_savings', 'breakeven_month', 'upfront_investment',
+                  'renewal_ner', 'relocation_ner')
+METRIC_COLUMNS = ('incremental_irr', 'discounted_payback_month')
+
+
+def _file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"Unsupported file type '{ext}' - use .csv or .parquet")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet support requires pyarrow: pip install pyarrow") from None
+    return pyarrow, pyarrow.parquet
+
+
+def _parse_flag(series):
+    """Read industrial_mode from bools, 0/1 or true/false/yes/no text"""
+    if series.dtype == bool:
+        return series
+    text = series.astype(str).str.strip().str.lower()
+    return text.isin(('true', '1', '1.0', 'yes', 'y'))
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows"""
+    if _file_format(path) == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        _, pq = _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def frame_inputs(frame):
+    """Engine inputs from the scenario columns of a DataFrame (blank cells take the sidebar defaults)"""
+    inputs = {}
+    for name, default in lease_engine.SCENARIO_DEFAULTS.items():
+        if name not in frame:
+            continue
+        column = frame[name]
+        if name == 'industrial_mode':
+            inputs[name] = _parse_flag(column.fillna(default)).to_numpy()
+        else:
+            inputs[name] = pd.to_numeric(column, errors='raise').fillna(default).to_numpy()
+    if not inputs:
+        raise ValueError("Input has none of the scenario columns: " + ', '.join(lease_engine.SCENARIO_FIELDS))
+    return inputs
+
+
+def evaluate_frame(frame):
+    """Price every row of a DataFrame; returns passthrough columns plus result columns"""
+    passthrough = [c for c in frame.columns if c not in lease_engine.SCENARIO_DEFAULTS]
+    if frame.empty:
+        output = frame[passthrough].reset_index(drop=True)
+        for name in RESULT_COLUMNS + METRIC_COLUMNS:
+            output[name] = pd.Series(dtype=np.float64)
+        return output
+    inputs = frame_inputs(frame)
+    results = lease_engine.evaluate_scenarios(**inputs)
+    batch = lease_engine.broadcast_inputs(inputs)
+    metrics = lease_metrics.decision_metrics(results['renewal_costs'], results['relocation_costs'],
+                                             batch['discount_rate'], batch['lease_term'])
+    output = frame[passthrough].reset_index(drop=True)
+    for name in RESULT_COLUMNS:
+        output[name] = results[name]
+    for name in METRIC_COLUMNS:
+        output[name] = metrics[name]
+    return output
+
+
+def _parquet_table(pa, output, schema=None):
+    """
+    Arrow table for one output chunk. Later chunks are converted to the first chunk's schema,
+    since a passthrough column's inferred type can differ from chunk to chunk.
+    """
+    if schema is not None:
+        try:
+            return pa.Table.from_pandas(output, schema=schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Column types differ from the first chunk ({e}); a larger --chunk-size "
+                             "lets the first chunk see more of each column") from None
+    table = pa.Table.from_pandas(output, preserve_index=False)
+    # A passthrough column blank throughout the first chunk (e.g. notes) is written as text
+    blank = {name for name in output.columns
+             if name not in RESULT_COLUMNS + METRIC_COLUMNS and output[name].isna().all()}
+    if blank:
+        schema = pa.schema([pa.field(f.name, pa.string()) if f.name in blank else f for f in table.schema],
+                           metadata=table.schema.metadata)
+        table = pa.Table.from_pandas(output, schema=schema, preserve_index=False)
+    return table
+
+
+def run_batch(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream input_path through the engine into output_path; returns (rows, seconds)"""
+    output_format = _file_format(output_path)
+    rows = 0
+    written = False
+    writer = None
+    start = time.perf_counter()
+
+    def write(output):
+        nonlocal writer
+        if output_format == 'csv':
+            output.to_csv(output_path, mode='a' if written else 'w', header=not written, index=False)
+        else:
+            pa, pq = _require_pyarrow()
+            table = _parquet_table(pa, output, writer.schema if writer is not None else None)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            output = evaluate_frame(chunk)
+            write(output)
+            written = True
+            rows += len(output)
+        if not written:
+            # No rows at all: still leave a file with the result columns
+            write(evaluate_frame(pd.DataFrame()))
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price a portfolio of Stay vs. Go lease decisions")
+    parser.add_argument('input', help="CSV or Parquet file, one row per lease decision")
+    parser.add_argument('output', help="CSV or Parquet file for per-row results")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows priced per chunk (default {DEFAULT_CHUNK_SIZE:,})")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    try:
+        rows, seconds = run_batch(args.input, args.output, args.chunk_size)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f"Priced {rows:,} leases in {seconds:.2f}s ({rate:,.0f} rows/s) -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""
+Benchmark suite for the Stay vs. Go engine and the Streamlit page.
+
+Covers:
+  - micro benchmarks of calculate_annual_costs, calculate_npv,
+    calculate_friction_cost and find_breakeven for terms 1-20
+  - batch throughput of evaluate_scenarios at 1k, 100k and 1M scenarios
+  - full-page rerun latency under Streamlit's headless AppTest harness,
+    office and industrial mode, and time from script start to the first KPI metric
+  - cold-start import cost of the engine and of the chart libraries in a fresh
+    interpreter
+  - percentile lookups in a 300k-row lease comps index
+  - a golden-value check that the engine (and the page) still produce the
+    reference numbers in golden.json
+
+Each timing is the fastest of its repeats, since noise only ever adds time,
+and its noise is how far the median repeat sits above that. Results are written
+to JSON and compared with baseline.json; a benchmark fails the run when it is
+slower than baseline by more than --threshold, or by more than twice its noise
+if that is larger, and by more than --min-delta in absolute terms (microsecond
+jitter doesn't count).
+
+Usage:
+    python benchmarks/run_benchmarks.py                  # full run + compare
+    python benchmarks/run_benchmarks.py --quick          # skip 1M batch, fewer repeats
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import lease_comps  # noqa: E402
+import lease_engine  # noqa: E402
+
+APP_PATH = os.path.join(REPO_DIR, 'stay_vs_go_app.py')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+GOLDEN_PATH = os.path.join(BENCH_DIR, 'golden.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+MICRO_TERMS = (1, 5, 10, 20)
+
+# Slowdowns smaller than this are scheduler/cache jitter, whatever the ratio
+MIN_REGRESSION_SECONDS = 10e-6
+# A benchmark may slow down by this many times its measured noise before failing
+NOISE_SCALE = 2.0
+BATCH_SIZES = (1_000, 100_000, 1_000_000)
+BATCH_CHUNK = 100_000
+COMPS_ROWS = 300_000
+
+GOLDEN_FIELDS = ('renewal_npv', 'relocation_npv', 'npv_savings', 'breakeven_month', 'upfront_investment')
+
+# Reference scenarios - values in golden.json were produced by the original per-year loops
+# (breakeven months regenerated after the crossover-year fix, which moved them 12 months later)
+GOLDEN_SCENARIOS = {
+    'default_office': {},
+    'office_friction_and_drivers': {
+        'productivity_loss_hours': 8, 'headcount': 50, 'avg_salary': 150000, 'attrition_rate': 5.0,
+        'open_roles_per_year': 10, 'revenue_per_employee': 300000, 'hiring_speed_boost': 20,
+        'commute_time_saved': 30,
+    },
+    'industrial_no_breakeven': {
+        'industrial_mode': True, 'current_sf': 100000, 'target_sf': 100000,
+        'renewal_base_rent': 12.0, 'renewal_free_rent': 0, 'renewal_ti': 0.0,
+        'new_base_rent': 10.0, 'new_free_rent': 3, 'new_ti': 5.0,
+        'daily_revenue_loss': 100000, 'machinery_rigging': 20.0, 'moving_costs_psf': 5.0,
+    },
+    'industrial_breakeven': {
+        'industrial_mode': True, 'current_sf': 100000, 'target_sf': 100000,
+        'renewal_base_rent': 12.0, 'renewal_free_rent': 0, 'renewal_ti': 0.0,
+        'new_base_rent': 9.0, 'new_free_rent': 3, 'new_ti': 5.0,
+        'daily_revenue_loss': 50000, 'machinery_rigging': 5.0, 'moving_costs_psf': 5.0,
+    },
+    'free_rent_spillover': {'new_free_rent': 18, 'renewal_free_rent': 14, 'new_ti': 10.0},
+    'year_five_breakeven': {'new_ti': 5.0, 'moving_costs_psf': 40.0, 'new_base_rent': 28.0},
+    'year_seven_breakeven': {'new_ti': 5.0, 'moving_costs_psf': 60.0, 'new_base_rent': 25.0, 'new_free_rent': 0},
+    'never_breaks_even': {'new_base_rent': 40.0, 'new_ti': 0.0, 'new_free_rent': 0},
+    'one_year_term': {'lease_term': 1, 'discount_rate': 0.0},
+    'twenty_year_term': {'lease_term': 20, 'escalation_rate': 4.5, 'discount_rate': 12.5,
+                         'current_sf': 35000, 'target_sf': 28000},
+}
+
+
+def best_of(samples):
+    """(fastest sample, noise): noise is the median's excess over the fastest, as a fraction"""
+    best = min(samples)
+    return best, (statistics.median(samples) / best - 1) if best > 0 else 0.0
+
+
+def time_call(func, repeats=7, min_time=0.05):
+    """(seconds per call, noise) over repeats, auto-scaling the loop count like timeit"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return best_of(samples)
+
+
+def micro_benchmarks(repeats):
+    """Single-scenario cost of each engine function at several lease terms"""
+    results = {}
+    friction_args = (False, 50.0, 150000.0, 8.0, 0.0, 0.0, 20000.0)
+    results['calculate_friction_cost'] = time_call(
+        lambda: lease_engine.calculate_friction_cost(*friction_args), repeats)
+
+    for term in MICRO_TERMS:
+        args = (30.0, 6, 60.0, 20000.0, term, 3.0)
+        results[f'calculate_annual_costs[term={term}]'] = time_call(
+            lambda: lease_engine.calculate_annual_costs(*args), repeats)
+
+        costs = lease_engine.calculate_annual_costs(*args)
+        results[f'calculate_npv[term={term}]'] = time_call(
+            lambda: lease_engine.calculate_npv(costs, 7.0), repeats)
+
+        renewal = lease_engine.calculate_annual_costs(35.0, 2, 5.0, 20000.0, term, 3.0)
+        relocation = costs.copy()
+        relocation[:, 0] += 900000.0
+        results[f'find_breakeven[term={term}]'] = time_call(
+            lambda: lease_engine.find_breakeven(renewal, relocation, term), repeats)
+
+        results[f'evaluate_scenarios[n=1,term={term}]'] = time_call(
+            lambda: lease_engine.evaluate_scenarios(lease_term=term), repeats)
+    return results
+
+
+def random_batch(n, seed=0):
+    """Reproducible batch of plausible lease variants"""
+    rng = np.random.default_rng(seed)
+    return {
+        'lease_term': rng.integers(1, 21, n),
+        'discount_rate': rng.choice(np.arange(0, 15.5, 0.5), n),
+        'escalation_rate': rng.choice(np.arange(0, 5.25, 0.25), n),
+        'renewal_base_rent': rng.uniform(15, 50, n),
+        'renewal_free_rent': rng.integers(0, 25, n),
+        'new_base_rent': rng.uniform(15, 50, n),
+        'new_free_rent': rng.integers(0, 25, n),
+        'new_ti': rng.uniform(0, 100, n),
+        'moving_costs_psf': rng.uniform(0, 40, n),
+        'industrial_mode': rng.random(n) < 0.3,
+        'headcount': rng.integers(1, 300, n),
+        'avg_salary': rng.uniform(0, 200000, n),
+        'daily_revenue_loss': rng.uniform(0, 200000, n),
+    }
+
+
+def batch_benchmarks(sizes, repeats):
+    """Seconds per full batch (1M runs in 100k chunks to bound memory)"""
+    results = {}
+    for n in sizes:
+        chunk = min(n, BATCH_CHUNK)
+        inputs = random_batch(chunk)
+
+        def run():
+            for _ in range(n // chunk):
+                lease_engine.evaluate_scenarios(**inputs)
+
+        results[f'evaluate_scenarios[n={n}]'] = time_call(run, repeats=max(1, repeats if n < 1_000_000 else 3))
+    return results
+
+
+# Runs in a fresh interpreter: what a new container pays after streamlit itself is loaded.
+# streamlit already imports plotly.graph_objects, so of the chart libraries only pandas is
+# deferred; the first figure is timed on its own (plotly builds its validators on first use)
+COLD_START_SCRIPT = """
+import time
+import streamlit
+start = time.perf_counter()
+import numpy, dependency_graph, lease_engine, lease_metrics, monthly_engine, result_cache
+engine = time.perf_counter() - start
+start = time.perf_counter()
+import pandas
+charts = time.perf_counter() - start
+import plotly.graph_objects as go
+start = time.perf_counter()
+go.Figure(go.Scatter(x=[1], y=[1]))
+figure = time.perf_counter() - start
+print(engine, charts, figure)
+"""
+
+
+def comps_benchmarks(repeats):
+    """Sidebar comps lookups against a synthetic index built in a temp directory"""
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    submarkets = np.array(['Airport', 'Downtown', 'Midtown', 'Suburban', 'Uptown'])
+    classes = np.array(['A', 'B', 'C'])
+    comps = pd.DataFrame({
+        'submarket': submarkets[rng.integers(0, len(submarkets), COMPS_ROWS)],
+        'property_class': classes[rng.integers(0, len(classes), COMPS_ROWS)],
+        'sf': np.exp(rng.uniform(np.log(1_000), np.log(300_000), COMPS_ROWS)).round(-2),
+        'base_rent': rng.normal(35.0, 6.0, COMPS_ROWS).round(2),
+        'free_months': rng.integers(0, 13, COMPS_ROWS),
+        'ti': rng.uniform(0.0, 100.0, COMPS_ROWS).round(1),
+        'lease_date': pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 3650, COMPS_ROWS), 'D'),
+    })
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'comps.csv')
+        comps.to_csv(source, index=False)
+        index = lease_comps.build_index(source, os.path.join(tmp, 'index'))
+        since = index.latest_date - np.timedelta64(3 * 365, 'D')
+        results['comps_lookup'] = time_call(lambda: index.lookup('Midtown', 'A', 20000), repeats)
+        results['comps_lookup[since=3y]'] = time_call(lambda: index.lookup('Midtown', 'A', 20000, since=since), repeats)
+    return results
+
+
+def cold_start_benchmarks(repeats):
+    """Import cost of the engine modules and of pandas, and the first Plotly figure, in a fresh interpreter"""
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append([float(x) for x in out.split()])
+    return {
+        'cold_import[engine]': best_of([s[0] for s in samples]),
+        'cold_import[pandas]': best_of([s[1] for s in samples]),
+        'cold_first_figure': best_of([s[2] for s in samples]),
+    }
+
+
+def _app_test():
+    from streamlit.testing.v1 import AppTest
+    # Keep saved results from earlier runs (or a real deployment) out of the timings
+    os.environ.setdefault('HHI_SCENARIO_DB', ':memory:')
+    at = AppTest.from_file(APP_PATH, default_timeout=300)
+    at.session_state['authenticated'] = True
+    return at
+
+
+def _toggle(at, label):
+    return next(t for t in at.toggle if label in t.label)
+
+
+def _slider(at, label):
+    return next(s for s in at.slider if s.label.startswith(label))
+
+
+def _span_seconds(at, name):
+    """A span from the performance panel's table for the last run"""
+    spans = next(df.value for df in at.dataframe if 'Span' in df.value.columns)
+    return float(spans.loc[spans['Span'] == name, 'Milliseconds'].iloc[0]) / 1000
+
+
+def first_metric_benchmarks(repeats):
+    """Time from script start until the headline KPIs are sent, for a new session"""
+    results = {}
+    for mode in ('office', 'industrial'):
+        samples = []
+        for _ in range(repeats):
+            at = _app_test()
+            at.query_params['perf'] = '1'
+            if mode == 'industrial':
+                at.run()
+                _toggle(at, 'Industrial Mode').set_value(True)
+            at.run()
+            samples.append(_span_seconds(at, 'first_metric'))
+        results[f'app_time_to_first_metric[{mode}]'] = best_of(samples)
+    return results
+
+
+def app_benchmarks(repeats):
+    """Full-script rerun latency: unchanged rerun and rerun after a sidebar change"""
+    results = {}
+    for mode in ('office', 'industrial'):
+        samples = []
+        for _ in range(repeats):
+            at = _app_test()
+            start = time.perf_counter()
+            at.run()
+            if mode == 'industrial':
+                _toggle(at, 'Industrial Mode').set_value(True).run()
+            samples.append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(f"App raised in {mode} mode: {at.exception}")
+        results[f'app_first_run[{mode}]'] = best_of(samples)
+
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - start)
+        results[f'app_rerun_unchanged[{mode}]'] = best_of(samples)
+
+        samples = []
+        for i in range(repeats):
+            slider = _slider(at, 'Discount Rate')
+            start = time.perf_counter()
+            slider.set_value(5.0 + 0.5 * (i % 10)).run()
+            samples.append(time.perf_counter() - start)
+        results[f'app_rerun_changed_input[{mode}]'] = best_of(samples)
+    return results
+
+
+# Page sections that rebuild when the escalation slider moves
+DRAG_SECTIONS = ('calculations', 'waterfall', 'cumulative', 'year1', 'comparison_table')
+
+
+def slider_drag_benchmarks(repeats, pause=0.2):
+    """Time in the sections a slider step rebuilds, pausing between steps like a user (and the speculative precompute)"""
+    at = _app_test()
+    at.query_params['perf'] = '1'
+    at.run()
+    samples = []
+    for i in range(max(repeats, 5)):
+        time.sleep(pause)
+        _slider(at, 'Annual Rent Escalation').set_value(3.0 + 0.25 * (i + 1)).run()
+        samples.append(sum(_span_seconds(at, name) for name in DRAG_SECTIONS))
+    return {'app_slider_drag[sections]': best_of(samples)}
+
+
+def golden_results():
+    """Engine outputs for every golden scenario"""
+    values = {}
+    for name, inputs in GOLDEN_SCENARIOS.items():
+        results = lease_engine.evaluate_scenarios(**inputs)
+        values[name] = {field: (None if np.isnan(results[field][0]) else float(results[field][0]))
+                        for field in GOLDEN_FIELDS}
+    return values
+
+
+def check_golden(include_app):
+    """Compare engine (and optionally page) output to golden.json; returns a list of failures"""
+    with open(GOLDEN_PATH) as f:
+        golden = json.load(f)
+
+    failures = []
+    current = golden_results()
+    for name, expected in golden['scenarios'].items():
+        for field, value in expected.items():
+            actual = current[name][field]
+            if value is None or actual is None:
+                ok = value is None and actual is None
+            else:
+                ok = np.isclose(actual, value, rtol=1e-9, atol=1e-6)
+            if not ok:
+                failures.append(f"{name}.{field}: expected {value}, got {actual}")
+
+    if include_app:
+        at = _app_test()
+        at.run()
+        metrics = {m.label: m.value for m in at.metric}
+        for label, value in golden['app_default_metrics'].items():
+            if metrics.get(label) != value:
+                failures.append(f"app metric '{label}': expected {value}, got {metrics.get(label)}")
+    return failures
+
+
+def compare(current, baseline, threshold, min_delta=MIN_REGRESSION_SECONDS, noise=None):
+    """Rows of (name, baseline, current, ratio, regressed)"""
+    noise = noise or {}
+    rows = []
+    for name, seconds in sorted(current.items()):
+        base = baseline.get(name)
+        ratio = seconds / base if base else None
+        allowed = max(threshold, NOISE_SCALE * noise.get(name, 0.0))
+        regressed = ratio is not None and ratio > 1 + allowed and seconds - base > min_delta
+        rows.append((name, base, seconds, ratio, regressed))
+    return rows
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:,.1f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:,.2f}ms'
+    return f'{seconds:,.2f}s'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Stay vs. Go benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="Skip the 1M batch and use fewer repeats")
+    parser.add_argument('--skip-app', action='store_true', help="Skip the Streamlit AppTest benchmarks")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown vs. baseline before failing (0.25 = 25%%)")
+    parser.add_argument('--min-delta', type=float, default=MIN_REGRESSION_SECONDS,
+                        help="Ignore slowdowns smaller than this many seconds (default %(default)g)")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with this run")
+    parser.add_argument('--write-golden', action='store_true',
+                        help="Regenerate golden.json from the current engine (only after verifying the numbers)")
+    args = parser.parse_args(argv)
+
+    if args.write_golden:
+        at = _app_test()
+        at.run()
+        golden = {
+            'scenarios': golden_results(),
+            'app_default_metrics': {m.label: m.value for m in at.metric[:3]},
+        }
+        with open(GOLDEN_PATH, 'w') as f:
+            json.dump(golden, f, indent=2)
+        print(f"Wrote {GOLDEN_PATH}")
+        return 0
+
+    failures = check_golden(include_app=not args.skip_app)
+    if failures:
+        print("Golden-value check FAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("Golden-value check passed")
+
+    repeats = 3 if args.quick else 7
+    sizes = [n for n in BATCH_SIZES if not (args.quick and n >= 1_000_000)]
+    measured = {}
+    measured.update(micro_benchmarks(repeats))
+    measured.update(batch_benchmarks(sizes, repeats))
+    measured.update(cold_start_benchmarks(repeats))
+    measured.update(comps_benchmarks(repeats))
+    if not args.skip_app:
+        measured.update(app_benchmarks(repeats))
+        measured.update(first_metric_benchmarks(repeats))
+        measured.update(slider_drag_benchmarks(repeats))
+    timings = {name: seconds for name, (seconds, _) in measured.items()}
+    noise = {name: round(spread, 4) for name, (_, spread) in measured.items()}
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'timings': timings,
+        'noise': noise,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    baseline, baseline_noise = {}, {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline, baseline_noise = saved['timings'], saved.get('noise', {})
+
+    # Whichever run was noisier sets the allowance
+    noise = {name: max(spread, baseline_noise.get(name, 0.0)) for name, spread in noise.items()}
+    rows = compare(timings, baseline, args.threshold, args.min_delta, noise)
+    width = max(len(name) for name, *_ in rows)
+    print(f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'ratio':>6}")
+    for name, base, seconds, ratio, regressed in rows:
+        ratio_text = f'{ratio:.2f}' if ratio is not None else '-'
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<{width}}  {_format_seconds(base):>10}  {_format_seconds(seconds):>10}  {ratio_text:>6}{flag}")
+    print(f"Results written to {args.output}")
+
+    regressions = [name for name, *_, regressed in rows if regressed]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%} (or twice their noise)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
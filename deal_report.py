@@ -0,0 +1,288 @@
+"""
+Derived values, figures and tables for one deal, shared by the page and the report exporter.
+
+Each function is a dependency-graph node: its parameter names are sidebar inputs
+or engine results (one-row arrays). page_graph() extends the engine graph with
+them, so the page and report_export.py build identical charts and tables from
+the same inputs.
+
+pandas and plotly are imported inside the builders, not at module level. The page
+builds this graph before its first metric and only loads the chart libraries
+after it.
+"""
+
+import numpy as np
+
+import lease_engine
+import lease_metrics
+import monthly_engine
+
+
+def waterfall_values(renewal_costs, relocation_costs, lease_term, renewal_base_rent, new_base_rent,
+                     current_sf, target_sf, escalation_rate, renewal_ti, new_ti,
+                     recruiting_benefit, commute_benefit, friction_cost, moving_cost):
+    """Annual annuity waterfall bars from Stay to Go"""
+    lease_term = int(lease_term[0])
+    renewal_base_rent, new_base_rent = float(renewal_base_rent[0]), float(new_base_rent[0])
+    current_sf, target_sf = float(current_sf[0]), float(target_sf[0])
+    escalation_rate, renewal_ti, new_ti = float(escalation_rate[0]), float(renewal_ti[0]), float(new_ti[0])
+
+    # Calculate average annual costs (already includes all strategic drivers and costs)
+    avg_stay_cost = sum(renewal_costs[0]) / lease_term
+    avg_go_cost = sum(relocation_costs[0]) / lease_term
+
+    # FIX 2: Calculate average annual base rent (base_rent is already annual $/PSF, remove * 12)
+    stay_base_rent_total = 0
+    go_base_rent_total = 0
+    for year in range(lease_term):
+        # Stay scenario base rent with escalation (base_rent is annual)
+        stay_rent_this_year = renewal_base_rent * current_sf * ((1 + escalation_rate/100) ** year)
+        stay_base_rent_total += stay_rent_this_year
+
+        # Go scenario base rent with escalation (base_rent is annual)
+        go_rent_this_year = new_base_rent * target_sf * ((1 + escalation_rate/100) ** year)
+        go_base_rent_total += go_rent_this_year
+
+    avg_stay_base_rent = stay_base_rent_total / lease_term
+    avg_go_base_rent = go_base_rent_total / lease_term
+
+    # FIX 4: Calculate average annual TI benefit (annualized over lease term)
+    avg_ti_stay = (renewal_ti * current_sf) / lease_term
+    avg_ti_go = (new_ti * target_sf) / lease_term
+
+    # Build waterfall showing how we get from Stay to Go
+    # The math: avg_stay_cost + deltas = avg_go_cost
+    rent_delta = avg_go_base_rent - avg_stay_base_rent  # Positive = Go costs more
+    ti_delta = -(avg_ti_go - avg_ti_stay)  # Negative = Go gets more benefit (annualized)
+    strategic_benefit_delta = -float(recruiting_benefit[0] + commute_benefit[0])  # Negative = Go gets benefit
+    amortized_friction_delta = float(friction_cost[0] + moving_cost[0]) / lease_term  # Positive = Go pays more
+    # Note: turnover_risk cancels out (both scenarios pay it)
+
+    return [
+        avg_stay_cost,              # Starting point
+        rent_delta,                 # Rent difference (positive if Go is more expensive)
+        ti_delta,                   # TI benefit difference (negative if Go gets more)
+        strategic_benefit_delta,    # Strategic benefits (negative = savings)
+        amortized_friction_delta,   # One-time costs amortized (positive = cost)
+        avg_go_cost                 # Ending point (TOTAL)
+    ]
+
+
+def build_waterfall_figure(waterfall_values, lease_term):
+    """Annual annuity waterfall from Stay to Go"""
+    import plotly.graph_objects as go
+
+    waterfall_labels = [
+        "Stay Cost",
+        "Rent Δ",
+        "TI Benefit Δ",
+        "Strategic Benefits",
+        "Amortized Friction",
+        "Go Cost"
+    ]
+
+    waterfall_text = [f"${v:,.0f}" for v in waterfall_values]
+
+    # Set measure types: first is absolute, middle are relative, last is total
+    waterfall_measures = ["absolute", "relative", "relative", "relative", "relative", "total"]
+
+    fig_waterfall = go.Figure(go.Waterfall(
+        x=waterfall_labels,
+        y=waterfall_values,
+        measure=waterfall_measures,  # FIX 1: Last bar is now "total" so it anchors to x-axis
+        text=waterfall_text,
+        textposition="outside",
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        decreasing={"marker": {"color": "#2ca02c"}},
+        increasing={"marker": {"color": "#d62728"}},
+        totals={"marker": {"color": "#1f77b4"}}
+    ))
+
+    fig_waterfall.update_layout(
+        title=f"Average Annual Cost Breakdown ({int(lease_term[0])}-Year Annuity)",
+        yaxis_title="Annual Cost ($)",
+        height=500,
+        showlegend=False
+    )
+
+    return fig_waterfall
+
+
+def cumulative_figure(x_values, stay_line, go_line, line_mode, breakeven_month, lease_term):
+    """Cumulative Stay vs. Go cost lines with the breakeven marker"""
+    import plotly.graph_objects as go
+
+    import payloads
+
+    breakeven_month = float(breakeven_month[0])
+    lease_term = int(lease_term[0])
+
+    fig_cumulative = go.Figure()
+
+    fig_cumulative.add_trace(go.Scatter(
+        x=x_values,
+        y=stay_line,
+        name="Stay (Renewal)",
+        mode=line_mode,
+        line=dict(color='#1f77b4', width=3),
+        marker=dict(size=8)
+    ))
+
+    fig_cumulative.add_trace(go.Scatter(
+        x=x_values,
+        y=go_line,
+        name="Go (Relocate)",
+        mode=line_mode,
+        line=dict(color='#ff7f0e', width=3),
+        marker=dict(size=8)
+    ))
+
+    if breakeven_month and breakeven_month <= (lease_term * 12):
+        breakeven_year = breakeven_month / 12
+        breakeven_cost = np.interp(breakeven_year, x_values, stay_line)
+        fig_cumulative.add_trace(go.Scatter(
+            x=[breakeven_year],
+            y=[breakeven_cost],
+            mode='markers+text',
+            name='Breakeven',
+            marker=dict(size=15, color='green', symbol='star'),
+            text=['Breakeven'],
+            textposition='top center'
+        ))
+
+    fig_cumulative.update_layout(
+        xaxis_title="Year",
+        yaxis_title="Cumulative Cost ($)",
+        hovermode='x unified',
+        height=500,
+        showlegend=True
+    )
+
+    fig_cumulative.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#e5e5e5')
+    fig_cumulative.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#e5e5e5')
+
+    return payloads.compact_figure(fig_cumulative, {'y': 0})
+
+
+def build_cumulative_figure(renewal_cumulative, relocation_cumulative, breakeven_month, lease_term):
+    """Year-end cumulative lines"""
+    years = list(range(1, int(lease_term[0]) + 1))
+    return cumulative_figure(years, renewal_cumulative[0], relocation_cumulative[0], 'lines+markers',
+                             breakeven_month, lease_term)
+
+
+def build_monthly_cumulative_figure(renewal_monthly, relocation_monthly, breakeven_month, lease_term):
+    """Month-by-month cumulative lines from move-in (month 0)"""
+    x_values = np.arange(renewal_monthly.shape[1]) / 12
+    return cumulative_figure(x_values, np.cumsum(renewal_monthly[0]), np.cumsum(relocation_monthly[0]), 'lines',
+                             breakeven_month, lease_term)
+
+
+def year1_breakdown(renewal_base_rent, renewal_free_rent, renewal_ti, current_sf, new_base_rent, new_free_rent,
+                    new_ti, target_sf, turnover_risk, recruiting_benefit, commute_benefit, friction_cost, moving_cost):
+    """Year 1 cash outflow components for Stay and Go"""
+    # FIX 1 & 2 & 3: Remove opportunity_cost_annual, fix rent multiplier, handle free rent proration
+    renewal_year1_base = (renewal_base_rent[0] * current_sf[0]) * (max(0, 12 - renewal_free_rent[0]) / 12)
+    renewal_year1_ti = renewal_ti[0] * current_sf[0]
+
+    relocation_year1_base = (new_base_rent[0] * target_sf[0]) * (max(0, 12 - new_free_rent[0]) / 12)
+    relocation_year1_ti = new_ti[0] * target_sf[0]
+
+    return {
+        'base_rent': [renewal_year1_base, relocation_year1_base],
+        'moving': [0, moving_cost[0]],
+        'friction_turnover': [turnover_risk[0], friction_cost[0] + turnover_risk[0]],
+        'ti': [-renewal_year1_ti, -relocation_year1_ti],
+        'benefits': [0, -(recruiting_benefit[0] + commute_benefit[0])],
+    }
+
+
+def build_year1_figure(year1_breakdown):
+    """Year 1 stacked cash outflow by component"""
+    import plotly.graph_objects as go
+
+    fig_year1 = go.Figure()
+
+    fig_year1.add_trace(go.Bar(
+        name='Base Rent',
+        x=['Stay (Renewal)', 'Go (Relocate)'],
+        y=year1_breakdown['base_rent'],
+        marker_color='#1f77b4'
+    ))
+
+    fig_year1.add_trace(go.Bar(
+        name='Moving/FF&E',
+        x=['Stay (Renewal)', 'Go (Relocate)'],
+        y=year1_breakdown['moving'],
+        marker_color='#ff7f0e'
+    ))
+
+    fig_year1.add_trace(go.Bar(
+        name='Friction + Turnover',
+        x=['Stay (Renewal)', 'Go (Relocate)'],
+        y=year1_breakdown['friction_turnover'],
+        marker_color='#d62728'
+    ))
+
+    # FIX 1: Removed 'Opportunity Cost' bar (opportunity_cost_annual no longer exists)
+
+    fig_year1.add_trace(go.Bar(
+        name='TI Allowance (Benefit)',
+        x=['Stay (Renewal)', 'Go (Relocate)'],
+        y=year1_breakdown['ti'],
+        marker_color='#2ca02c'
+    ))
+
+    fig_year1.add_trace(go.Bar(
+        name='Strategic Benefits',
+        x=['Stay (Renewal)', 'Go (Relocate)'],
+        y=year1_breakdown['benefits'],
+        marker_color='#17becf'
+    ))
+
+    fig_year1.update_layout(
+        barmode='relative',
+        xaxis_title="Scenario",
+        yaxis_title="Year 1 Cash Outflow ($)",
+        height=500,
+        showlegend=True
+    )
+
+    fig_year1.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#e5e5e5')
+
+    return fig_year1
+
+
+def build_comparison_table(renewal_costs, renewal_cumulative, relocation_costs, relocation_cumulative, lease_term):
+    """Year-by-year comparison table"""
+    import pandas as pd
+
+    renewal_costs, renewal_cumulative = renewal_costs[0], renewal_cumulative[0]
+    relocation_costs, relocation_cumulative = relocation_costs[0], relocation_cumulative[0]
+    lease_term = int(lease_term[0])
+    # Numeric columns; the page and the reports apply the dollar formatting
+    df_comparison = pd.DataFrame({
+        'Year': np.arange(1, lease_term + 1),
+        'Stay - Annual': renewal_costs[:lease_term],
+        'Stay - Cumulative': renewal_cumulative[:lease_term],
+        'Go - Annual': relocation_costs[:lease_term],
+        'Go - Cumulative': relocation_cumulative[:lease_term],
+        'Annual Δ': relocation_costs[:lease_term] - renewal_costs[:lease_term]
+    })
+    return df_comparison
+
+
+def page_graph(monthly=False):
+    """Engine graph extended with the page's derived values; figures and tables are shared nodes"""
+    graph = (monthly_engine.MONTHLY_GRAPH if monthly else lease_engine.SCENARIO_GRAPH).copy(
+        'page_monthly' if monthly else 'page')
+    graph.add('decision_metrics', lambda renewal_costs, relocation_costs, discount_rate, lease_term:
+              lease_metrics.decision_metrics(renewal_costs, relocation_costs, discount_rate, lease_term))
+    graph.add('waterfall_values', waterfall_values)
+    graph.add('waterfall_figure', build_waterfall_figure, shared=True)
+    graph.add('cumulative_figure', build_monthly_cumulative_figure if monthly else build_cumulative_figure,
+              shared=True)
+    graph.add('year1_breakdown', year1_breakdown)
+    graph.add('year1_figure', build_year1_figure, shared=True)
+    graph.add('comparison_table', build_comparison_table, shared=True)
+    return graph
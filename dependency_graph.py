@@ -0,0 +1,168 @@
+"""
+Small dependency graph of derived values with dirty tracking.
+
+A Graph is a static definition: each node is a function whose parameter names
+are graph inputs (sidebar fields) or other nodes. An Evaluator holds one set of
+computed values. When update() is given new inputs, it drops only the nodes
+downstream of the inputs that actually changed. Nodes are computed lazily on
+first access, so a node that no section reads is never computed.
+
+Nodes marked shared=True are also looked up in an optional cross-session cache
+(result_cache.LRUCache). The key is built from the graph inputs the node
+transitively depends on, so two sessions that differ only in inputs a figure
+ignores reuse the same figure.
+
+Node values are shared between accesses (and between sessions when cached), so
+node functions must not modify their arguments in place.
+"""
+
+import inspect
+
+import numpy as np
+
+import result_cache
+
+
+class Node:
+    """One derived value: its function and the inputs/nodes it reads, in parameter order"""
+
+    def __init__(self, name, func, params, shared):
+        self.name = name
+        self.func = func
+        self.params = params
+        self.shared = shared
+
+
+class Graph:
+    """Named nodes over a fixed set of input names"""
+
+    def __init__(self, name, inputs):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.nodes = {}
+        self._closure = None
+
+    def node(self, name, shared=False):
+        """Decorator registering func as node name; parameters name its inputs and upstream nodes"""
+        def register(func):
+            self.add(name, func, shared=shared)
+            return func
+        return register
+
+    def add(self, name, func, shared=False):
+        """Register (or replace) a node"""
+        if name in self.inputs:
+            raise ValueError(f"Node {name} shadows an input of the same name")
+        params = tuple(inspect.signature(func).parameters)
+        self.nodes[name] = Node(name, func, params, shared)
+        self._closure = None
+        return func
+
+    def copy(self, name):
+        """A new graph with the same inputs and nodes, to extend or override"""
+        graph = Graph(name, self.inputs)
+        graph.nodes = dict(self.nodes)
+        return graph
+
+    def upstream_inputs(self, name):
+        """Graph inputs a node reads directly or through its upstream nodes"""
+        return self._dependencies()[0][name]
+
+    def dependents(self, input_name):
+        """Nodes that must be recomputed when an input changes"""
+        return self._dependencies()[1].get(input_name, frozenset())
+
+    def _dependencies(self):
+        if self._closure is None:
+            upstream = {}
+
+            def visit(name, path):
+                if name in upstream:
+                    return upstream[name]
+                if name in path:
+                    raise ValueError(f"Cycle through node {name}")
+                reads = set()
+                for param in self.nodes[name].params:
+                    if param in self.inputs:
+                        reads.add(param)
+                    elif param in self.nodes:
+                        reads |= visit(param, path | {name})
+                    else:
+                        raise ValueError(f"Node {name} reads unknown value {param}")
+                upstream[name] = frozenset(reads)
+                return upstream[name]
+
+            for name in self.nodes:
+                visit(name, frozenset())
+            dependents = {}
+            for name, reads in upstream.items():
+                for input_name in reads:
+                    dependents.setdefault(input_name, set()).add(name)
+            self._closure = (upstream, {k: frozenset(v) for k, v in dependents.items()})
+        return self._closure
+
+    def evaluate(self, inputs, outputs):
+        """One-shot evaluation: a dict of the requested nodes"""
+        evaluator = Evaluator(self)
+        # Nothing computed yet, so there is nothing to invalidate
+        evaluator.inputs = {name: inputs[name] for name in self.inputs}
+        return {name: evaluator[name] for name in outputs}
+
+
+def _same(a, b):
+    """Input equality that handles arrays and keeps 1 and True apart"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.shape(a) == np.shape(b) and np.array_equal(a, b)
+    return type(a) is type(b) and a == b
+
+
+class Evaluator:
+    """Computed values of a Graph for one set of inputs, recomputing only what changed"""
+
+    def __init__(self, graph, cache=None):
+        self.graph = graph
+        self.cache = cache
+        self.inputs = {}
+        self.values = {}
+        self.changed = set()
+        self.computed = []
+
+    def update(self, inputs):
+        """Replace the inputs and invalidate the nodes downstream of any that changed; returns the changed names"""
+        missing = set(self.graph.inputs) - set(inputs)
+        if missing:
+            raise ValueError(f"Missing graph inputs: {', '.join(sorted(missing))}")
+        changed = {name for name in self.graph.inputs
+                   if name not in self.inputs or not _same(self.inputs[name], inputs[name])}
+        for name in changed:
+            for node in self.graph.dependents(name):
+                self.values.pop(node, None)
+        self.inputs = {name: inputs[name] for name in self.graph.inputs}
+        self.changed = changed
+        self.computed = []
+        return changed
+
+    def preload(self, values):
+        """Take node values computed elsewhere for the current inputs (e.g. a stored result) instead of computing them"""
+        for name, value in values.items():
+            if name in self.graph.nodes:
+                self.values.setdefault(name, value)
+
+    def __getitem__(self, name):
+        if name in self.inputs:
+            return self.inputs[name]
+        if name not in self.values:
+            self.values[name] = self._compute(self.graph.nodes[name])
+        return self.values[name]
+
+    def _compute(self, node):
+        if node.shared and self.cache is not None:
+            upstream = {k: self.inputs[k] for k in self.graph.upstream_inputs(node.name)}
+            key = result_cache.input_key(f'{self.graph.name}:{node.name}', upstream)
+            return self.cache.get_or_compute(key, lambda: self._call(node))
+        return self._call(node)
+
+    def _call(self, node):
+        value = node.func(*[self[param] for param in node.params])
+        self.computed.append(node.name)
+        return value
@@ -0,0 +1,100 @@
+"""
+Vectorized goal seek: find the value of one input that makes NPV savings hit a target.
+
+With the default target of 0 this is the indifference point ("what Go rent makes
+relocation NPV-neutral?"); a positive target answers "what does it take for Go to
+save $500k?". Every deal in a batch is solved together with bracketed Newton
+steps: each iteration prices the current guesses and a small bump in one engine
+call, takes the Newton step where it stays inside the bracket and bisects
+otherwise. NPV is linear in rents, TI and moving costs, so those converge in a
+couple of iterations.
+"""
+
+import numpy as np
+
+import lease_engine
+
+# Default search range for the inputs brokers usually solve for
+SOLVE_BRACKETS = {
+    'new_base_rent': (0.0, 500.0),
+    'new_free_rent': (0.0, 24.0),
+    'new_ti': (0.0, 1000.0),
+    'renewal_base_rent': (0.0, 500.0),
+    'renewal_free_rent': (0.0, 24.0),
+    'renewal_ti': (0.0, 1000.0),
+    'moving_costs_psf': (0.0, 1000.0),
+    'discount_rate': (0.0, 100.0),
+}
+
+
+def solve_for_input(base_inputs, name, target=0.0, bracket=None, evaluate=lease_engine.evaluate_scenarios,
+                    ftol=0.01, xtol=1e-9, max_iter=60):
+    """
+    Solve npv_savings(name=x) == target for every scenario in base_inputs.
+
+    base_inputs may hold scalars or arrays (one row per deal); target and bracket
+    bounds broadcast against the batch. Returns a dict with the solved 'value'
+    (NaN where the target is not reachable inside the bracket), a 'converged'
+    flag per row and the number of 'iterations' used.
+    """
+    if name not in lease_engine.SCENARIO_DEFAULTS or name in ('industrial_mode', 'lease_term'):
+        raise ValueError(f"Cannot solve for {name}")
+    if bracket is None:
+        if name not in SOLVE_BRACKETS:
+            raise ValueError(f"No default bracket for {name}; pass bracket=(low, high)")
+        bracket = SOLVE_BRACKETS[name]
+
+    batch = lease_engine.broadcast_inputs(base_inputs)
+    n = len(batch['lease_term'])
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), n).copy()
+    lo = np.broadcast_to(np.asarray(bracket[0], dtype=np.float64), n).copy()
+    hi = np.broadcast_to(np.asarray(bracket[1], dtype=np.float64), n).copy()
+    if np.any(lo >= hi):
+        raise ValueError("Bracket low must be below high")
+
+    def residual(rows, *xs):
+        """NPV savings minus target for each x in xs, priced in one engine call"""
+        inputs = {k: np.tile(v[rows], len(xs)) for k, v in batch.items()}
+        inputs[name] = np.concatenate(xs)
+        npv_savings = evaluate(**inputs)['npv_savings'].reshape(len(xs), -1)
+        return npv_savings - target[rows]
+
+    all_rows = np.arange(n)
+    f_lo, f_hi = residual(all_rows, lo, hi)
+    reachable = np.sign(f_lo) != np.sign(f_hi)
+
+    x = np.where(np.abs(f_lo) <= np.abs(f_hi), lo, hi)
+    converged = ~reachable | (np.minimum(np.abs(f_lo), np.abs(f_hi)) <= ftol)
+    iterations = 0
+
+    while iterations < max_iter and not converged.all():
+        iterations += 1
+        rows = np.flatnonzero(~converged)
+        xr, lor, hir = x[rows], lo[rows], hi[rows]
+        step = np.maximum(np.abs(xr), 1.0) * 1e-6
+        fx, f_bump = residual(rows, xr, xr + step)
+
+        done = (np.abs(fx) <= ftol) | (hir - lor <= xtol)
+        converged[rows[done]] = True
+
+        # Shrink the bracket around the root
+        same_side_as_lo = np.sign(fx) == np.sign(f_lo[rows])
+        lor = np.where(same_side_as_lo, xr, lor)
+        hir = np.where(same_side_as_lo, hir, xr)
+        f_lo[rows] = np.where(same_side_as_lo, fx, f_lo[rows])
+
+        # Newton step where it stays inside the bracket, bisection otherwise
+        slope = (f_bump - fx) / step
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = xr - fx / slope
+        inside = np.isfinite(newton) & (newton > lor) & (newton < hir)
+        next_x = np.where(inside, newton, (lor + hir) / 2)
+
+        x[rows] = np.where(done, xr, next_x)
+        lo[rows], hi[rows] = lor, hir
+
+    return {
+        'value': np.where(reachable, x, np.nan),
+        'converged': converged & reachable,
+        'iterations': iterations,
+    }
@@ -0,0 +1,254 @@
+"""
+Lease comps index for market-rent defaults and percentile lookups.
+
+Builds a compact columnar index from a local comps file (CSV or Parquet, one
+row per signed lease) and answers "what are P25/median/P75 rent, free months
+and TI for this submarket, class and size?" in well under a millisecond.
+
+Input columns:
+    submarket, property_class, sf, base_rent, free_months, ti   (required)
+    lease_date                                                   (optional)
+
+The index is a directory of flat .npy columns, with rows sorted by
+(submarket, class, size band, lease date), plus comps.json naming the
+submarkets, classes and size bands. offsets.npy holds where each
+submarket/class/band group starts, so a lookup reads one contiguous slice.
+The columns are memory-mapped read-only: every session and every app process
+on the machine shares the same pages instead of re-reading the file.
+
+Usage:
+    python lease_comps.py build comps.csv comps_index/
+    python lease_comps.py lookup comps_index/ --submarket Midtown --class A --sf 20000 --years 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+MANIFEST = 'comps.json'
+INDEX_VERSION = 1
+
+# Lower edges of the size bands (SF); the last band is open-ended
+SIZE_BANDS = (0, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000)
+
+METRICS = ('base_rent', 'free_months', 'ti')
+REQUIRED_COLUMNS = ('submarket', 'property_class', 'sf') + METRICS
+PERCENTILES = (25, 50, 75)
+
+# Below this many comps in the size band, a lookup widens to all sizes in the submarket/class
+MIN_COMPS = 10
+
+READ_CHUNK_SIZE = 200_000
+
+
+def band_label(band):
+    """'10,000-25,000 SF' style label for a size band"""
+    low = SIZE_BANDS[band]
+    if band + 1 < len(SIZE_BANDS):
+        return f"{low:,}-{SIZE_BANDS[band + 1]:,} SF"
+    return f"{low:,}+ SF"
+
+
+def size_band(sf):
+    """Size band index of sf (scalar or array)"""
+    return np.searchsorted(SIZE_BANDS, sf, side='right') - 1
+
+
+def _read_comps(path):
+    """The comps file as a DataFrame, with submarket/class as text"""
+    # pandas only for building; the app's lookups need numpy alone
+    import pandas as pd
+
+    import batch_runner
+
+    frames = []
+    for chunk in batch_runner.read_chunks(path, READ_CHUNK_SIZE):
+        missing = [name for name in REQUIRED_COLUMNS if name not in chunk]
+        if missing:
+            raise ValueError(f"Comps file is missing columns: {', '.join(missing)}")
+        frame = pd.DataFrame({
+            'submarket': chunk['submarket'].astype(str).str.strip(),
+            'property_class': chunk['property_class'].astype(str).str.strip(),
+        })
+        for name in ('sf',) + METRICS:
+            frame[name] = pd.to_numeric(chunk[name], errors='coerce')
+        if 'lease_date' in chunk:
+            frame['lease_date'] = pd.to_datetime(chunk['lease_date'], errors='coerce')
+        else:
+            frame['lease_date'] = pd.NaT
+        # A comp without a positive size or a rent can't be banded or priced
+        frame = frame.dropna(subset=['sf', 'base_rent'])
+        frames.append(frame[frame['sf'] > 0])
+    if not frames or not sum(len(frame) for frame in frames):
+        raise ValueError(f"No usable comps in {path}")
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_index(source, path):
+    """Build the index directory at path from a CSV/Parquet comps file; returns the CompsIndex"""
+    import pandas as pd
+
+    comps = _read_comps(source)
+    submarkets = sorted(comps['submarket'].unique())
+    classes = sorted(comps['property_class'].unique())
+    sub_code = pd.Categorical(comps['submarket'], categories=submarkets).codes.astype(np.int64)
+    class_code = pd.Categorical(comps['property_class'], categories=classes).codes.astype(np.int64)
+    band = size_band(comps['sf'].to_numpy())
+    group = (sub_code * len(classes) + class_code) * len(SIZE_BANDS) + band
+    # Undated comps sort first, as the oldest
+    days = comps['lease_date'].to_numpy().astype('datetime64[D]')
+    days = np.where(np.isnat(days), np.iinfo(np.int32).min, days.astype(np.int64)).astype(np.int32)
+
+    order = np.lexsort((days, group))
+    n_groups = len(submarkets) * len(classes) * len(SIZE_BANDS)
+    offsets = np.searchsorted(group[order], np.arange(n_groups + 1)).astype(np.int64)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'offsets.npy'), offsets)
+    np.save(os.path.join(path, 'lease_date.npy'), days[order])
+    for name in ('sf',) + METRICS:
+        np.save(os.path.join(path, f'{name}.npy'), comps[name].to_numpy(np.float32)[order])
+    # Manifest last, so a half-written directory never opens as an index
+    dated = days[days != np.iinfo(np.int32).min]
+    manifest = {
+        'version': INDEX_VERSION,
+        'source': os.path.abspath(source),
+        'built_at': time.time(),
+        'rows': int(len(comps)),
+        'submarkets': submarkets,
+        'classes': classes,
+        'size_bands': list(SIZE_BANDS),
+        'latest_date': str(dated.max().astype('datetime64[D]')) if len(dated) else None,
+    }
+    with open(os.path.join(path, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(path, MANIFEST + '.tmp'), os.path.join(path, MANIFEST))
+    return CompsIndex(path)
+
+
+class CompsIndex:
+    """A built comps index, memory-mapped read-only"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != INDEX_VERSION or tuple(manifest['size_bands']) != SIZE_BANDS:
+            raise ValueError(f"{path} was built by another version - rebuild it with lease_comps.py build")
+        self.path = path
+        self.rows = manifest['rows']
+        self.submarkets = manifest['submarkets']
+        self.classes = manifest['classes']
+        self.latest_date = np.datetime64(manifest['latest_date']) if manifest['latest_date'] else None
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'))
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                        for name in ('sf', 'lease_date') + METRICS}
+        counts = np.diff(self.offsets).reshape(len(self.submarkets), len(self.classes), len(SIZE_BANDS))
+        self._class_counts = counts.sum(axis=2)
+
+    def classes_for(self, submarket):
+        """Property classes with comps in submarket"""
+        counts = self._class_counts[self.submarkets.index(submarket)]
+        return [name for name, count in zip(self.classes, counts) if count]
+
+    def _group(self, submarket, property_class, band):
+        if submarket not in self.submarkets:
+            raise ValueError(f"No comps for submarket {submarket}")
+        if property_class not in self.classes:
+            raise ValueError(f"No comps for class {property_class}")
+        sub = self.submarkets.index(submarket)
+        cls = self.classes.index(property_class)
+        return (sub * len(self.classes) + cls) * len(SIZE_BANDS) + band
+
+    def _rows(self, first_group, last_group, since):
+        """Row ranges of groups first..last, trimmed to comps signed on or after since"""
+        ranges = []
+        dates = self.columns['lease_date']
+        for group in range(first_group, last_group + 1):
+            start, stop = int(self.offsets[group]), int(self.offsets[group + 1])
+            if since is not None and stop > start:
+                start += int(np.searchsorted(dates[start:stop], since))
+            if stop > start:
+                ranges.append((start, stop))
+        return ranges
+
+    def lookup(self, submarket, property_class, sf, since=None, min_comps=MIN_COMPS):
+        """
+        P25/median/P75 of base_rent, free_months and ti for comps like a space of sf square feet.
+
+        since (a date) keeps only comps signed on or after it. With fewer than min_comps in
+        the size band, all sizes in the submarket/class are used instead and 'band' says so.
+        Returns a dict of count, band, and metric -> (p25, p50, p75), or None without comps.
+        A metric left blank on every matching comp is None.
+        """
+        band = int(size_band(sf))
+        since = None if since is None else np.datetime64(since, 'D').astype(np.int64)
+        group = self._group(submarket, property_class, band)
+        ranges = self._rows(group, group, since)
+        label = band_label(band)
+        if sum(stop - start for start, stop in ranges) < min_comps:
+            first = group - band
+            ranges = self._rows(first, first + len(SIZE_BANDS) - 1, since)
+            label = "All sizes"
+        count = sum(stop - start for start, stop in ranges)
+        if not count:
+            return None
+        result = {'count': count, 'band': label}
+        for name in METRICS:
+            column = self.columns[name]
+            values = np.concatenate([column[start:stop] for start, stop in ranges])
+            values = values[np.isfinite(values)]
+            result[name] = tuple(float(v) for v in np.percentile(values, PERCENTILES)) if len(values) else None
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the lease comps index")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Build an index from a CSV/Parquet comps file")
+    build.add_argument('source', help="Comps file (.csv or .parquet)")
+    build.add_argument('path', help="Index directory")
+
+    lookup = commands.add_parser('lookup', help="Percentiles for one submarket, class and size")
+    lookup.add_argument('path', help="Index directory")
+    lookup.add_argument('--submarket', required=True)
+    lookup.add_argument('--class', dest='property_class', required=True)
+    lookup.add_argument('--sf', type=float, required=True, help="Square footage of the space")
+    lookup.add_argument('--years', type=float, help="Only comps signed in the last N years of the file")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'build':
+            start = time.perf_counter()
+            index = build_index(args.source, args.path)
+            print(f"Indexed {index.rows:,} comps ({len(index.submarkets)} submarkets, "
+                  f"{len(index.classes)} classes) in {time.perf_counter() - start:.2f}s -> {args.path}")
+            return 0
+
+        index = CompsIndex(args.path)
+        since = None
+        if args.years is not None and index.latest_date is not None:
+            since = index.latest_date - np.timedelta64(int(args.years * 365.25), 'D')
+        start = time.perf_counter()
+        result = index.lookup(args.submarket, args.property_class, args.sf, since=since)
+        elapsed = time.perf_counter() - start
+        if result is None:
+            print("No comps match")
+            return 1
+        print(f"{result['count']:,} comps, {result['band']} ({elapsed * 1000:.2f} ms)")
+        print(f"{'':<12}{'P25':>10}{'Median':>10}{'P75':>10}")
+        for name in METRICS:
+            values = result[name] or (float('nan'),) * len(PERCENTILES)
+            print(f"{name:<12}" + ''.join(f"{v:>10.2f}" for v in values))
+    except (ValueError, ImportError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
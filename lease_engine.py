@@ -0,0 +1,273 @@
+"""
+Vectorized Stay vs. Go lease engine.
+
+Prices N Stay/Go scenarios in one NumPy pass. Every input may be a scalar or an
+array; inputs are broadcast against each other and flattened to N rows, so the
+same call prices a single sidebar scenario or tens of thousands of variants.
+
+This module has no Streamlit import so it can be used from scripts, the batch
+runner and other services.
+"""
+
+import numpy as np
+
+import dependency_graph
+import lease_metrics
+
+# Sidebar defaults - one entry per input the model reads
+SCENARIO_DEFAULTS = {
+    'industrial_mode': False,
+    'lease_term': 10,
+    'discount_rate': 7.0,
+    'escalation_rate': 3.0,
+    'current_sf': 20000,
+    'target_sf': 20000,
+    'renewal_base_rent': 35.0,
+    'renewal_free_rent': 2,
+    'renewal_ti': 5.0,
+    'new_base_rent': 30.0,
+    'new_free_rent': 6,
+    'new_ti': 60.0,
+    'moving_costs_psf': 25.0,
+    # Office friction
+    'productivity_loss_hours': 0,
+    'headcount': 1,
+    'avg_salary': 0,
+    # Industrial friction
+    'daily_revenue_loss': 0,
+    'machinery_rigging': 0.0,
+    # Strategic drivers (office mode only)
+    'attrition_rate': 0.0,
+    'open_roles_per_year': 0,
+    'revenue_per_employee': 0,
+    'hiring_speed_boost': 0,
+    'commute_time_saved': 0,
+}
+
+SCENARIO_FIELDS = tuple(SCENARIO_DEFAULTS)
+
+
+def broadcast_inputs(inputs):
+    """Fill missing inputs from the defaults and broadcast everything to flat (N,) arrays"""
+    unknown = set(inputs) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown scenario inputs: {', '.join(sorted(unknown))}")
+
+    merged = {name: inputs.get(name, default) for name, default in SCENARIO_DEFAULTS.items()}
+    arrays = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v)) for v in merged.values()])
+
+    batch = {}
+    for name, arr in zip(merged, arrays):
+        arr = arr.reshape(-1)
+        if name == 'industrial_mode':
+            batch[name] = arr.astype(bool)
+        elif name == 'lease_term':
+            batch[name] = arr.astype(np.int64)
+        else:
+            batch[name] = arr.astype(np.float64)
+    return batch
+
+
+def calculate_strategic_drivers(headcount, attrition_rate, avg_salary, open_roles_per_year,
+                                revenue_per_employee, hiring_speed_boost, commute_time_saved):
+    """Calculate the three HHI Strategic Drivers"""
+    # Driver A: Workforce Stability Index (one-time cost)
+    turnover_risk = headcount * (attrition_rate / 100) * avg_salary * 1.5
+
+    # Driver B: Recruiting Velocity (annual benefit)
+    days_revenue_per_role = revenue_per_employee / 250
+    recruiting_benefit = open_roles_per_year * days_revenue_per_role * hiring_speed_boost
+
+    # Driver C: Commute Dividend (annual benefit)
+    hourly_wage = avg_salary / 2080
+    annual_work_days = 250
+    commute_benefit = headcount * (commute_time_saved / 60) * annual_work_days * hourly_wage
+
+    return turnover_risk, recruiting_benefit, commute_benefit
+
+
+def calculate_friction_cost(industrial_mode, headcount, avg_salary, productivity_loss_hours,
+                            daily_revenue_loss, machinery_rigging, target_sf):
+    """Calculate one-time HHI Team Friction penalty"""
+    # Office mode: Productivity loss
+    hourly_cost = avg_salary / 2080
+    office_friction = headcount * hourly_cost * productivity_loss_hours
+
+    # Industrial mode: 2 weeks operational downtime + machinery costs
+    downtime_cost = daily_revenue_loss * 14
+    rigging_cost = machinery_rigging * target_sf
+    industrial_friction = downtime_cost + rigging_cost
+
+    return np.where(industrial_mode, industrial_friction, office_friction)
+
+
+def term_mask(term_years, max_term=None):
+    """Boolean (N, max_term) mask of the years that fall inside each scenario's term"""
+    term_years = np.atleast_1d(term_years)
+    if max_term is None:
+        max_term = int(term_years.max())
+    return np.arange(1, max_term + 1) <= term_years[:, None]
+
+
+def calculate_annual_costs(base_rent, free_months, ti_allowance, sq_ft, term_years, escalation_rate):
+    """
+    Calculate annual occupancy costs with escalation as an (N, max_term) matrix.
+    base_rent is $/PSF/year (annual). Free rent can spill into Year 2 if > 12 months.
+    Years past a scenario's own term are zero.
+    """
+    base_rent, free_months, ti_allowance, sq_ft, term_years, escalation_rate = (
+        np.atleast_1d(a) for a in np.broadcast_arrays(
+            base_rent, free_months, ti_allowance, sq_ft, term_years, escalation_rate))
+    mask = term_mask(term_years)
+    max_term = mask.shape[1]
+
+    growth = (1 + escalation_rate[:, None] / 100) ** np.arange(max_term)
+    full_year_rent = (base_rent * sq_ft)[:, None] * growth
+
+    # Year 1: Prorate for free months, Year 2: free rent spillover
+    occupancy = np.ones_like(full_year_rent)
+    occupancy[:, 0] = np.maximum(0, 12 - free_months) / 12
+    if max_term > 1:
+        occupancy[:, 1] = np.where(free_months > 12, np.maximum(0, 24 - free_months) / 12, 1.0)
+
+    annual_costs = full_year_rent * occupancy
+    # TI benefit is one-time in Year 1
+    annual_costs[:, 0] -= ti_allowance * sq_ft
+    annual_costs[~mask] = 0.0
+    return annual_costs
+
+
+def calculate_npv(cash_flows, discount_rate):
+    """Calculate Net Present Value of each row of an (N, T) cash-flow matrix"""
+    cash_flows = np.atleast_2d(cash_flows)
+    discount_factors = lease_metrics.discount_factor_table(discount_rate, cash_flows.shape[1])
+    return (cash_flows * discount_factors).sum(axis=1)
+
+
+def find_breakeven(renewal_costs, relocation_costs, term_years=None):
+    """
+    Month at which cumulative Go cost first drops below cumulative Stay cost.
+    Interpolates within the crossover year; NaN where Go never breaks even.
+    """
+    renewal_costs = np.atleast_2d(renewal_costs)
+    relocation_costs = np.atleast_2d(relocation_costs)
+    n, max_term = renewal_costs.shape
+    if term_years is None:
+        term_years = np.full(n, max_term)
+
+    renewal_cumulative = np.cumsum(renewal_costs, axis=1)
+    relocation_cumulative = np.cumsum(relocation_costs, axis=1)
+    go_ahead = (relocation_cumulative < renewal_cumulative) & term_mask(term_years, max_term)
+
+    found = go_ahead.any(axis=1)
+    year = go_ahead.argmax(axis=1)
+    rows = np.arange(n)
+    prev = np.maximum(year - 1, 0)
+
+    # Gap at the end of the prior year (Go still losing) and Go's gain during the crossover year
+    gap_at_start = renewal_cumulative[rows, prev] - relocation_cumulative[rows, prev]
+    go_gain = renewal_costs[rows, year] - relocation_costs[rows, year]
+    safe_gain = np.where(go_gain > 0, go_gain, 1.0)
+    fraction_of_year = np.abs(gap_at_start) / safe_gain
+
+    # year is 0-based, so the crossover year spans months year * 12 to (year + 1) * 12
+    breakeven_month = np.where(go_gain > 0, (year + fraction_of_year) * 12, (year + 1) * 12.0)
+    breakeven_month = np.where(year == 0, 0.0, breakeven_month)
+    return np.where(found, breakeven_month, np.nan)
+
+
+def format_breakeven(breakeven_month):
+    """Format a single breakeven month for display"""
+    if breakeven_month is None or np.isnan(breakeven_month):
+        return "Does Not Breakeven"
+    if breakeven_month == 0:
+        return "Immediate"
+    years = int(breakeven_month // 12)
+    months = int(breakeven_month % 12)
+    return f"{years}yr {months}mo"
+
+
+# Derived values as a dependency graph, so the page can recompute only what an input change touches
+SCENARIO_GRAPH = dependency_graph.Graph('annual', SCENARIO_FIELDS)
+
+RESULT_KEYS = (
+    'renewal_costs', 'relocation_costs', 'renewal_cumulative', 'relocation_cumulative',
+    'renewal_npv', 'relocation_npv', 'npv_savings', 'breakeven_month', 'renewal_ner', 'relocation_ner',
+    'upfront_investment', 'turnover_risk', 'recruiting_benefit', 'commute_benefit', 'friction_cost',
+    'moving_cost',
+)
+
+
+@SCENARIO_GRAPH.node('strategic_drivers')
+def _strategic_drivers(industrial_mode, headcount, attrition_rate, avg_salary, open_roles_per_year,
+                       revenue_per_employee, hiring_speed_boost, commute_time_saved):
+    # Strategic drivers apply in office mode only
+    return tuple(np.where(~industrial_mode, driver, 0.0) for driver in calculate_strategic_drivers(
+        headcount, attrition_rate, avg_salary, open_roles_per_year,
+        revenue_per_employee, hiring_speed_boost, commute_time_saved))
+
+
+SCENARIO_GRAPH.add('turnover_risk', lambda strategic_drivers: strategic_drivers[0])
+SCENARIO_GRAPH.add('recruiting_benefit', lambda strategic_drivers: strategic_drivers[1])
+SCENARIO_GRAPH.add('commute_benefit', lambda strategic_drivers: strategic_drivers[2])
+SCENARIO_GRAPH.add('friction_cost', calculate_friction_cost)
+SCENARIO_GRAPH.add('moving_cost', lambda moving_costs_psf, target_sf: moving_costs_psf * target_sf)
+
+
+@SCENARIO_GRAPH.node('renewal_rent')
+def _renewal_rent(renewal_base_rent, renewal_free_rent, renewal_ti, current_sf, lease_term, escalation_rate):
+    return calculate_annual_costs(renewal_base_rent, renewal_free_rent, renewal_ti, current_sf,
+                                  lease_term, escalation_rate)
+
+
+@SCENARIO_GRAPH.node('relocation_rent')
+def _relocation_rent(new_base_rent, new_free_rent, new_ti, target_sf, lease_term, escalation_rate):
+    return calculate_annual_costs(new_base_rent, new_free_rent, new_ti, target_sf, lease_term, escalation_rate)
+
+
+SCENARIO_GRAPH.add('renewal_ner', lambda renewal_rent, current_sf, lease_term:
+                   lease_metrics.net_effective_rent(renewal_rent, current_sf, lease_term))
+SCENARIO_GRAPH.add('relocation_ner', lambda relocation_rent, target_sf, lease_term:
+                   lease_metrics.net_effective_rent(relocation_rent, target_sf, lease_term))
+
+
+@SCENARIO_GRAPH.node('renewal_costs')
+def _renewal_costs(renewal_rent, turnover_risk):
+    # Stay: Pure baseline + turnover risk (Year 1 only)
+    renewal_costs = renewal_rent.copy()
+    renewal_costs[:, 0] += turnover_risk
+    return renewal_costs
+
+
+@SCENARIO_GRAPH.node('relocation_costs')
+def _relocation_costs(relocation_rent, lease_term, friction_cost, moving_cost, turnover_risk,
+                      recruiting_benefit, commute_benefit):
+    # Go: friction/moving/turnover in Year 1, strategic benefits every year of the term
+    relocation_costs = relocation_rent.copy()
+    relocation_costs[:, 0] += friction_cost + moving_cost + turnover_risk
+    relocation_costs -= (recruiting_benefit + commute_benefit)[:, None] * term_mask(lease_term, relocation_costs.shape[1])
+    return relocation_costs
+
+
+SCENARIO_GRAPH.add('renewal_npv', lambda renewal_costs, discount_rate: calculate_npv(renewal_costs, discount_rate))
+SCENARIO_GRAPH.add('relocation_npv', lambda relocation_costs, discount_rate: calculate_npv(relocation_costs, discount_rate))
+SCENARIO_GRAPH.add('npv_savings', lambda renewal_npv, relocation_npv: renewal_npv - relocation_npv)
+SCENARIO_GRAPH.add('renewal_cumulative', lambda renewal_costs: np.cumsum(renewal_costs, axis=1))
+SCENARIO_GRAPH.add('relocation_cumulative', lambda relocation_costs: np.cumsum(relocation_costs, axis=1))
+SCENARIO_GRAPH.add('breakeven_month', lambda renewal_costs, relocation_costs, lease_term:
+                   find_breakeven(renewal_costs, relocation_costs, lease_term))
+
+
+@SCENARIO_GRAPH.node('upfront_investment')
+def _upfront_investment(friction_cost, moving_cost, renewal_costs, relocation_costs):
+    return friction_cost + moving_cost + np.maximum(0, relocation_costs[:, 0] - renewal_costs[:, 0])
+
+
+def evaluate_scenarios(**inputs):
+    """
+    Price N Stay/Go scenarios in one pass.
+
+    Accepts any subset of SCENARIO_FIELDS as scalars or arrays and returns a dict of
+    (N,) result arrays plus (N, max_term) cash-flow and cumulative matrices.
+    """
+    return SCENARIO_GRAPH.evaluate(broadcast_inputs(inputs), RESULT_KEYS)
@@ -0,0 +1,132 @@
+"""
+Decision metrics beyond NPV: incremental IRR, discounted payback and Net Effective Rent.
+
+Discount factors are cached per (rate, term), so repeated reruns and batches
+that share a handful of discount rates reuse the same tables instead of
+recomputing (1 + r) ** year for every cash flow. The IRR root-finder works on a
+whole batch of cash-flow rows at once.
+
+All rates are in percent, matching the sidebar.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Batches with more distinct rates than this (e.g. Monte Carlo draws) skip the cache
+MAX_CACHED_RATES = 256
+
+
+@lru_cache(maxsize=4096)
+def discount_factors(rate, term):
+    """Read-only end-of-year discount factors for years 1..term at rate percent"""
+    factors = (1 + rate / 100) ** -np.arange(1, term + 1)
+    factors.flags.writeable = False
+    return factors
+
+
+def discount_factor_table(rates, term):
+    """(N, term) discount factors for an array of rates, built from cached rows where possible"""
+    rates = np.atleast_1d(np.asarray(rates, dtype=np.float64))
+    if rates.size == 1:
+        return discount_factors(float(rates[0]), term)[None, :]
+    unique_rates, inverse = np.unique(rates, return_inverse=True)
+    if len(unique_rates) > MAX_CACHED_RATES:
+        return (1 + rates[:, None] / 100) ** -np.arange(1, term + 1)
+    table = np.stack([discount_factors(float(r), term) for r in unique_rates])
+    return table[inverse]
+
+
+def net_effective_rent(occupancy_costs, sq_ft, term_years):
+    """
+    Net Effective Rent in $/PSF/year: total rent paid over the term, net of free
+    rent and TI allowance, spread evenly over every year and square foot.
+    occupancy_costs is the (N, max_term) rent-only matrix (no friction or drivers).
+    """
+    occupancy_costs = np.atleast_2d(occupancy_costs)
+    return occupancy_costs.sum(axis=1) / (np.asarray(sq_ft) * np.asarray(term_years))
+
+
+def irr(cash_flows, low=-99.0, high=1000.0, tol=1e-10, max_iter=100):
+    """
+    Internal rate of return (percent) of each row of end-of-year cash flows.
+    Uses Newton steps safeguarded by bisection inside [low, high]; NaN where
+    the row's NPV does not change sign across the bracket.
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+    n, term = cash_flows.shape
+    years = np.arange(1, term + 1)
+
+    def npv_and_slope(rows, rate):
+        growth = 1 + rate[:, None] / 100
+        discounted = cash_flows[rows] * growth ** -years
+        return discounted.sum(axis=1), -(discounted * years / growth).sum(axis=1) / 100
+
+    all_rows = np.arange(n)
+    lo = np.full(n, low)
+    hi = np.full(n, high)
+    f_lo, _ = npv_and_slope(all_rows, lo)
+    f_hi, _ = npv_and_slope(all_rows, hi)
+    has_root = np.sign(f_lo) != np.sign(f_hi)
+
+    rate = np.full(n, 10.0)
+    rate = np.where((rate > lo) & (rate < hi), rate, (lo + hi) / 2)
+    converged = ~has_root
+    for _ in range(max_iter):
+        if converged.all():
+            break
+        rows = np.flatnonzero(~converged)
+        r, lor, hir = rate[rows], lo[rows], hi[rows]
+        value, slope = npv_and_slope(rows, r)
+
+        scale = np.abs(cash_flows[rows]).sum(axis=1)
+        done = (np.abs(value) <= tol * np.maximum(scale, 1.0)) | (hir - lor <= 1e-12)
+        converged[rows[done]] = True
+
+        same_side_as_lo = np.sign(value) == np.sign(f_lo[rows])
+        lor = np.where(same_side_as_lo, r, lor)
+        hir = np.where(same_side_as_lo, hir, r)
+        f_lo[rows] = np.where(same_side_as_lo, value, f_lo[rows])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = r - value / slope
+        inside = np.isfinite(newton) & (newton > lor) & (newton < hir)
+        rate[rows] = np.where(done, r, np.where(inside, newton, (lor + hir) / 2))
+        lo[rows], hi[rows] = lor, hir
+
+    return np.where(has_root, rate, np.nan)
+
+
+def discounted_payback(savings, discount_rate, term_years=None):
+    """
+    Month at which cumulative discounted savings first turn non-negative,
+    interpolated within the year. 0 if Go saves money from Year 1; NaN if never.
+    """
+    savings = np.atleast_2d(savings)
+    n, term = savings.shape
+    discounted = savings * discount_factor_table(discount_rate, term)
+    cumulative = np.cumsum(discounted, axis=1)
+
+    in_term = np.ones((n, term), dtype=bool)
+    if term_years is not None:
+        in_term = np.arange(1, term + 1) <= np.atleast_1d(term_years)[:, None]
+    paid_back = (cumulative >= 0) & in_term
+
+    found = paid_back.any(axis=1)
+    year = paid_back.argmax(axis=1)
+    rows = np.arange(n)
+    before = np.where(year > 0, cumulative[rows, np.maximum(year - 1, 0)], 0.0)
+    flow = discounted[rows, year]
+    fraction = np.where(flow > 0, -before / np.where(flow > 0, flow, 1.0), 0.0)
+
+    payback_month = np.where(year == 0, 0.0, (year + fraction) * 12)
+    return np.where(found, payback_month, np.nan)
+
+
+def decision_metrics(renewal_costs, relocation_costs, discount_rate, term_years):
+    """Incremental IRR (percent) and discounted payback month of Go vs. Stay"""
+    savings = np.atleast_2d(renewal_costs) - np.atleast_2d(relocation_costs)
+    return {
+        'incremental_irr': irr(savings),
+        'discounted_payback_month': discounted_payback(savings, discount_rate, term_years),
+    }
@@ -0,0 +1,138 @@
+"""
+Monte Carlo risk simulation for the Stay vs. Go model.
+
+Uncertain inputs are described by distribution specs:
+    ('triangular', low, mode, high)
+    ('normal', mean, std)
+    ('uniform', low, high)
+
+Draws are generated with a seeded NumPy Generator and priced in fixed-size chunks
+through lease_engine.evaluate_scenarios, or monthly_engine.evaluate_monthly with
+monthly=True. Each chunk gets its own child seed, so
+results are identical whether chunks run in-process or across a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import lease_engine
+import monthly_engine
+
+DISTRIBUTIONS = ('triangular', 'normal', 'uniform')
+
+# Inputs that may take a distribution, with the range draws are clipped to
+UNCERTAIN_INPUTS = {
+    'discount_rate': (0.0, None),
+    'escalation_rate': (0.0, None),
+    'renewal_base_rent': (0.0, None),
+    'new_base_rent': (0.0, None),
+    'renewal_free_rent': (0.0, 24.0),
+    'new_free_rent': (0.0, 24.0),
+    'attrition_rate': (0.0, 100.0),
+    'commute_time_saved': (0.0, None),
+    'daily_revenue_loss': (0.0, None),
+}
+
+# The annual engine counts free rent only in the first two years; the monthly engine
+# takes up to the whole term, so there these are clipped to 12 * lease_term instead
+FREE_RENT_INPUTS = ('renewal_free_rent', 'new_free_rent')
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def validate_spec(name, spec):
+    """Raise ValueError if a distribution spec is malformed"""
+    if name not in UNCERTAIN_INPUTS:
+        raise ValueError(f"{name} cannot take a distribution")
+    kind, *args = spec
+    if kind == 'triangular':
+        low, mode, high = args
+        if not low <= mode <= high:
+            raise ValueError(f"{name}: triangular needs low <= mode <= high")
+    elif kind == 'normal':
+        mean, std = args
+        if std < 0:
+            raise ValueError(f"{name}: normal needs std >= 0")
+    elif kind == 'uniform':
+        low, high = args
+        if low > high:
+            raise ValueError(f"{name}: uniform needs low <= high")
+    else:
+        raise ValueError(f"{name}: unknown distribution '{kind}', expected one of {DISTRIBUTIONS}")
+
+
+def sample_inputs(specs, n_draws, rng, max_free_rent=None):
+    """Draw n_draws values for every input in specs; max_free_rent (months) replaces the free-rent cap"""
+    draws = {}
+    for name, (kind, *args) in sorted(specs.items()):
+        if kind == 'triangular':
+            low, mode, high = args
+            values = rng.triangular(low, mode, high, n_draws) if high > low else np.full(n_draws, float(mode))
+        elif kind == 'normal':
+            values = rng.normal(args[0], args[1], n_draws)
+        else:
+            values = rng.uniform(args[0], args[1], n_draws)
+        low, high = UNCERTAIN_INPUTS[name]
+        if name in FREE_RENT_INPUTS and max_free_rent is not None:
+            high = max_free_rent
+        draws[name] = np.clip(values, low, high)
+    return draws
+
+
+def simulate_chunk(base_inputs, specs, n_draws, seed, monthly=False):
+    """Price one chunk of draws; returns (npv_savings, breakeven_month)"""
+    rng = np.random.default_rng(seed)
+    inputs = dict(base_inputs)
+    if monthly:
+        lease_term = np.asarray(inputs.get('lease_term', lease_engine.SCENARIO_DEFAULTS['lease_term']), dtype=np.float64)
+        inputs.update(sample_inputs(specs, n_draws, rng, max_free_rent=12 * lease_term))
+        results = monthly_engine.evaluate_monthly(**inputs)
+    else:
+        inputs.update(sample_inputs(specs, n_draws, rng))
+        results = lease_engine.evaluate_scenarios(**inputs)
+    return results['npv_savings'], results['breakeven_month']
+
+
+def run_simulation(base_inputs, specs, n_draws, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, monthly=False):
+    """
+    Run n_draws Monte Carlo scenarios around base_inputs.
+    workers > 1 splits chunks across a process pool; monthly prices with the monthly engine.
+    Returns a dict of (n_draws,) npv_savings and breakeven_month arrays.
+    """
+    for name, spec in specs.items():
+        validate_spec(name, spec)
+
+    sizes = [chunk_size] * (n_draws // chunk_size)
+    if n_draws % chunk_size:
+        sizes.append(n_draws % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(base_inputs, specs, size, child, monthly) for size, child in zip(sizes, seeds)]
+
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(simulate_chunk, *zip(*args)))
+    else:
+        chunks = [simulate_chunk(*a) for a in args]
+
+    return {
+        'npv_savings': np.concatenate([c[0] for c in chunks]),
+        'breakeven_month': np.concatenate([c[1] for c in chunks]),
+    }
+
+
+def summarize_simulation(simulation):
+    """P10/P50/P90 NPV savings, probability Go beats Stay and breakeven statistics"""
+    npv_savings = simulation['npv_savings']
+    breakeven_month = simulation['breakeven_month']
+    p10, p50, p90 = np.percentile(npv_savings, [10, 50, 90])
+    breaks_even = ~np.isnan(breakeven_month)
+    return {
+        'draws': len(npv_savings),
+        'npv_p10': float(p10),
+        'npv_p50': float(p50),
+        'npv_p90': float(p90),
+        'prob_go_wins': float((npv_savings > 0).mean()),
+        'prob_breakeven': float(breaks_even.mean()),
+        'breakeven_p50': float(np.median(breakeven_month[breaks_even])) if breaks_even.any() else None,
+    }
@@ -0,0 +1,155 @@
+"""
+Monthly-resolution Stay vs. Go engine.
+
+Each scenario is an (N, 12 * term + 1) matrix of monthly cash flows:
+    column 0      move-in: TI credit and one-time friction/moving/turnover costs
+    column k >= 1 rent for lease month k, stepping up at each escalation anniversary
+
+Free rent can span any number of months (including fractions), so concessions
+beyond 24 months are no longer dropped. Cash flows are discounted monthly at the
+equivalent of the annual discount rate, and breakeven is found for every scenario
+at once with a cumulative sum plus a row-offset searchsorted.
+
+evaluate_monthly returns the same keys as lease_engine.evaluate_scenarios, with
+annual costs rolled up from the monthly flows, plus the monthly matrices.
+"""
+
+import numpy as np
+
+import lease_engine
+import lease_metrics
+
+
+def monthly_cash_flows(base_rent, free_months, ti_allowance, sq_ft, term_years, escalation_rate):
+    """
+    Monthly occupancy costs as an (N, 12 * max_term + 1) matrix.
+    base_rent is $/PSF/year. Months past a scenario's own term are zero.
+    """
+    base_rent, free_months, ti_allowance, sq_ft, term_years, escalation_rate = (
+        np.atleast_1d(a) for a in np.broadcast_arrays(
+            base_rent, free_months, ti_allowance, sq_ft, term_years, escalation_rate))
+    n = len(base_rent)
+    max_term = int(term_years.max())
+    month = np.arange(1, 12 * max_term + 1)
+
+    # Rent steps up on each anniversary: price the (N, term) annual steps, then repeat by month
+    annual_rent = (base_rent * sq_ft / 12)[:, None] * (1 + escalation_rate[:, None] / 100) ** np.arange(max_term)
+    annual_rent[np.arange(1, max_term + 1) > term_years[:, None]] = 0.0
+
+    flows = np.empty((n, 12 * max_term + 1))
+    flows[:, 0] = -ti_allowance * sq_ft
+    rent = flows[:, 1:].reshape(n, max_term, 12)
+    rent[:] = annual_rent[:, :, None]
+
+    # Only the free-rent months need prorating (handles fractional months)
+    free_span = min(int(np.ceil(free_months.max())), 12 * max_term)
+    if free_span > 0:
+        flows[:, 1:free_span + 1] *= np.clip(month[:free_span] - free_months[:, None], 0.0, 1.0)
+    return flows
+
+
+def monthly_npv(flows, discount_rate):
+    """NPV of monthly flows at the monthly equivalent of an annual discount rate"""
+    flows = np.atleast_2d(flows)
+    discount_rate = np.atleast_1d(discount_rate)
+    months = np.arange(flows.shape[1])
+    if discount_rate.size == 1:
+        discount_factors = (1 + discount_rate[0] / 100) ** (-months / 12)
+        return flows @ discount_factors
+    discount_factors = np.exp(np.log1p(discount_rate / 100)[:, None] * (-months / 12))
+    return np.einsum('ij,ij->i', flows, discount_factors)
+
+
+def find_breakeven_monthly(renewal_flows, relocation_flows, term_years):
+    """
+    Month at which cumulative Go cost first drops below cumulative Stay cost,
+    linearly interpolated within the crossover month. NaN where Go never breaks even.
+    """
+    renewal_flows = np.atleast_2d(renewal_flows)
+    relocation_flows = np.atleast_2d(relocation_flows)
+    n, n_cols = renewal_flows.shape
+
+    gap = np.cumsum(renewal_flows, axis=1) - np.cumsum(relocation_flows, axis=1)
+    in_term = np.arange(n_cols) <= 12 * np.atleast_1d(term_years)[:, None]
+    go_ahead = (gap > 0) & in_term
+
+    # Running count of months Go is ahead is non-decreasing within a row; offsetting
+    # each row by row * (n_cols + 1) makes the flattened array globally sorted, so one
+    # searchsorted finds every row's first crossover column.
+    offsets = np.arange(n) * (n_cols + 1)
+    ahead_count = np.cumsum(go_ahead, axis=1) + offsets[:, None]
+    first = np.searchsorted(ahead_count.ravel(), offsets + 1) - np.arange(n) * n_cols
+    found = first < n_cols
+    col = np.minimum(first, n_cols - 1)
+
+    rows = np.arange(n)
+    gap_before = gap[rows, np.maximum(col - 1, 0)]
+    gap_after = gap[rows, col]
+    step = np.where(gap_after > gap_before, gap_after - gap_before, 1.0)
+    fraction = np.clip(-gap_before / step, 0.0, 1.0)
+
+    breakeven_month = np.where(col == 0, 0.0, col - 1 + fraction)
+    return np.where(found, breakeven_month, np.nan)
+
+
+def annual_totals(flows):
+    """Roll monthly flows up to (N, max_term) annual buckets; move-in costs land in Year 1"""
+    annual = flows[:, 1:].reshape(len(flows), -1, 12).sum(axis=2)
+    annual[:, 0] += flows[:, 0]
+    return annual
+
+
+# Same graph as the annual engine with the cash-flow nodes swapped for monthly ones
+MONTHLY_GRAPH = lease_engine.SCENARIO_GRAPH.copy('monthly')
+
+
+@MONTHLY_GRAPH.node('renewal_flows')
+def _renewal_flows(renewal_base_rent, renewal_free_rent, renewal_ti, current_sf, lease_term, escalation_rate):
+    return monthly_cash_flows(renewal_base_rent, renewal_free_rent, renewal_ti, current_sf,
+                              lease_term, escalation_rate)
+
+
+@MONTHLY_GRAPH.node('relocation_flows')
+def _relocation_flows(new_base_rent, new_free_rent, new_ti, target_sf, lease_term, escalation_rate):
+    return monthly_cash_flows(new_base_rent, new_free_rent, new_ti, target_sf, lease_term, escalation_rate)
+
+
+MONTHLY_GRAPH.add('renewal_ner', lambda renewal_flows, current_sf, lease_term:
+                  lease_metrics.net_effective_rent(renewal_flows, current_sf, lease_term))
+MONTHLY_GRAPH.add('relocation_ner', lambda relocation_flows, target_sf, lease_term:
+                  lease_metrics.net_effective_rent(relocation_flows, target_sf, lease_term))
+
+
+@MONTHLY_GRAPH.node('renewal_monthly')
+def _renewal_monthly(renewal_flows, turnover_risk):
+    # One-time costs at move-in
+    renewal_monthly = renewal_flows.copy()
+    renewal_monthly[:, 0] += turnover_risk
+    return renewal_monthly
+
+
+@MONTHLY_GRAPH.node('relocation_monthly')
+def _relocation_monthly(relocation_flows, lease_term, friction_cost, moving_cost, turnover_risk,
+                        recruiting_benefit, commute_benefit):
+    # One-time costs at move-in, strategic benefits spread evenly over every month of the term
+    relocation_monthly = relocation_flows.copy()
+    in_term = np.arange(1, relocation_monthly.shape[1]) <= 12 * lease_term[:, None]
+    relocation_monthly[:, 0] += friction_cost + moving_cost + turnover_risk
+    relocation_monthly[:, 1:] -= ((recruiting_benefit + commute_benefit) / 12)[:, None] * in_term
+    return relocation_monthly
+
+
+MONTHLY_GRAPH.add('renewal_npv', lambda renewal_monthly, discount_rate: monthly_npv(renewal_monthly, discount_rate))
+MONTHLY_GRAPH.add('relocation_npv', lambda relocation_monthly, discount_rate:
+                  monthly_npv(relocation_monthly, discount_rate))
+MONTHLY_GRAPH.add('renewal_costs', lambda renewal_monthly: annual_totals(renewal_monthly))
+MONTHLY_GRAPH.add('relocation_costs', lambda relocation_monthly: annual_totals(relocation_monthly))
+MONTHLY_GRAPH.add('breakeven_month', lambda renewal_monthly, relocation_monthly, lease_term:
+                  find_breakeven_monthly(renewal_monthly, relocation_monthly, lease_term))
+
+RESULT_KEYS = lease_engine.RESULT_KEYS + ('renewal_monthly', 'relocation_monthly')
+
+
+def evaluate_monthly(**inputs):
+    """Monthly counterpart of lease_engine.evaluate_scenarios"""
+    return MONTHLY_GRAPH.evaluate(lease_engine.broadcast_inputs(inputs), RESULT_KEYS)
@@ -0,0 +1,92 @@
+"""
+Multi-site comparison: rank N candidate "Go" buildings against one Stay baseline.
+
+Each site overrides the Go-side inputs in SITE_FIELDS; everything else (term,
+rates, renewal terms, friction, other strategic drivers) comes from the shared
+base inputs. Per-site results are cached under a hash of the site's own inputs
+plus the base inputs, so editing one row of a 30-site table reprices only that
+row. All cache misses are priced together in one engine call.
+"""
+
+import numpy as np
+import pandas as pd
+
+import lease_engine
+import result_cache
+
+# Columns a site table may carry, with the engine input each maps to
+SITE_FIELDS = ('new_base_rent', 'new_free_rent', 'new_ti', 'target_sf', 'moving_costs_psf', 'commute_time_saved')
+
+SITE_COLUMNS = ('site',) + SITE_FIELDS
+
+
+def clean_sites(sites):
+    """Validate a site table; blank cells take the base inputs, rows without a name are dropped"""
+    sites = pd.DataFrame(sites).copy()
+    missing = set(SITE_COLUMNS) - set(sites.columns)
+    if missing:
+        raise ValueError(f"Site table is missing columns: {', '.join(sorted(missing))}")
+    sites = sites[sites['site'].notna() & (sites['site'].astype(str).str.strip() != '')]
+    for name in SITE_FIELDS:
+        sites[name] = pd.to_numeric(sites[name], errors='coerce')
+    if sites['site'].duplicated().any():
+        raise ValueError("Site names must be unique")
+    return sites[list(SITE_COLUMNS)].reset_index(drop=True)
+
+
+def site_inputs(base_inputs, site):
+    """Full engine inputs for one site row"""
+    inputs = dict(lease_engine.SCENARIO_DEFAULTS)
+    inputs.update(base_inputs)
+    for name in SITE_FIELDS:
+        value = site[name]
+        if value is not None and not pd.isna(value):
+            inputs[name] = float(value)
+    return inputs
+
+
+def evaluate_sites(base_inputs, sites, cache=None, evaluate=lease_engine.evaluate_scenarios):
+    """
+    Price every site against the Stay baseline.
+    Returns a list of per-site result dicts in table order; only sites missing
+    from cache are priced.
+    """
+    sites = clean_sites(sites)
+    rows = [site_inputs(base_inputs, site) for site in sites.to_dict('records')]
+    keys = [result_cache.input_key(f'site:{evaluate.__module__}', inputs) for inputs in rows]
+
+    priced = [cache.get(key) if cache is not None else None for key in keys]
+    stale = [i for i, row in enumerate(priced) if row is None]
+    if stale:
+        batch = {name: np.array([rows[i][name] for i in stale]) for name in lease_engine.SCENARIO_FIELDS}
+        results = evaluate(**batch)
+        for j, i in enumerate(stale):
+            priced[i] = {
+                'npv_savings': float(results['npv_savings'][j]),
+                'relocation_npv': float(results['relocation_npv'][j]),
+                'breakeven_month': float(results['breakeven_month'][j]),
+                'upfront_investment': float(results['upfront_investment'][j]),
+                'relocation_ner': float(results['relocation_ner'][j]),
+                'relocation_cumulative': results['relocation_cumulative'][j].copy(),
+            }
+            if cache is not None:
+                cache.put(keys[i], priced[i])
+
+    # Cached rows are shared, so attach the site name to a copy
+    return [dict(row, site=str(name), key=key) for name, row, key in zip(sites['site'], priced, keys)]
+
+
+def ranking_table(priced):
+    """Numeric ranking DataFrame, best NPV savings first"""
+    table = pd.DataFrame([{
+        'Site': row['site'],
+        'NPV Savings': row['npv_savings'],
+        'Breakeven': lease_engine.format_breakeven(row['breakeven_month']),
+        'Upfront Investment': row['upfront_investment'],
+        'Go NER ($/PSF/yr)': row['relocation_ner'],
+    } for row in priced])
+    if table.empty:
+        return table
+    table = table.sort_values('NPV Savings', ascending=False).reset_index(drop=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table
@@ -0,0 +1,135 @@
+"""
+Compact chart and table payloads for large views.
+
+Small figures are sent as built. Once a figure carries more than COMPACT_POINTS
+values, compact_figure thins long line traces to a min/max envelope, switches
+them to WebGL (scattergl), and rounds or narrows the numbers sent to the
+browser: whole dollars become int32, everything else float32. Tables stay
+numeric (formatting is done by column_config in the page) and are sent one page
+at a time by the page's show_table helper.
+
+figure_bytes and table_bytes measure what a figure or table costs on the wire,
+for the profiling panel.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Figures carrying more values than this are compacted before they are sent
+COMPACT_POINTS = 2000
+
+# Points kept per line trace once it is downsampled
+LINE_POINTS = 1000
+
+# Rows sent per page of a large table
+PAGE_ROWS = 50
+
+
+def figure_points(fig):
+    """Number of x/y/z values a figure carries"""
+    total = 0
+    for trace in fig.data:
+        for attr in ('x', 'y', 'z'):
+            values = getattr(trace, attr, None)
+            if values is not None:
+                total += np.size(values)
+    return total
+
+
+def minmax_indices(y, n_points):
+    """
+    Indices keeping the first and last point and the min and max of each bucket,
+    so peaks and crossings survive downsampling; at most n_points indices
+    """
+    y = np.asarray(y, dtype=float)
+    if len(y) <= n_points:
+        return np.arange(len(y))
+    n_buckets = max(1, (n_points - 2) // 2)
+    edges = np.linspace(1, len(y) - 1, n_buckets + 1).astype(int)
+    keep = [0, len(y) - 1]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop > start:
+            bucket = y[start:stop]
+            keep += [start + np.nanargmin(bucket), start + np.nanargmax(bucket)]
+    return np.unique(keep)
+
+
+def narrow(values, decimals=None):
+    """
+    Values as a compact numeric array: rounded to decimals (int32 when that is
+    0 and they fit), otherwise float32
+    """
+    values = np.asarray(values, dtype=float)
+    if decimals is None:
+        return values.astype(np.float32)
+    values = np.round(values, decimals)
+    if decimals == 0 and np.isfinite(values).all() and np.abs(values).max(initial=0) < 2 ** 31:
+        return values.astype(np.int32)
+    return values
+
+
+def compact_figure(fig, decimals=None, threshold=COMPACT_POINTS, line_points=LINE_POINTS):
+    """
+    A lighter copy of fig when it carries more than threshold values, else fig.
+    decimals maps 'x'/'y'/'z' to the places kept (0 for dollars); values not
+    listed are sent as float32. Line traces longer than line_points are
+    downsampled and drawn with WebGL.
+    """
+    if figure_points(fig) <= threshold:
+        return fig
+    decimals = decimals or {}
+
+    traces = []
+    for trace in fig.data:
+        spec = trace.to_plotly_json()
+        trace_type = spec.pop('type')
+        if trace_type in ('scatter', 'scattergl') and spec.get('y') is not None and np.size(spec['y']) > line_points:
+            keep = minmax_indices(spec['y'], line_points)
+            for attr in ('x', 'y', 'text', 'customdata'):
+                if spec.get(attr) is not None and np.size(spec[attr]) == np.size(spec['y']):
+                    spec[attr] = np.asarray(spec[attr])[keep]
+            trace_type = 'scattergl'
+        for attr in ('x', 'y', 'z'):
+            values = spec.get(attr)
+            if values is not None and np.size(values) > 1 and np.issubdtype(np.asarray(values).dtype, np.number):
+                spec[attr] = narrow(values, decimals.get(attr))
+        spec['type'] = trace_type
+        traces.append(spec)
+
+    return go.Figure({'data': traces, 'layout': fig.layout})
+
+
+def histogram_bars(values, start, end, size, **bar):
+    """
+    Bin values on the server and return the histogram as a Bar trace, so the
+    browser receives one count per bin instead of every draw
+    """
+    values = np.asarray(values, dtype=float)
+    edges = np.arange(start, end + size, size)
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=edges)
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=size, **bar)
+
+
+def page_bounds(n_rows, page, page_rows=PAGE_ROWS):
+    """Row slice (start, stop) of a 1-based page, clamped to the table"""
+    n_pages = max(1, -(-n_rows // page_rows))
+    page = min(max(1, int(page)), n_pages)
+    return (page - 1) * page_rows, min(page * page_rows, n_rows)
+
+
+def figure_bytes(fig):
+    """Size of the figure spec as Streamlit serializes it"""
+    return len(pio.to_json(fig, validate=False))
+
+
+def table_bytes(df):
+    """Size of the DataFrame as an Arrow IPC stream, the format st.dataframe sends"""
+    # Only needed when profiling
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
@@ -0,0 +1,303 @@
+"""
+Per-section timing spans for the Streamlit page.
+
+Each rerun opens a PerfRun that times the page section by section (calculations,
+figure building, table formatting, st.* rendering). Finished spans feed a
+process-wide PerfRecorder that keeps a rolling window per section and reports
+p50/p95, alongside cache hit ratios, figure/table payload sizes, the bytes
+sent per rerun and the memory each session holds.
+
+The summary can be exported as JSON lines or Prometheus text to a local file,
+or served over HTTP at /metrics for a Prometheus scrape.
+
+This module uses only the standard library so the page can start timing before
+numpy and pandas are imported.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Spans kept per section for the rolling percentiles
+WINDOW = 1000
+
+
+class PerfRecorder:
+    """Thread-safe rolling per-section timings shared by every session"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.reruns = 0
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._totals = defaultdict(float)
+        self._payloads = {}
+        self._rerun_bytes = deque(maxlen=window)
+        self._session_bytes = deque(maxlen=window)
+        self._caches = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def start_run(self):
+        """Begin timing one rerun"""
+        return PerfRun(self)
+
+    def record(self, section, seconds):
+        with self._lock:
+            self._durations[section].append(seconds)
+            self._counts[section] += 1
+            self._totals[section] += seconds
+
+    def record_payload(self, name, nbytes):
+        """Latest serialized size of a figure or table"""
+        with self._lock:
+            self._payloads[name] = int(nbytes)
+
+    def record_rerun_bytes(self, nbytes):
+        """Total figure and table bytes sent by one rerun"""
+        with self._lock:
+            self._rerun_bytes.append(int(nbytes))
+
+    def record_session_bytes(self, nbytes):
+        """Memory one session held at the end of a rerun (see deep_size)"""
+        with self._lock:
+            self._session_bytes.append(int(nbytes))
+
+    def record_cache(self, name, stats):
+        """Latest counters of a cache (an LRUCache.stats() or lru_cache cache_info())"""
+        if hasattr(stats, '_asdict'):
+            stats = stats._asdict()
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        with self._lock:
+            self._caches[name] = dict(stats)
+
+    def summary(self):
+        """Per-section count, p50/p95/max in ms over the rolling window, plus caches, payloads and bytes per rerun"""
+        with self._lock:
+            windows = {name: sorted(spans) for name, spans in self._durations.items()}
+            rerun_bytes = sorted(self._rerun_bytes)
+            last_bytes = self._rerun_bytes[-1] if self._rerun_bytes else 0
+            session_bytes = sorted(self._session_bytes)
+            last_session = self._session_bytes[-1] if self._session_bytes else 0
+            counts, totals = dict(self._counts), dict(self._totals)
+            payloads, caches = dict(self._payloads), {k: dict(v) for k, v in self._caches.items()}
+            reruns = self.reruns
+
+        sections = {}
+        for name, spans in windows.items():
+            sections[name] = {
+                'count': counts[name],
+                'total_s': round(totals[name], 6),
+                'p50_ms': round(_percentile(spans, 50) * 1000, 3),
+                'p95_ms': round(_percentile(spans, 95) * 1000, 3),
+                'max_ms': round(spans[-1] * 1000, 3),
+            }
+        return {'reruns': reruns, 'sections': sections, 'caches': caches, 'payload_bytes': payloads,
+                'bytes_per_rerun': _distribution(rerun_bytes, last_bytes),
+                'session_bytes': _distribution(session_bytes, last_session)}
+
+    def to_jsonl(self):
+        """One JSON line with a timestamp and the current summary"""
+        return json.dumps(dict(self.summary(), timestamp=time.time()), sort_keys=True) + '\n'
+
+    def to_prometheus(self, prefix='hhi'):
+        """Summary in the Prometheus text exposition format"""
+        summary = self.summary()
+        lines = [
+            f'# HELP {prefix}_reruns_total Page reruns timed',
+            f'# TYPE {prefix}_reruns_total counter',
+            f'{prefix}_reruns_total {summary["reruns"]}',
+            f'# HELP {prefix}_section_seconds Rolling wall time per page section',
+            f'# TYPE {prefix}_section_seconds summary',
+        ]
+        for name, s in sorted(summary['sections'].items()):
+            label = f'section="{_label(name)}"'
+            lines.append(f'{prefix}_section_seconds{{{label},quantile="0.5"}} {s["p50_ms"] / 1000:.6f}')
+            lines.append(f'{prefix}_section_seconds{{{label},quantile="0.95"}} {s["p95_ms"] / 1000:.6f}')
+            lines.append(f'{prefix}_section_seconds_sum{{{label}}} {s["total_s"]:.6f}')
+            lines.append(f'{prefix}_section_seconds_count{{{label}}} {s["count"]}')
+
+        lines += [f'# HELP {prefix}_cache_hit_ratio Share of cache lookups served from cache',
+                  f'# TYPE {prefix}_cache_hit_ratio gauge']
+        for name, stats in sorted(summary['caches'].items()):
+            lines.append(f'{prefix}_cache_hit_ratio{{cache="{_label(name)}"}} {stats["hit_ratio"]:.6f}')
+
+        lines += [f'# HELP {prefix}_payload_bytes Serialized size of the last figure or table sent',
+                  f'# TYPE {prefix}_payload_bytes gauge']
+        for name, nbytes in sorted(summary['payload_bytes'].items()):
+            lines.append(f'{prefix}_payload_bytes{{name="{_label(name)}"}} {nbytes}')
+
+        per_rerun = summary['bytes_per_rerun']
+        lines += [f'# HELP {prefix}_rerun_bytes Figure and table bytes sent per rerun',
+                  f'# TYPE {prefix}_rerun_bytes summary',
+                  f'{prefix}_rerun_bytes{{quantile="0.5"}} {per_rerun["p50"]}',
+                  f'{prefix}_rerun_bytes{{quantile="0.95"}} {per_rerun["p95"]}',
+                  f'{prefix}_rerun_bytes_count {per_rerun["count"]}']
+
+        per_session = summary['session_bytes']
+        lines += [f'# HELP {prefix}_session_bytes Memory held by one session (session state and its figures)',
+                  f'# TYPE {prefix}_session_bytes summary',
+                  f'{prefix}_session_bytes{{quantile="0.5"}} {per_session["p50"]}',
+                  f'{prefix}_session_bytes{{quantile="0.95"}} {per_session["p95"]}',
+                  f'{prefix}_session_bytes_count {per_session["count"]}']
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, min_interval=0.0):
+        """
+        Write the summary to path: Prometheus text (replaced in place) for .prom
+        files, otherwise one appended JSON line. Skipped if the last export was
+        less than min_interval seconds ago; returns True when written.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_export < min_interval:
+                return False
+            self._last_export = now
+
+        if path.endswith('.prom'):
+            # Write then rename so a scraper never reads a half-written file
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        else:
+            with open(path, 'a') as f:
+                f.write(self.to_jsonl())
+        return True
+
+
+class PerfRun:
+    """Spans for a single rerun; top-level sections run back to back, spans may nest inside them"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.spans = []
+        self.payloads = {}
+        self._start = time.perf_counter()
+        self._section = None
+        self._section_start = None
+
+    def section(self, name):
+        """End the current top-level section (if any) and start the next"""
+        self._end_section()
+        self._section = name
+        self._section_start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        """Time a block inside the current section, e.g. building or rendering one figure"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def payload(self, name, nbytes):
+        """Record the serialized size of a figure or table sent in this rerun"""
+        self.payloads[name] = self.payloads.get(name, 0) + int(nbytes)
+        self.recorder.record_payload(name, nbytes)
+
+    def mark(self, name):
+        """Record the time from the start of the rerun to now, e.g. when the first metric is sent"""
+        self._add(name, time.perf_counter() - self._start)
+
+    def finish(self):
+        """Close the last section and record the whole rerun; returns its duration in seconds"""
+        self._end_section()
+        total = time.perf_counter() - self._start
+        self._add('rerun', total)
+        if self.payloads:
+            self.recorder.record_rerun_bytes(sum(self.payloads.values()))
+        with self.recorder._lock:
+            self.recorder.reruns += 1
+        return total
+
+    def _end_section(self):
+        if self._section is not None:
+            self._add(self._section, time.perf_counter() - self._section_start)
+            self._section = None
+
+    def _add(self, name, seconds):
+        self.spans.append((name, seconds))
+        self.recorder.record(name, seconds)
+
+
+def _percentile(sorted_values, q):
+    """Linearly interpolated percentile of a sorted list (numpy's default method)"""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _distribution(sorted_values, last):
+    """count/last/p50/p95/max of a sorted window of byte counts"""
+    if not sorted_values:
+        return {'count': 0, 'last': last, 'p50': 0, 'p95': 0, 'max': 0}
+    return {'count': len(sorted_values), 'last': last, 'p50': round(_percentile(sorted_values, 50)),
+            'p95': round(_percentile(sorted_values, 95)), 'max': sorted_values[-1]}
+
+
+def deep_size(obj, _seen=None):
+    """
+    Approximate bytes held by obj and everything it contains. Arrays count their
+    buffers (nbytes), DataFrames their memory_usage, and plotly figures their
+    to_plotly_json() dict; objects shared by several references count once.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if hasattr(obj, 'to_plotly_json'):
+        return deep_size(obj.to_plotly_json(), _seen)
+    if hasattr(obj, 'memory_usage') and callable(obj.memory_usage):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if hasattr(obj, 'nbytes') and hasattr(obj, 'dtype'):
+        return sys.getsizeof(obj) + (0 if obj.base is None and obj.flags.owndata else int(obj.nbytes))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, _seen) + deep_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(v, _seen) for v in obj)
+    return size
+
+
+def _label(value):
+    """Escape a Prometheus label value"""
+    return re.sub(r'(["\\])', r'\\\1', str(value)).replace('\n', ' ')
+
+
+def serve_metrics(recorder, host='127.0.0.1', port=9108):
+    """Serve GET /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = recorder.to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(recorder.summary()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            body = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='perf-metrics').start()
+    return server
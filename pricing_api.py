@@ -0,0 +1,303 @@
+"""
+Local HTTP/JSON scenario-pricing service.
+
+Exposes the lease_engine math to internal tools over plain HTTP using only the
+standard library's asyncio. Concurrent requests are coalesced into micro-batches
+and priced together in one vectorized engine call.
+
+Endpoints:
+    POST /price    {"new_base_rent": 30, "lease_term": 10, ...}
+                   or {"scenarios": [{...}, {...}]}
+    GET  /stats    request counts, batch sizes and p50/p99 latency
+    GET  /health
+
+Any field left out of a scenario uses the sidebar default
+(lease_engine.SCENARIO_DEFAULTS).
+
+Usage:
+    python pricing_api.py --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+import lease_engine
+
+MAX_BODY_BYTES = 1_000_000
+MAX_SCENARIOS_PER_REQUEST = 10_000
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def parse_scenario(obj):
+    """Validate one JSON scenario; returns a dict of engine inputs"""
+    if not isinstance(obj, dict):
+        raise ValueError("Each scenario must be a JSON object")
+    unknown = set(obj) - set(lease_engine.SCENARIO_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    scenario = {}
+    for name, value in obj.items():
+        if name == 'industrial_mode':
+            if not isinstance(value, bool):
+                raise ValueError("industrial_mode must be true or false")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number")
+        elif value < 0:
+            raise ValueError(f"{name} must not be negative")
+        scenario[name] = value
+
+    term = scenario.get('lease_term', lease_engine.SCENARIO_DEFAULTS['lease_term'])
+    if term != int(term) or not 1 <= term <= 40:
+        raise ValueError("lease_term must be a whole number of years between 1 and 40")
+    return scenario
+
+
+def price_scenarios(scenarios):
+    """Price a list of parsed scenarios in one engine call; returns one result dict per scenario"""
+    inputs = {name: np.array([s.get(name, default) for s in scenarios])
+              for name, default in lease_engine.SCENARIO_DEFAULTS.items()}
+    results = lease_engine.evaluate_scenarios(**inputs)
+
+    priced = []
+    for i in range(len(scenarios)):
+        breakeven_month = float(results['breakeven_month'][i])
+        priced.append({
+            'renewal_npv': float(results['renewal_npv'][i]),
+            'relocation_npv': float(results['relocation_npv'][i]),
+            'npv_savings': float(results['npv_savings'][i]),
+            'breakeven_month': None if math.isnan(breakeven_month) else breakeven_month,
+            'breakeven_display': lease_engine.format_breakeven(breakeven_month),
+            'upfront_investment': float(results['upfront_investment'][i]),
+        })
+    return priced
+
+
+class MicroBatcher:
+    """
+    Collects scenarios from concurrent requests and prices them together.
+    A batch is flushed when it reaches max_batch scenarios or max_wait seconds
+    after its first scenario arrived.
+    """
+
+    def __init__(self, max_batch=1024, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.batched_scenarios = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def price(self, scenarios):
+        """Queue a request's scenarios and wait for their results"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((scenarios, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            scenarios = [s for request_scenarios, _ in pending for s in request_scenarios]
+            try:
+                priced = price_scenarios(scenarios)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_scenarios += len(scenarios)
+            offset = 0
+            for request_scenarios, future in pending:
+                if not future.done():
+                    future.set_result(priced[offset:offset + len(request_scenarios)])
+                offset += len(request_scenarios)
+
+
+class LatencyTracker:
+    """Rolling window of request latencies"""
+
+    def __init__(self, window=10_000):
+        self.requests = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, seconds, ok=True):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self._latencies.append(seconds)
+
+    def summary(self):
+        if not self._latencies:
+            return {'requests': self.requests, 'errors': self.errors, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(np.fromiter(self._latencies, float), [50, 99]) * 1000
+        return {'requests': self.requests, 'errors': self.errors,
+                'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3)}
+
+
+class PricingServer:
+    """Minimal HTTP/1.1 server (keep-alive, Content-Length bodies) around a MicroBatcher"""
+
+    def __init__(self, host='127.0.0.1', port=8765, max_batch=1024, max_wait=0.002):
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(max_batch=max_batch, max_wait=max_wait)
+        self.latency = LatencyTracker()
+        self._server = None
+
+    async def start(self):
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    def stats(self):
+        summary = self.latency.summary()
+        batches = self.batcher.batches
+        summary.update({
+            'batches': batches,
+            'mean_batch_size': round(self.batcher.batched_scenarios / batches, 2) if batches else None,
+        })
+        return summary
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                method, path = (parts[0], parts[1]) if len(parts) >= 2 else ('', '')
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                start = time.perf_counter()
+                status, payload = await self._route(method, path, body)
+                if path == '/price':
+                    self.latency.record(time.perf_counter() - start, ok=(status == 200))
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+        if path != '/price':
+            return 404, {'error': f'No route for {path}'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST /price'}
+
+        try:
+            payload = json.loads(body or b'null')
+            if isinstance(payload, dict) and 'scenarios' in payload:
+                if not isinstance(payload['scenarios'], list) or not payload['scenarios']:
+                    raise ValueError("scenarios must be a non-empty list")
+                if len(payload['scenarios']) > MAX_SCENARIOS_PER_REQUEST:
+                    raise ValueError(f"At most {MAX_SCENARIOS_PER_REQUEST:,} scenarios per request")
+                scenarios = [parse_scenario(s) for s in payload['scenarios']]
+                single = False
+            else:
+                scenarios = [parse_scenario(payload)]
+                single = True
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+        try:
+            priced = await self.batcher.price(scenarios)
+        except Exception as e:
+            return 500, {'error': f'Pricing failed: {e}'}
+        return 200, priced[0] if single else {'results': priced}
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Stay vs. Go pricing over local HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=1024, help="Largest micro-batch in scenarios")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help="How long a batch waits for more requests before pricing")
+    args = parser.parse_args(argv)
+
+    server = PricingServer(args.host, args.port, args.max_batch, args.max_wait_ms / 1000)
+    print(f"Pricing API listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
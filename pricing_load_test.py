@@ -0,0 +1,112 @@
+"""
+Load test for pricing_api.py.
+
+Opens keep-alive connections to a running pricing service, fires randomized
+single-scenario POST /price requests and reports throughput plus client-side
+p50/p99 latency alongside the server's own /stats.
+
+Usage:
+    python pricing_api.py --port 8765 &
+    python pricing_load_test.py --port 8765 --requests 20000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+
+def random_scenario(rng):
+    """A plausible single-lease pricing request"""
+    return {
+        'lease_term': rng.randint(3, 15),
+        'discount_rate': rng.choice([5.0, 6.0, 7.0, 8.0]),
+        'renewal_base_rent': round(rng.uniform(25, 45), 2),
+        'new_base_rent': round(rng.uniform(22, 42), 2),
+        'new_free_rent': rng.randint(0, 12),
+        'new_ti': round(rng.uniform(20, 90), 2),
+        'target_sf': rng.choice([10000, 20000, 40000]),
+    }
+
+
+async def _request(reader, writer, host, body):
+    writer.write((f"POST /price HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status_line.split()[1] == b'200'
+
+
+async def _client(host, port, n_requests, seed, latencies, failures):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            body = json.dumps(random_scenario(rng)).encode('utf-8')
+            start = time.perf_counter()
+            ok = await _request(reader, writer, host, body)
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                failures.append(1)
+    finally:
+        writer.close()
+
+
+async def _fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /stats HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def run_load_test(host, port, total_requests, concurrency, seed=0):
+    """Drive the server and return a summary dict"""
+    latencies, failures = [], []
+    per_client = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, n, seed + i, latencies, failures)
+                           for i, n in enumerate(per_client) if n))
+    elapsed = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {
+        'requests': len(latencies),
+        'failures': len(failures),
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'client_p50_ms': round(float(p50), 3),
+        'client_p99_ms': round(float(p99), 3),
+        'server': await _fetch_stats(host, port),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a running pricing_api.py instance")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--requests', type=int, default=10_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency, args.seed))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""
+Bulk deal-package export.
+
+Reads a portfolio file (CSV or Parquet, one row per deal, columns as for
+batch_runner.py) and writes one package per deal: an XLSX workbook and a
+self-contained HTML report. Each package has the summary metrics, the
+year-by-year table, the Year 1 breakdown, and the waterfall and cumulative
+charts. They are built by the same deal_report nodes as the page, so a package
+matches what the app shows for those inputs.
+
+Reports are rendered in a process pool. Rows are read in chunks, so only one
+chunk of deals is in flight at a time. Workbooks are written with openpyxl's
+write-only (streaming) mode, so memory stays flat for thousands of deals.
+Per-report timings go to report_timings.csv in the output folder, and the run
+ends with the total throughput.
+
+XLSX output requires openpyxl.
+
+Usage:
+    python report_export.py portfolio.csv reports/ --name-column tenant --workers 8
+    python report_export.py portfolio.csv reports/ --format html --plotlyjs cdn
+"""
+
+import argparse
+import csv
+import html
+import os
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import batch_runner
+import deal_report
+import lease_engine
+
+DEFAULT_CHUNK_SIZE = 1_000
+
+FORMATS = ('xlsx', 'html')
+
+# Graph nodes a package is built from
+REPORT_NODES = ('comparison_table', 'year1_breakdown', 'waterfall_values', 'waterfall_figure', 'cumulative_figure',
+                'decision_metrics', 'renewal_npv', 'relocation_npv', 'npv_savings', 'breakeven_month',
+                'upfront_investment', 'renewal_ner', 'relocation_ner')
+
+WATERFALL_LABELS = ("Stay Cost", "Rent Δ", "TI Benefit Δ", "Strategic Benefits", "Amortized Friction", "Go Cost")
+
+YEAR1_LABELS = (('base_rent', "Base Rent"), ('moving', "Moving/FF&E"), ('friction_turnover', "Friction + Turnover"),
+                ('ti', "TI Allowance (Benefit)"), ('benefits', "Strategic Benefits"))
+
+DOLLARS = '"$"#,##0'
+DOLLARS_PSF = '"$"#,##0.00'
+
+# One graph per worker process
+_graphs = {}
+
+
+def _require_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("XLSX export requires openpyxl: pip install openpyxl") from None
+    return openpyxl
+
+
+def safe_filename(name):
+    """A file name stem that is safe on every platform"""
+    stem = re.sub(r'[^\w.-]+', '_', str(name)).strip('._')
+    return stem[:100] or 'deal'
+
+
+def deal_values(inputs, monthly=False):
+    """Every node a package needs, for one deal's inputs"""
+    if monthly not in _graphs:
+        _graphs[monthly] = deal_report.page_graph(monthly)
+    batch = lease_engine.broadcast_inputs(inputs)
+    values = _graphs[monthly].evaluate(batch, REPORT_NODES)
+    values['lease_term'] = int(batch['lease_term'][0])
+    return values
+
+
+def summary_rows(values):
+    """(label, value, Excel number format) rows of the headline metrics"""
+    irr = float(values['decision_metrics']['incremental_irr'][0])
+    payback = float(values['decision_metrics']['discounted_payback_month'][0])
+    return [
+        ("NPV Savings (Go vs. Stay)", float(values['npv_savings'][0]), DOLLARS),
+        ("NPV Cost - Stay", float(values['renewal_npv'][0]), DOLLARS),
+        ("NPV Cost - Go", float(values['relocation_npv'][0]), DOLLARS),
+        ("Upfront Investment", float(values['upfront_investment'][0]), DOLLARS),
+        ("Breakeven", lease_engine.format_breakeven(values['breakeven_month'][0]), None),
+        ("Stay NER ($/PSF/yr)", float(values['renewal_ner'][0]), DOLLARS_PSF),
+        ("Go NER ($/PSF/yr)", float(values['relocation_ner'][0]), DOLLARS_PSF),
+        ("Incremental IRR (Go vs. Stay)", "N/A" if np.isnan(irr) else irr / 100, '0.0%'),
+        ("Discounted Payback", "Never" if np.isnan(payback) else lease_engine.format_breakeven(payback), None),
+    ]
+
+
+def write_workbook(path, name, values):
+    """Stream one deal's workbook to path with openpyxl's write-only mode"""
+    openpyxl = _require_openpyxl()
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.chart import BarChart, LineChart, Reference
+
+    workbook = openpyxl.Workbook(write_only=True)
+
+    def row(sheet, cells):
+        out = []
+        for value, number_format in cells:
+            cell = WriteOnlyCell(sheet, value=value)
+            if number_format and not isinstance(value, str):
+                cell.number_format = number_format
+            out.append(cell)
+        sheet.append(out)
+
+    summary = workbook.create_sheet("Summary")
+    summary.append([f"Stay vs. Go - {name}"])
+    summary.append([])
+    for label, value, number_format in summary_rows(values):
+        row(summary, [(label, None), (value, number_format)])
+
+    table = values['comparison_table']
+    years = workbook.create_sheet("Year by Year")
+    years.append(list(table.columns))
+    for record in table.itertuples(index=False):
+        row(years, [(int(record[0]), None)] + [(float(v), DOLLARS) for v in record[1:]])
+    chart = LineChart()
+    chart.title = "Cumulative Occupancy Cost"
+    chart.y_axis.title = "Cumulative Cost ($)"
+    chart.x_axis.title = "Year"
+    n_years = len(table)
+    for column in (3, 5):
+        chart.add_data(Reference(years, min_col=column, min_row=1, max_row=n_years + 1), titles_from_data=True)
+    chart.set_categories(Reference(years, min_col=1, min_row=2, max_row=n_years + 1))
+    years.add_chart(chart, "H2")
+
+    year1 = workbook.create_sheet("Year 1 Breakdown")
+    year1.append(["Component", "Stay (Renewal)", "Go (Relocate)"])
+    for key, label in YEAR1_LABELS:
+        stay, go = values['year1_breakdown'][key]
+        row(year1, [(label, None), (float(stay), DOLLARS), (float(go), DOLLARS)])
+
+    waterfall = workbook.create_sheet("Waterfall")
+    waterfall.append(["Step", "Annual Amount"])
+    for label, value in zip(WATERFALL_LABELS, values['waterfall_values']):
+        row(waterfall, [(label, None), (float(value), DOLLARS)])
+    chart = BarChart()
+    chart.title = f"Average Annual Cost Breakdown ({values['lease_term']}-Year Annuity)"
+    chart.legend = None
+    chart.add_data(Reference(waterfall, min_col=2, min_row=1, max_row=len(WATERFALL_LABELS) + 1),
+                   titles_from_data=True)
+    chart.set_categories(Reference(waterfall, min_col=1, min_row=2, max_row=len(WATERFALL_LABELS) + 1))
+    waterfall.add_chart(chart, "D2")
+
+    workbook.save(path)
+
+
+def write_html(path, name, values, plotlyjs='inline'):
+    """One deal's report as a single HTML file; plotlyjs='inline' embeds plotly.js, 'cdn' links it"""
+    table = values['comparison_table']
+    summary = ''.join(
+        f"<tr><th>{html.escape(label)}</th><td>{_format_value(value, number_format)}</td></tr>"
+        for label, value, number_format in summary_rows(values))
+    year1 = ''.join(
+        f"<tr><th>{html.escape(label)}</th>"
+        + ''.join(f"<td>{_format_value(float(v), DOLLARS)}</td>" for v in values['year1_breakdown'][key]) + "</tr>"
+        for key, label in YEAR1_LABELS)
+    table_html = table.to_html(index=False, border=0, classes='numbers',
+                               formatters={c: (lambda v: f"${v:,.0f}") for c in table.columns[1:]})
+    figures = [values['waterfall_figure'], values['cumulative_figure']]
+    charts = [fig.to_html(full_html=False, include_plotlyjs=('cdn' if plotlyjs == 'cdn' else True) if i == 0 else False)
+              for i, fig in enumerate(figures)]
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Stay vs. Go - {html.escape(str(name))}</title>
+<style>
+body {{ font-family: sans-serif; color: #1e293b; max-width: 1100px; margin: 2rem auto; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5rem; }}
+th, td {{ padding: 4px 12px; border-bottom: 1px solid #e2e8f0; text-align: right; }}
+th:first-child {{ text-align: left; }}
+</style></head><body>
+<h1>Stay vs. Go - {html.escape(str(name))}</h1>
+<h2>Executive Summary</h2><table>{summary}</table>
+{charts[0]}
+<h2>Cumulative Occupancy Cost ({values['lease_term']}-Year Projection)</h2>
+{charts[1]}
+<h2>Year 1 Cash Outflow Breakdown</h2>
+<table><tr><th></th><th>Stay (Renewal)</th><th>Go (Relocate)</th></tr>{year1}</table>
+<h2>Year-by-Year Comparison</h2>
+{table_html}
+</body></html>
+""")
+
+
+def _format_value(value, number_format):
+    if isinstance(value, str):
+        return html.escape(value)
+    if number_format == DOLLARS:
+        return f"${value:,.0f}"
+    if number_format == DOLLARS_PSF:
+        return f"${value:,.2f}"
+    if number_format == '0.0%':
+        return f"{value:.1%}"
+    return f"{value:,}"
+
+
+def export_one(name, inputs, output_dir, formats=FORMATS, monthly=False, plotlyjs='inline'):
+    """Write one deal's package; returns (name, seconds, bytes written, error or '')"""
+    start = time.perf_counter()
+    nbytes = 0
+    try:
+        values = deal_values(inputs, monthly)
+        stem = os.path.join(output_dir, safe_filename(name))
+        if 'xlsx' in formats:
+            write_workbook(f'{stem}.xlsx', name, values)
+            nbytes += os.path.getsize(f'{stem}.xlsx')
+        if 'html' in formats:
+            write_html(f'{stem}.html', name, values, plotlyjs)
+            nbytes += os.path.getsize(f'{stem}.html')
+    except Exception as e:
+        # One bad deal is logged in report_timings.csv; it must not stop the other reports
+        return name, time.perf_counter() - start, nbytes, f"{type(e).__name__}: {e}"
+    return name, time.perf_counter() - start, nbytes, ''
+
+
+def _export_args(args):
+    return export_one(*args)
+
+
+def iter_deals(input_path, chunk_size, name_column=None):
+    """Yield lists of (name, inputs) per chunk; names are made unique"""
+    seen = set()
+    row_number = 0
+    for chunk in batch_runner.read_chunks(input_path, chunk_size):
+        inputs = batch_runner.frame_inputs(chunk)
+        if name_column is None:
+            extra = [c for c in chunk.columns if c not in lease_engine.SCENARIO_DEFAULTS]
+            name_column = extra[0] if extra else ''
+        if name_column and name_column not in chunk:
+            raise ValueError(f"Name column '{name_column}' is not in the input")
+        deals = []
+        for i in range(len(chunk)):
+            row_number += 1
+            name = str(chunk[name_column].iloc[i]) if name_column else f"deal-{row_number:05d}"
+            stem = safe_filename(name)
+            # A suffixed name can itself be taken ("A", "A", "A-2"), so count up until it's free
+            base, suffix = name, row_number
+            while stem in seen:
+                name = f"{base}-{suffix}"
+                stem = safe_filename(name)
+                suffix += 1
+            seen.add(stem)
+            deals.append((name, {k: v[i].item() for k, v in inputs.items()}))
+        yield deals
+
+
+def run_export(input_path, output_dir, formats=FORMATS, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+               name_column=None, monthly=False, plotlyjs='inline'):
+    """
+    Write a package per deal into output_dir and report_timings.csv beside them.
+    Returns counts, total seconds, reports/s and per-report p50/p95 seconds.
+    """
+    if 'xlsx' in formats:
+        _require_openpyxl()
+    os.makedirs(output_dir, exist_ok=True)
+    timings = []
+    failures = 0
+    nbytes = 0
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with open(os.path.join(output_dir, 'report_timings.csv'), 'w', newline='') as log:
+            writer = csv.writer(log)
+            writer.writerow(['deal', 'seconds', 'bytes', 'error'])
+            for deals in iter_deals(input_path, chunk_size, name_column):
+                args = [(name, inputs, output_dir, formats, monthly, plotlyjs) for name, inputs in deals]
+                if pool is not None:
+                    done = pool.map(_export_args, args, chunksize=max(1, len(args) // (workers * 4)))
+                else:
+                    done = map(_export_args, args)
+                for name, seconds, size, error in done:
+                    writer.writerow([name, f'{seconds:.6f}', size, error])
+                    timings.append(seconds)
+                    nbytes += size
+                    failures += bool(error)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    total = time.perf_counter() - start
+    timings.sort()
+    return {
+        'reports': len(timings),
+        'failures': failures,
+        'bytes': nbytes,
+        'seconds': total,
+        'reports_per_second': len(timings) / total if total > 0 else float('inf'),
+        'p50_seconds': statistics.median(timings) if timings else 0.0,
+        'p95_seconds': timings[int(0.95 * (len(timings) - 1))] if timings else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write an XLSX/HTML deal package for every row of a portfolio")
+    parser.add_argument('input', help="CSV or Parquet file, one row per deal")
+    parser.add_argument('output_dir', help="Folder for the packages and report_timings.csv")
+    parser.add_argument('--format', choices=FORMATS + ('both',), default='both')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Deals read and dispatched at a time (default {DEFAULT_CHUNK_SIZE:,})")
+    parser.add_argument('--name-column', help="Column used to name each package (default: first non-input column)")
+    parser.add_argument('--monthly', action='store_true', help="Use the monthly cash-flow engine")
+    parser.add_argument('--plotlyjs', choices=('inline', 'cdn'), default='inline',
+                        help="Embed plotly.js in every HTML report (self-contained) or load it from the CDN")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be positive")
+    formats = FORMATS if args.format == 'both' else (args.format,)
+    try:
+        stats = run_export(args.input, args.output_dir, formats, args.workers, args.chunk_size,
+                           args.name_column, args.monthly, args.plotlyjs)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Wrote {stats['reports'] - stats['failures']:,} packages ({stats['bytes'] / 1e6:,.1f} MB) "
+          f"in {stats['seconds']:.2f}s ({stats['reports_per_second']:,.1f} reports/s) -> {args.output_dir}")
+    print(f"Per report: p50 {stats['p50_seconds'] * 1000:,.0f}ms, p95 {stats['p95_seconds'] * 1000:,.0f}ms")
+    if stats['failures']:
+        print(f"{stats['failures']:,} reports failed - see report_timings.csv", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
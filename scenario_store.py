@@ -0,0 +1,248 @@
+"""
+Persistent scenario store and content-addressed result cache on SQLite.
+
+Named scenarios are saved with their sidebar inputs and indexed by client, deal
+and deal date, so a deal can be reopened instead of retyped. Engine results
+(cash-flow arrays, NPVs, breakeven) are stored separately under a canonical hash
+of the inputs (result_cache.input_key). Any session that reaches a known set of
+inputs, whether by loading a scenario or by typing the same numbers, gets its
+results from one primary-key lookup instead of recomputing them.
+
+The result table is bounded by total payload bytes. When a write takes it over
+max_bytes, the least recently used results are evicted until it is back under 90%. The store keeps a
+running byte total, so a write doesn't have to sum the table. That total only sees
+this process's writes, so it is recounted before evicting.
+
+Only the standard library and numpy are used. Arrays are stored as .npz blobs
+(no pickle), so a result loaded from disk is bit-identical to the computed one.
+"""
+
+import io
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import result_cache
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Part of every result key; bump it when the engine math changes so results
+# stored by older code are never served
+RESULTS_VERSION = 2
+
+# A cache hit refreshes last_used at most this often, so hot reads rarely write
+TOUCH_INTERVAL = 60.0
+
+# Eviction frees down to this share of max_bytes, so a full store recounts its bytes
+# every few writes rather than on each one
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    client TEXT NOT NULL,
+    deal TEXT NOT NULL,
+    name TEXT NOT NULL,
+    deal_date TEXT,
+    monthly INTEGER NOT NULL DEFAULT 0,
+    inputs TEXT NOT NULL,
+    result_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (client, deal, name)
+);
+CREATE INDEX IF NOT EXISTS scenarios_client_deal_date ON scenarios (client, deal, deal_date);
+CREATE INDEX IF NOT EXISTS scenarios_deal_date ON scenarios (deal_date);
+
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    engine TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def result_key(engine, inputs):
+    """Content address of an engine's results for one set of inputs"""
+    return result_cache.input_key(f'results:v{RESULTS_VERSION}:{engine}', inputs)
+
+
+def _to_json(value):
+    """Sidebar values as plain JSON types"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def pack_results(results):
+    """Serialize a dict of arrays to an .npz blob"""
+    buffer = io.BytesIO()
+    np.savez(buffer, **{name: np.asarray(value) for name, value in results.items()})
+    return buffer.getvalue()
+
+
+def unpack_results(payload):
+    """Inverse of pack_results"""
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+class ScenarioStore:
+    """Thread-safe SQLite store shared by every session in the process"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            if path != ':memory:':
+                # Readers in other processes don't block the writer
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self._bytes = self._total_bytes()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Scenarios
+
+    def save_scenario(self, client, deal, name, inputs, deal_date=None, monthly=False):
+        """Insert or overwrite the scenario (client, deal, name); returns its id"""
+        client, deal, name = (str(v).strip() for v in (client, deal, name))
+        if not (client and deal and name):
+            raise ValueError("Client, deal and scenario name are required")
+        inputs = {k: _to_json(v) for k, v in inputs.items()}
+        key = result_key('monthly' if monthly else 'annual', inputs)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO scenarios
+                       (client, deal, name, deal_date, monthly, inputs, result_key, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (client, deal, name) DO UPDATE SET
+                       deal_date = excluded.deal_date, monthly = excluded.monthly, inputs = excluded.inputs,
+                       result_key = excluded.result_key, updated_at = excluded.updated_at""",
+                (client, deal, name, deal_date and str(deal_date), int(bool(monthly)),
+                 json.dumps(inputs, sort_keys=True), key, now, now))
+            row = self._conn.execute('SELECT id FROM scenarios WHERE client = ? AND deal = ? AND name = ?',
+                                     (client, deal, name)).fetchone()
+        return row['id']
+
+    def list_scenarios(self, client=None, deal=None, since=None, until=None):
+        """Saved scenarios (without inputs), newest deal date first, optionally filtered"""
+        clauses, params = [], []
+        for column, op, value in (('client', '=', client), ('deal', '=', deal),
+                                  ('deal_date', '>=', since), ('deal_date', '<=', until)):
+            if value is not None:
+                clauses.append(f'{column} {op} ?')
+                params.append(str(value))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT id, client, deal, name, deal_date, monthly, updated_at FROM scenarios {where}
+                    ORDER BY client, deal, deal_date DESC, name""", params).fetchall()
+        return [dict(row, monthly=bool(row['monthly'])) for row in rows]
+
+    def clients(self):
+        """Distinct clients with at least one saved scenario"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT DISTINCT client FROM scenarios ORDER BY client')]
+
+    def load_scenario(self, scenario_id):
+        """One scenario with its inputs, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM scenarios WHERE id = ?', (scenario_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(row, monthly=bool(row['monthly']), inputs=json.loads(row['inputs']))
+
+    def delete_scenario(self, scenario_id):
+        with self._lock:
+            self._conn.execute('DELETE FROM scenarios WHERE id = ?', (scenario_id,))
+
+    # Results
+
+    def get_results(self, key):
+        """Stored results for a content key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT payload, last_used FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if now - row['last_used'] > TOUCH_INTERVAL:
+                self._conn.execute('UPDATE results SET last_used = ? WHERE key = ?', (now, key))
+        return unpack_results(row['payload'])
+
+    def put_results(self, key, engine, results):
+        """Store results under key (replacing any stored there), then evict least recently used results beyond max_bytes"""
+        payload = pack_results(results)
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute('SELECT nbytes FROM results WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                """INSERT INTO results (key, engine, payload, nbytes, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET payload = excluded.payload, nbytes = excluded.nbytes,
+                                                   last_used = excluded.last_used""",
+                (key, engine, payload, len(payload), now, now))
+            self._bytes += len(payload) - (replaced[0] if replaced else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _total_bytes(self):
+        return self._conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM results').fetchone()[0]
+
+    def _evict(self):
+        # Other processes write to the same file, so recount before deciding what to drop
+        self._bytes = self._total_bytes()
+        if self._bytes <= self.max_bytes:
+            return
+        stale = []
+        for key, nbytes in self._conn.execute('SELECT key, nbytes FROM results ORDER BY last_used'):
+            if self._bytes <= self.max_bytes * EVICT_TO:
+                break
+            stale.append((key,))
+            self._bytes -= nbytes
+        self._conn.executemany('DELETE FROM results WHERE key = ?', stale)
+        self.evictions += len(stale)
+
+    def clear_results(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for monitoring, in the same shape as LRUCache.stats()"""
+        with self._lock:
+            size, nbytes = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results').fetchone()
+            scenarios = self._conn.execute('SELECT COUNT(*) FROM scenarios').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'bytes': nbytes,
+            'max_bytes': self.max_bytes,
+            'scenarios': scenarios,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,67 @@
+"""
+Sensitivity analysis on the vectorized engine.
+
+npv_grid prices a 2-D grid of two inputs as one broadcast batch; tornado prices
+every +/- X% one-at-a-time shock in a single batch. Both take the engine to price
+with (lease_engine.evaluate_scenarios or monthly_engine.evaluate_monthly).
+"""
+
+import numpy as np
+
+import lease_engine
+
+# Inputs that can be varied (lease_term and the mode toggle are structural)
+SENSITIVITY_INPUTS = tuple(name for name in lease_engine.SCENARIO_FIELDS
+                           if name not in ('industrial_mode', 'lease_term'))
+
+# Heat map scenarios priced per batch; the monthly engine holds (N, 12 * term) matrices
+GRID_CHUNK_SIZE = 50_000
+
+
+def _check_inputs(*names):
+    for name in names:
+        if name not in SENSITIVITY_INPUTS:
+            raise ValueError(f"{name} is not a sensitivity input")
+
+
+def npv_grid(base_inputs, x_name, x_values, y_name, y_values, evaluate=lease_engine.evaluate_scenarios):
+    """NPV savings over an x/y grid, returned as a (len(y_values), len(x_values)) array"""
+    _check_inputs(x_name, y_name)
+    if x_name == y_name:
+        raise ValueError("Heat map axes must be two different inputs")
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+
+    rows = max(1, GRID_CHUNK_SIZE // max(1, len(x_values)))
+    blocks = []
+    for start in range(0, len(y_values), rows):
+        inputs = dict(base_inputs)
+        inputs[x_name] = x_values[None, :]
+        inputs[y_name] = y_values[start:start + rows, None]
+        blocks.append(evaluate(**inputs)['npv_savings'].reshape(-1, len(x_values)))
+    return np.concatenate(blocks) if blocks else np.empty((0, len(x_values)))
+
+
+def tornado(base_inputs, names, pct, evaluate=lease_engine.evaluate_scenarios):
+    """
+    NPV savings with each input shocked down and up by pct percent, one at a time.
+    Returns rows of (name, npv_low, npv_high) sorted by swing, largest first.
+    Inputs whose base value is zero cannot move and are left out.
+    """
+    _check_inputs(*names)
+    names = [name for name in names
+             if float(base_inputs.get(name, lease_engine.SCENARIO_DEFAULTS[name])) != 0]
+    if not names:
+        return []
+
+    batch = lease_engine.broadcast_inputs(base_inputs)
+    n = 2 * len(names)
+    inputs = {name: np.repeat(values, n) for name, values in batch.items()}
+    for i, name in enumerate(names):
+        base = inputs[name][0]
+        inputs[name][2 * i] = base * (1 - pct / 100)
+        inputs[name][2 * i + 1] = base * (1 + pct / 100)
+
+    npv_savings = evaluate(**inputs)['npv_savings'].reshape(-1, 2)
+    rows = [(name, float(low), float(high)) for name, (low, high) in zip(names, npv_savings)]
+    return sorted(rows, key=lambda row: abs(row[2] - row[1]), reverse=True)
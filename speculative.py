@@ -0,0 +1,208 @@
+"""
+Speculative background precomputation of neighbouring slider steps.
+
+Sidebar sliders move in fixed steps, so after a rerun the next value is most
+likely one step either side of the slider the user just moved. Precomputer
+prices those neighbouring scenarios on a small thread pool shared by every
+session. The results go into the shared section cache and the scenario store, so
+the next drag is a cache hit instead of a recompute.
+
+Speculative work is bounded per session:
+- A session has at most one batch queued or running. A new submit cancels the
+  previous batch, and a running batch stops before its next scenario.
+- Each session has a CPU budget (thread CPU seconds per rolling window). A
+  session over budget gets no speculation until its window rolls over, so one
+  busy user can't take the pool from the others.
+
+Hit counters track predictions: a submit whose current inputs were precomputed
+by the session's previous batch counts as a hit. A job that raises is logged and
+counted as failed, and the batch moves on to its next scenario.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import dependency_graph
+import lease_engine
+import scenario_store
+
+DEFAULT_WORKERS = 2
+CPU_BUDGET = 2.0
+BUDGET_WINDOW = 60.0
+
+# Sessions idle this long are forgotten
+SESSION_TTL = 1800.0
+
+logger = logging.getLogger(__name__)
+
+
+def neighbours(inputs, name, low, high, step, radius=1):
+    """Copies of inputs with name moved 1..radius steps down and up, kept within [low, high]"""
+    value = inputs[name]
+    found = []
+    for k in range(1, radius + 1):
+        for sign in (1, -1):
+            # Rounded so 0.25-step floats land on the same values the slider produces
+            moved = round(value + sign * k * step, 10)
+            if low <= moved <= high:
+                found.append(dict(inputs, **{name: type(value)(moved)}))
+    return found
+
+
+def warm(graph, inputs, cache, store=None, engine=None, engine_keys=()):
+    """
+    Price one scenario ahead of time: every shared node of graph into cache, and the
+    engine results those needed into the store (under the same key the page looks up)
+    """
+    evaluator = dependency_graph.Evaluator(graph, cache=cache)
+    evaluator.update(lease_engine.broadcast_inputs(inputs))
+    stored = None
+    if store is not None:
+        key = scenario_store.result_key(engine, inputs)
+        stored = store.get_results(key)
+        if stored is not None:
+            evaluator.preload(stored)
+    for name, node in graph.nodes.items():
+        if node.shared:
+            evaluator[name]
+    # Only the engine results the shared nodes needed, as the page itself stores
+    if store is not None and (stored is None or any(name in engine_keys for name in evaluator.computed)):
+        evaluated = {name: evaluator.values[name] for name in engine_keys if name in evaluator.values}
+        if evaluated:
+            store.put_results(key, engine, evaluated)
+
+
+class _Session:
+    def __init__(self):
+        self.future = None
+        self.cancelled = threading.Event()
+        self.keys = frozenset()
+        self.cpu = deque()
+        self.last_seen = 0.0
+
+    def cpu_used(self, now, window):
+        while self.cpu and self.cpu[0][0] < now - window:
+            self.cpu.popleft()
+        return sum(seconds for _, seconds in self.cpu)
+
+
+class Precomputer:
+    """Thread pool for speculative jobs, with per-session cancellation and CPU budgets"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, cpu_budget=CPU_BUDGET, window=BUDGET_WINDOW):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.cpu_budget = cpu_budget
+        self.window = window
+        self.hits = 0
+        self.misses = 0
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.throttled = 0
+        self.failed = 0
+        self.cpu_seconds = 0.0
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='speculative')
+
+    def submit(self, session_id, key, jobs):
+        """
+        Replace the session's speculative work with jobs, a dict of {content key: zero-argument callable}.
+
+        key is the content key of the inputs the session just reached; it counts as a
+        hit when the previous batch precomputed it. Returns False when the session is
+        over its CPU budget and nothing was queued.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            session = self._sessions.setdefault(session_id, _Session())
+            session.last_seen = now
+            if key in session.keys:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._cancel(session)
+            if session.cpu_used(now, self.window) >= self.cpu_budget:
+                self.throttled += 1
+                session.keys = frozenset()
+                return False
+            if not jobs:
+                session.keys = frozenset()
+                return True
+            session.cancelled = threading.Event()
+            session.keys = frozenset(jobs)
+            session.future = self._pool.submit(self._run, session, session.cancelled, list(jobs.values()))
+            self.submitted += len(jobs)
+        return True
+
+    def cancel(self, session_id):
+        """Drop a session's queued work and stop its running batch"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._cancel(session)
+
+    def _cancel(self, session):
+        # Called with the lock held
+        session.cancelled.set()
+        if session.future is not None and session.future.cancel():
+            self.cancelled += len(session.keys)
+        session.future = None
+
+    def _run(self, session, cancelled, jobs):
+        for i, job in enumerate(jobs):
+            now = time.monotonic()
+            with self._lock:
+                stop = cancelled.is_set() or session.cpu_used(now, self.window) >= self.cpu_budget
+                if stop:
+                    self.cancelled += len(jobs) - i
+            if stop:
+                return
+            start = time.thread_time()
+            try:
+                job()
+            except Exception:
+                # Speculation is best-effort: one bad scenario must not end the batch
+                logger.exception("Speculative precompute failed")
+                with self._lock:
+                    self.failed += 1
+            finally:
+                seconds = time.thread_time() - start
+                with self._lock:
+                    session.cpu.append((time.monotonic(), seconds))
+                    self.cpu_seconds += seconds
+                    self.completed += 1
+
+    def _prune(self, now):
+        idle = [sid for sid, s in self._sessions.items()
+                if now - s.last_seen > SESSION_TTL and (s.future is None or s.future.done())]
+        for sid in idle:
+            del self._sessions[sid]
+
+    def stats(self):
+        """Counters for monitoring, in the same shape as LRUCache.stats() (hits are correct predictions)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'sessions': len(self._sessions),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'throttled': self.throttled,
+                'failed': self.failed,
+                'cpu_seconds': round(self.cpu_seconds, 6),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            for session in self._sessions.values():
+                self._cancel(session)
+        self._pool.shutdown(wait=True)
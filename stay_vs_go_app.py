@@ -1,7 +1,49 @@
+import functools
+import os
+import uuid
+
 import streamlit as st
-import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
+
+import perf
+
+# numpy, pandas and the engine modules are imported further down, after login and
+# next to the sections that need them, so the login page and the sidebar paint
+# without waiting for them on a cold container (streamlit itself loads plotly)
+
+# Performance instrumentation - spans are always timed (cheap); the debug panel,
+# payload sizes and export are opt-in via ?perf=1 or the HHI_PERF_* env vars
+PERF_EXPORT_PATH = os.environ.get('HHI_PERF_EXPORT')
+PERF_EXPORT_INTERVAL = float(os.environ.get('HHI_PERF_EXPORT_INTERVAL', 10))
+PERF_PORT = os.environ.get('HHI_PERF_PORT')
+
+# Saved scenarios and stored results (SQLite), bounded to HHI_RESULT_CACHE_MB of results
+SCENARIO_DB_PATH = os.environ.get('HHI_SCENARIO_DB',
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios.db'))
+RESULT_CACHE_MB = float(os.environ.get('HHI_RESULT_CACHE_MB', 256))
+
+# Speculative precompute of the next slider steps; 0 workers turns it off. Each session
+# may use HHI_SPECULATIVE_CPU seconds of background CPU per minute
+SPECULATIVE_WORKERS = int(os.environ.get('HHI_SPECULATIVE_WORKERS', 2))
+SPECULATIVE_CPU = float(os.environ.get('HHI_SPECULATIVE_CPU', 2.0))
+
+# Lease comps index built by lease_comps.py; the Market Comps panel shows only when it exists
+COMPS_INDEX_PATH = os.environ.get('HHI_COMPS_INDEX',
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comps_index'))
+
+
+@st.cache_resource(show_spinner=False)
+def get_perf_recorder():
+    """Process-wide rolling timings, with the optional /metrics endpoint started once"""
+    recorder = perf.PerfRecorder()
+    if PERF_PORT:
+        perf.serve_metrics(recorder, port=int(PERF_PORT))
+    return recorder
+
+
+perf_recorder = get_perf_recorder()
+perf_debug = st.query_params.get('perf') == '1' or os.environ.get('HHI_PERF_DEBUG') == '1'
+perf_active = perf_debug or bool(PERF_EXPORT_PATH or PERF_PORT)
+perf_run = perf_recorder.start_run()
 
 # Password protection
 if 'authenticated' not in st.session_state:
@@ -61,41 +103,122 @@ st.title("🏢 HHI Strategic Decision Engine")
 st.markdown("### Commercial Real Estate Decision Analysis")
 st.markdown("---")
 
+
+def show_figure(name, fig):
+    """Render a Plotly figure inside a timing span, recording its JSON payload size when profiling"""
+    with perf_run.span(f'{name}.render'):
+        st.plotly_chart(fig, use_container_width=True)
+    if perf_active:
+        perf_run.payload(name, payloads.figure_bytes(fig))
+
+
+def show_table(name, df, **kwargs):
+    """
+    Render a DataFrame inside a timing span, recording its Arrow payload size when profiling.
+    Tables longer than payloads.PAGE_ROWS are sent one page at a time.
+    """
+    if len(df) > payloads.PAGE_ROWS:
+        n_pages = -(-len(df) // payloads.PAGE_ROWS)
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1,
+                               key=f"{name}_page_{n_pages}")
+        start, stop = payloads.page_bounds(len(df), page)
+        st.caption(f"Rows {start + 1:,}–{stop:,} of {len(df):,}")
+        df = df.iloc[start:stop]
+    with perf_run.span(f'{name}.render'):
+        st.dataframe(df, **kwargs)
+    if perf_active:
+        perf_run.payload(name, payloads.table_bytes(df))
+
+# Risk-mode distribution widgets
+def distribution_input(label, name, value):
+    """Risk-mode widgets for one uncertain input; returns a distribution spec or None when fixed"""
+    kind = st.selectbox(label, ["Fixed", "Triangular", "Normal", "Uniform"], key=f"mc_kind_{name}")
+    value = float(value)
+    spread = max(abs(value) * 0.1, 1.0)
+    if kind == "Fixed":
+        return None
+    if kind == "Triangular":
+        low_col, mode_col, high_col = st.columns(3)
+        low = low_col.number_input("Low", value=value - spread, key=f"mc_low_{name}")
+        mode = mode_col.number_input("Mode", value=value, key=f"mc_mode_{name}")
+        high = high_col.number_input("High", value=value + spread, key=f"mc_high_{name}")
+        return ('triangular', low, mode, high)
+    if kind == "Normal":
+        mean_col, std_col = st.columns(2)
+        mean = mean_col.number_input("Mean", value=value, key=f"mc_mean_{name}")
+        std = std_col.number_input("Std Dev", min_value=0.0, value=spread, key=f"mc_std_{name}")
+        return ('normal', mean, std)
+    low_col, high_col = st.columns(2)
+    low = low_col.number_input("Low", value=value - spread, key=f"mc_low_{name}")
+    high = high_col.number_input("High", value=value + spread, key=f"mc_high_{name}")
+    return ('uniform', low, high)
+
+
+# Saved scenarios - loading one stores its inputs and bumps the generation, which gives every
+# sidebar widget a fresh key so it starts from the loaded value instead of the user's last edit
+loaded_inputs = st.session_state.get('loaded_inputs', {})
+scenario_generation = st.session_state.get('scenario_generation', 0)
+
+
+def saved_value(name, default):
+    """Sidebar default, or the value from the loaded scenario (cast to the widget's type)"""
+    return type(default)(loaded_inputs.get(name, default))
+
+
+def sidebar_key(name):
+    return f"sidebar_{name}_{scenario_generation}"
+
+
+def free_rent_value(name, default, max_free_rent):
+    """
+    Free-rent default, clamped to the current cap. Leaving monthly mode lowers the cap, and
+    Streamlit would otherwise reset an out-of-range widget to its default instead of the cap.
+    """
+    current = st.session_state.get(sidebar_key(name), saved_value(name, default))
+    if current > max_free_rent:
+        st.session_state.pop(sidebar_key(name), None)
+    return min(current, max_free_rent)
+
+
 # Sidebar
+perf_run.section('sidebar')
 with st.sidebar:
     st.header("HHI Team | Commercial Real Estate")
     st.markdown("---")
 
     # Industrial Mode Toggle
-    industrial_mode = st.toggle("🏭 Industrial Mode", value=False,
+    industrial_mode = st.toggle("🏭 Industrial Mode", value=saved_value('industrial_mode', False), key=sidebar_key('industrial_mode'),
                                 help="Switch to industrial/warehouse analysis with machinery costs and operational downtime")
 
     st.markdown("---")
     st.subheader("⚙️ Lease Parameters")
-    lease_term = st.number_input("Lease Term (Years)", min_value=1, max_value=20, value=10, step=1,
+    lease_term = st.number_input("Lease Term (Years)", min_value=1, max_value=20, value=saved_value('lease_term', 10), key=sidebar_key('lease_term'), step=1,
                                  help="Length of the lease term for analysis")
-    discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=15.0, value=7.0, step=0.5,
+    discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=15.0, value=saved_value('discount_rate', 7.0), key=sidebar_key('discount_rate'), step=0.5,
                               help="Cost of capital for NPV calculation")
-    escalation_rate = st.slider("Annual Rent Escalation (%)", min_value=0.0, max_value=5.0, value=3.0, step=0.25)
+    escalation_rate = st.slider("Annual Rent Escalation (%)", min_value=0.0, max_value=5.0, value=saved_value('escalation_rate', 3.0), key=sidebar_key('escalation_rate'), step=0.25)
+    monthly_mode = st.toggle("📅 Monthly Cash Flows", value=saved_value('monthly_mode', False), key=sidebar_key('monthly_mode'),
+                             help="Model rent month by month with monthly discounting, exact free-rent periods of any length and month-level breakeven.")
+    max_free_rent = lease_term * 12 if monthly_mode else 24
 
     st.markdown("---")
     st.subheader("📏 Space Requirements")
-    current_sf = st.number_input("Current Square Footage (Stay Scenario)", min_value=1000, value=20000, step=1000)
-    target_sf = st.number_input("Target Square Footage (Go Scenario)", min_value=1000, value=20000, step=1000,
+    current_sf = st.number_input("Current Square Footage (Stay Scenario)", min_value=1000, value=saved_value('current_sf', 20000), key=sidebar_key('current_sf'), step=1000)
+    target_sf = st.number_input("Target Square Footage (Go Scenario)", min_value=1000, value=saved_value('target_sf', 20000), key=sidebar_key('target_sf'), step=1000,
                                 help="Square footage for relocation (can be different for expansion/contraction)")
 
     st.markdown("---")
     st.subheader("📍 Scenario A: Stay (Renewal)")
-    renewal_base_rent = st.number_input("Renewal Base Rent ($/PSF)", min_value=0.0, value=35.0, step=0.50)
-    renewal_free_rent = st.number_input("Renewal Free Rent (Months)", min_value=0, max_value=24, value=2)
-    renewal_ti = st.number_input("Renewal TI Allowance ($/PSF)", min_value=0.0, value=5.0, step=1.0)
+    renewal_base_rent = st.number_input("Renewal Base Rent ($/PSF)", min_value=0.0, value=saved_value('renewal_base_rent', 35.0), key=sidebar_key('renewal_base_rent'), step=0.50)
+    renewal_free_rent = st.number_input("Renewal Free Rent (Months)", min_value=0, max_value=max_free_rent, value=free_rent_value('renewal_free_rent', 2, max_free_rent), key=sidebar_key('renewal_free_rent'))
+    renewal_ti = st.number_input("Renewal TI Allowance ($/PSF)", min_value=0.0, value=saved_value('renewal_ti', 5.0), key=sidebar_key('renewal_ti'), step=1.0)
 
     st.markdown("---")
     st.subheader("🚀 Scenario B: Go (Relocate)")
-    new_base_rent = st.number_input("New Base Rent ($/PSF)", min_value=0.0, value=30.0, step=0.50)
-    new_free_rent = st.number_input("New Free Rent (Months)", min_value=0, max_value=24, value=6)
-    new_ti = st.number_input("New TI Allowance ($/PSF)", min_value=0.0, value=60.0, step=1.0)
-    moving_costs_psf = st.number_input("Moving/FF&E Costs ($/PSF)", min_value=0.0, value=25.0, step=1.0)
+    new_base_rent = st.number_input("New Base Rent ($/PSF)", min_value=0.0, value=saved_value('new_base_rent', 30.0), key=sidebar_key('new_base_rent'), step=0.50)
+    new_free_rent = st.number_input("New Free Rent (Months)", min_value=0, max_value=max_free_rent, value=free_rent_value('new_free_rent', 6, max_free_rent), key=sidebar_key('new_free_rent'))
+    new_ti = st.number_input("New TI Allowance ($/PSF)", min_value=0.0, value=saved_value('new_ti', 60.0), key=sidebar_key('new_ti'), step=1.0)
+    moving_costs_psf = st.number_input("Moving/FF&E Costs ($/PSF)", min_value=0.0, value=saved_value('moving_costs_psf', 25.0), key=sidebar_key('moving_costs_psf'), step=1.0)
 
     st.markdown("---")
 
@@ -104,17 +227,17 @@ with st.sidebar:
         st.subheader("⚡ HHI Team Friction (Office)",
                     help="Quantifies the hidden cost of business disruption. Moving requires packing, IT downtime, and employee acclimation, which temporarily reduces billable hours or overall productivity.")
         productivity_loss_hours = st.slider("Productivity Loss per Employee (Hours)",
-                                           min_value=0, max_value=80, value=0, step=1)
-        headcount = st.number_input("Headcount", min_value=1, value=1, step=1)
-        avg_salary = st.number_input("Average Salary ($)", min_value=0, value=0, step=5000)
+                                           min_value=0, max_value=80, value=saved_value('productivity_loss_hours', 0), key=sidebar_key('productivity_loss_hours'), step=1)
+        headcount = st.number_input("Headcount", min_value=1, value=saved_value('headcount', 1), key=sidebar_key('headcount'), step=1)
+        avg_salary = st.number_input("Average Salary ($)", min_value=0, value=saved_value('avg_salary', 0), key=sidebar_key('avg_salary'), step=5000)
     else:
         st.subheader("🏭 HHI Team Friction (Industrial)",
                     help="Accounts for the hard operational downtime and the specialized capital expense of rigging and moving heavy machinery.")
         daily_revenue_loss = st.number_input("Daily Revenue/Production Value ($)",
-                                             min_value=0, value=0, step=5000,
+                                             min_value=0, value=saved_value('daily_revenue_loss', 0), key=sidebar_key('daily_revenue_loss'), step=5000,
                                              help="Average daily revenue or production value")
         machinery_rigging = st.number_input("Machinery Rigging & Electrical ($/SF)",
-                                           min_value=0.0, value=0.0, step=1.0,
+                                           min_value=0.0, value=saved_value('machinery_rigging', 0.0), key=sidebar_key('machinery_rigging'), step=1.0,
                                            help="One-time capital expense for moving machinery and electrical infrastructure")
 
     st.markdown("---")
@@ -124,167 +247,301 @@ with st.sidebar:
         with st.expander("🎯 HHI Team Strategic Drivers", expanded=False):
             st.markdown("**Driver A: Workforce Stability Index**")
             st.markdown("_One-time turnover risk from relocation_")
-            attrition_rate = st.slider("Estimated Attrition Rate (%)", min_value=0.0, max_value=50.0, value=0.0, step=1.0,
+            attrition_rate = st.slider("Estimated Attrition Rate (%)", min_value=0.0, max_value=50.0, value=saved_value('attrition_rate', 0.0), key=sidebar_key('attrition_rate'), step=1.0,
                                       help="The percentage of staff likely to resign due to the disruption of moving or a worsened commute.")
 
             st.markdown("**Driver B: Recruiting Velocity**")
             st.markdown("_Annual benefit from improved hiring speed_")
-            open_roles_per_year = st.number_input("Open Roles Per Year", min_value=0, value=0, step=1)
-            revenue_per_employee = st.number_input("Revenue Per Employee ($)", min_value=0, value=0, step=10000)
-            hiring_speed_boost = st.slider("Hiring Speed Boost (Days Faster)", min_value=0, max_value=90, value=0, step=5,
+            open_roles_per_year = st.number_input("Open Roles Per Year", min_value=0, value=saved_value('open_roles_per_year', 0), key=sidebar_key('open_roles_per_year'), step=1)
+            revenue_per_employee = st.number_input("Revenue Per Employee ($)", min_value=0, value=saved_value('revenue_per_employee', 0), key=sidebar_key('revenue_per_employee'), step=10000)
+            hiring_speed_boost = st.slider("Hiring Speed Boost (Days Faster)", min_value=0, max_value=90, value=saved_value('hiring_speed_boost', 0), key=sidebar_key('hiring_speed_boost'), step=5,
                                           help="The number of days saved in filling open roles because a higher-quality, upgraded workspace is more attractive to top candidates.")
 
             st.markdown("**Driver C: Commute Dividend**")
             st.markdown("_Annual value of recaptured commute time_")
-            commute_time_saved = st.slider("Avg Commute Time Saved (Minutes/Day)", min_value=0, max_value=120, value=0, step=5,
+            commute_time_saved = st.slider("Avg Commute Time Saved (Minutes/Day)", min_value=0, max_value=120, value=saved_value('commute_time_saved', 0), key=sidebar_key('commute_time_saved'), step=5,
                                           help="The average round-trip minutes saved per employee, per day, by moving the office closer to your core talent pool's geographic center.")
             st.caption("💡 Hourly wage calculated as: Annual Salary ÷ 2,080 hours")
 
-# Calculate Strategic Drivers
-def calculate_strategic_drivers():
-    """Calculate the three HHI Strategic Drivers"""
-    # Driver A: Workforce Stability Index (one-time cost)
-    turnover_risk = headcount * (attrition_rate / 100) * avg_salary * 1.5
+    st.markdown("---")
+
+    # Monte Carlo Risk Mode
+    with st.expander("🎲 Risk Simulation", expanded=False):
+        simulation_mode = st.toggle("Enable Monte Carlo", value=False,
+                                    help="Replace point estimates with distributions and report the range of NPV outcomes.")
+        distribution_specs = {}
+        if simulation_mode:
+            simulation_draws = st.select_slider("Simulation Draws", options=[10_000, 100_000, 250_000, 1_000_000],
+                                                value=100_000)
+            simulation_seed = st.number_input("Random Seed", min_value=0, value=42, step=1,
+                                              help="Same seed and inputs always reproduce the same results")
+            simulation_workers = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1,
+                                                 value=1, step=1,
+                                                 help="Split draws across a process pool (useful for 1M-draw runs)")
+
+            uncertain_inputs = [
+                ("Discount Rate (%)", 'discount_rate', discount_rate),
+                ("Annual Rent Escalation (%)", 'escalation_rate', escalation_rate),
+                ("Renewal Base Rent ($/PSF)", 'renewal_base_rent', renewal_base_rent),
+                ("New Base Rent ($/PSF)", 'new_base_rent', new_base_rent),
+                ("Renewal Free Rent (Months)", 'renewal_free_rent', renewal_free_rent),
+                ("New Free Rent (Months)", 'new_free_rent', new_free_rent),
+            ]
+            if not industrial_mode:
+                uncertain_inputs += [
+                    ("Estimated Attrition Rate (%)", 'attrition_rate', attrition_rate),
+                    ("Avg Commute Time Saved (Minutes/Day)", 'commute_time_saved', commute_time_saved),
+                ]
+            else:
+                uncertain_inputs += [
+                    ("Daily Revenue/Production Value ($)", 'daily_revenue_loss', daily_revenue_loss),
+                ]
+
+            for label, name, value in uncertain_inputs:
+                spec = distribution_input(label, name, value)
+                if spec is not None:
+                    distribution_specs[name] = spec
 
-    # Driver B: Recruiting Velocity (annual benefit)
-    days_revenue_per_role = revenue_per_employee / 250
-    recruiting_benefit = open_roles_per_year * days_revenue_per_role * hiring_speed_boost
+# Perform calculations (industrial inputs default to zero in office mode and vice versa)
+if not industrial_mode:
+    daily_revenue_loss, machinery_rigging = 0, 0.0
+else:
+    productivity_loss_hours, headcount, avg_salary = 0, 1, 0
+    attrition_rate, open_roles_per_year, revenue_per_employee = 0.0, 0, 0
+    hiring_speed_boost, commute_time_saved = 0, 0
+
+scenario_inputs = {
+    'industrial_mode': industrial_mode,
+    'lease_term': lease_term,
+    'discount_rate': discount_rate,
+    'escalation_rate': escalation_rate,
+    'current_sf': current_sf,
+    'target_sf': target_sf,
+    'renewal_base_rent': renewal_base_rent,
+    'renewal_free_rent': renewal_free_rent,
+    'renewal_ti': renewal_ti,
+    'new_base_rent': new_base_rent,
+    'new_free_rent': new_free_rent,
+    'new_ti': new_ti,
+    'moving_costs_psf': moving_costs_psf,
+    'productivity_loss_hours': productivity_loss_hours,
+    'headcount': headcount,
+    'avg_salary': avg_salary,
+    'daily_revenue_loss': daily_revenue_loss,
+    'machinery_rigging': machinery_rigging,
+    'attrition_rate': attrition_rate,
+    'open_roles_per_year': open_roles_per_year,
+    'revenue_per_employee': revenue_per_employee,
+    'hiring_speed_boost': hiring_speed_boost,
+    'commute_time_saved': commute_time_saved,
+}
+
+
+# Engine imports - numpy is first needed here
+perf_run.section('imports')
+import numpy as np
 
-    # Driver C: Commute Dividend (annual benefit)
-    hourly_wage = avg_salary / 2080
-    annual_work_days = 250
-    commute_benefit = headcount * (commute_time_saved / 60) * annual_work_days * hourly_wage
+import deal_report
+import dependency_graph
+import lease_comps
+import lease_engine
+import lease_metrics
+import monthly_engine
+import result_cache
+import scenario_store
+import speculative
+
+
+@st.cache_resource
+def get_section_cache():
+    """Process-wide LRU cache shared by every session"""
+    return result_cache.LRUCache(maxsize=512)
+
+
+@st.cache_resource
+def get_scenario_store():
+    """Process-wide SQLite scenario store and result cache"""
+    return scenario_store.ScenarioStore(SCENARIO_DB_PATH, max_bytes=int(RESULT_CACHE_MB * 1024 * 1024))
+
+
+@st.cache_resource
+def get_precomputer():
+    """Process-wide background pool for speculative slider steps, or None when turned off"""
+    if SPECULATIVE_WORKERS < 1:
+        return None
+    return speculative.Precomputer(SPECULATIVE_WORKERS, cpu_budget=SPECULATIVE_CPU)
+
+
+@st.cache_resource
+def get_comps_index():
+    """Comps index memory-mapped once per process, or None when there is none"""
+    if not os.path.exists(os.path.join(COMPS_INDEX_PATH, lease_comps.MANIFEST)):
+        return None
+    return lease_comps.CompsIndex(COMPS_INDEX_PATH)
+
+
+section_cache = get_section_cache()
+store = get_scenario_store()
+precomputer = get_precomputer()
+comps_index = get_comps_index()
+
+
+@st.cache_resource
+def get_page_graph(monthly):
+    """Page graph built once per process; figures and tables are shared across sessions"""
+    return deal_report.page_graph(monthly)
+
+
+# Each session keeps its own evaluated graph; a rerun recomputes only the nodes downstream
+# of the inputs that changed, and only when a section reads them
+perf_run.section('calculations')
+engine_name = 'monthly' if monthly_mode else 'annual'
+graph_key = f"scenario_graph_{engine_name}"
+if graph_key not in st.session_state:
+    st.session_state[graph_key] = dependency_graph.Evaluator(get_page_graph(monthly_mode), cache=section_cache)
+results = st.session_state[graph_key]
+engine_keys = monthly_engine.RESULT_KEYS if monthly_mode else lease_engine.RESULT_KEYS
+stored_key = scenario_store.result_key(engine_name, scenario_inputs)
+store_missed = False
+if results.update(lease_engine.broadcast_inputs(scenario_inputs)):
+    # Inputs any session has priced before come back from the store in one keyed lookup;
+    # new ones are priced lazily by the sections below and written back at the end of the run
+    with perf_run.span('calculations.store'):
+        stored_results = store.get_results(stored_key)
+        if stored_results is not None:
+            results.preload(stored_results)
+        else:
+            store_missed = True
 
-    return turnover_risk, recruiting_benefit, commute_benefit
+# Single scenario: take row 0 of every result
+turnover_risk = float(results['turnover_risk'][0])
+recruiting_benefit = float(results['recruiting_benefit'][0])
+commute_benefit = float(results['commute_benefit'][0])
+friction_cost = float(results['friction_cost'][0])
+moving_cost = float(results['moving_cost'][0])
 
-# Calculate friction cost
-def calculate_friction_cost():
-    """Calculate one-time HHI Team Friction penalty"""
-    if not industrial_mode:
-        # Office mode: Productivity loss
-        hourly_cost = avg_salary / 2080
-        friction = headcount * hourly_cost * productivity_loss_hours
-    else:
-        # Industrial mode: 2 weeks operational downtime + machinery costs
-        downtime_cost = daily_revenue_loss * 14
-        rigging_cost = machinery_rigging * target_sf
-        friction = downtime_cost + rigging_cost
+renewal_costs = results['renewal_costs'][0]
+relocation_costs = results['relocation_costs'][0]
+renewal_npv = float(results['renewal_npv'][0])
+relocation_npv = float(results['relocation_npv'][0])
+npv_savings = float(results['npv_savings'][0])
 
-    return friction
+# Cumulative costs
+renewal_cumulative = results['renewal_cumulative'][0]
+relocation_cumulative = results['relocation_cumulative'][0]
 
-# Calculate annual costs
-def calculate_annual_costs(base_rent, free_months, ti_allowance, sq_ft, term_years):
-    """
-    Calculate annual occupancy costs with escalation.
-    FIX 2: base_rent is $/PSF/year (annual), not monthly - removed * 12
-    FIX 3: Free rent can spill into Year 2 if > 12 months
-    """
-    annual_costs = []
-    current_rent = base_rent
-
-    for year in range(1, term_years + 1):
-        if year == 1:
-            # Year 1: Prorate for free months + TI benefit (one-time)
-            occupied_months_yr1 = max(0, 12 - free_months)
-            year_cost = (current_rent * sq_ft) * (occupied_months_yr1 / 12) - (ti_allowance * sq_ft)
-        elif year == 2 and free_months > 12:
-            # Year 2: Handle free rent spillover
-            spillover_months = free_months - 12
-            occupied_months_yr2 = max(0, 12 - spillover_months)
-            year_cost = (current_rent * sq_ft) * (occupied_months_yr2 / 12)
-        else:
-            # Years 2+ (or 3+ if spillover): Full year rent, no TI
-            year_cost = current_rent * sq_ft
+# Breakeven
+breakeven_display = lease_engine.format_breakeven(results['breakeven_month'][0])
+breakeven_month = None if np.isnan(results['breakeven_month'][0]) else float(results['breakeven_month'][0])
 
-        annual_costs.append(year_cost)
-        current_rent *= (1 + escalation_rate / 100)
+years = list(range(1, lease_term + 1))
 
-    return annual_costs
 
-# Calculate NPV
-def calculate_npv(cash_flows, discount_rate):
-    """Calculate Net Present Value of cash flows"""
-    npv = 0
-    for year, cf in enumerate(cash_flows, start=1):
-        npv += cf / ((1 + discount_rate / 100) ** year)
-    return npv
+def load_saved_scenario(scenario_id):
+    """Load button callback - runs before the next rerun draws the sidebar"""
+    scenario = store.load_scenario(scenario_id)
+    if scenario is not None:
+        st.session_state.loaded_inputs = dict(scenario['inputs'], monthly_mode=scenario['monthly'])
+        st.session_state.scenario_generation = scenario_generation + 1
 
-# Perform calculations
-if not industrial_mode:
-    turnover_risk, recruiting_benefit, commute_benefit = calculate_strategic_drivers()
-else:
-    # Industrial mode: No strategic drivers
-    turnover_risk, recruiting_benefit, commute_benefit = 0, 0, 0
 
-# Base costs
-renewal_costs = calculate_annual_costs(renewal_base_rent, renewal_free_rent, renewal_ti, current_sf, lease_term)
-relocation_costs = calculate_annual_costs(new_base_rent, new_free_rent, new_ti, target_sf, lease_term)
+perf_run.section('saved_scenarios')
+with st.sidebar:
+    st.markdown("---")
+    with st.expander("💾 Saved Scenarios", expanded=False):
+        tab_save, tab_open = st.tabs(["Save", "Open"])
+        with tab_save:
+            save_client = st.text_input("Client", key="save_client")
+            save_deal = st.text_input("Deal", key="save_deal")
+            save_name = st.text_input("Scenario Name", value="Base Case", key="save_name")
+            save_date = st.date_input("Deal Date", key="save_date")
+            if st.button("Save Scenario"):
+                try:
+                    store.save_scenario(save_client, save_deal, save_name, scenario_inputs,
+                                        deal_date=save_date.isoformat() if save_date else None, monthly=monthly_mode)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success(f"Saved {save_client.strip()} / {save_deal.strip()} / {save_name.strip()}")
+        with tab_open:
+            saved_clients = store.clients()
+            if not saved_clients:
+                st.caption("No saved scenarios yet.")
+            else:
+                open_client = st.selectbox("Client", saved_clients, key="open_client")
+                saved_scenarios = store.list_scenarios(client=open_client)
+                open_scenario = st.selectbox(
+                    "Scenario", saved_scenarios, key="open_scenario",
+                    format_func=lambda row: f"{row['deal']} · {row['name']} · {row['deal_date'] or 'undated'}")
+                col1, col2 = st.columns(2)
+                col1.button("Load", on_click=load_saved_scenario, args=(open_scenario['id'],))
+                if col2.button("Delete"):
+                    store.delete_scenario(open_scenario['id'])
+                    st.rerun()
 
-# FIX 2: Strategic Drivers - Stay is pure baseline, Go gets benefits
-# Stay: Pure baseline + turnover risk (Year 1 only)
-renewal_costs[0] += turnover_risk  # Both scenarios get turnover penalty
 
-# Go: Gets friction/moving/turnover (Year 1) - strategic benefits (annual savings)
-friction_cost = calculate_friction_cost()
-moving_cost = moving_costs_psf * target_sf
-total_relocation_penalty = friction_cost + moving_cost + turnover_risk
+def apply_comps(current_inputs, updates):
+    """Comps button callback - redraws the sidebar with the comp medians filled in"""
+    st.session_state.loaded_inputs = dict(current_inputs, **updates)
+    st.session_state.scenario_generation = scenario_generation + 1
 
-relocation_costs[0] += total_relocation_penalty  # One-time costs in Year 1
-for i in range(len(relocation_costs)):
-    relocation_costs[i] -= (recruiting_benefit + commute_benefit)  # Annual benefits
 
-# Calculate NPV for both scenarios
-renewal_npv = calculate_npv(renewal_costs, discount_rate)
-relocation_npv = calculate_npv(relocation_costs, discount_rate)
-npv_savings = renewal_npv - relocation_npv
+def comps_medians(comps, prefix):
+    """
+    Sidebar values for the Stay ('renewal') or Go ('new') rent inputs from a comps lookup,
+    clamped to the widgets' ranges; None when the comps leave any of them blank
+    """
+    if comps is None or any(comps[name] is None for name in lease_comps.METRICS):
+        return None
+    return {
+        f'{prefix}_base_rent': max(round(comps['base_rent'][1], 2), 0.0),
+        f'{prefix}_free_rent': min(max(int(round(comps['free_months'][1])), 0), max_free_rent),
+        f'{prefix}_ti': max(round(comps['ti'][1], 2), 0.0),
+    }
 
-# Cumulative costs
-renewal_cumulative = np.cumsum(renewal_costs)
-relocation_cumulative = np.cumsum(relocation_costs)
-
-# Breakeven - Fixed Logic
-breakeven_month = None
-breakeven_display = "Does Not Breakeven"  # Default
-
-for year in range(lease_term):
-    if relocation_cumulative[year] < renewal_cumulative[year]:
-        # Found the year where Go becomes cheaper than Stay
-        if year == 0:
-            # Go is cheaper immediately
-            breakeven_month = 0
-            breakeven_display = "Immediate"
-        else:
-            # Interpolate to find the exact month within the year
-            # At end of year-1: Go was more expensive
-            # At end of year: Go is less expensive
-            # Find the crossover point
-            gap_at_start = renewal_cumulative[year-1] - relocation_cumulative[year-1]  # Negative (Go is losing)
-            gap_at_end = renewal_cumulative[year] - relocation_cumulative[year]  # Positive (Go is winning)
-
-            # How much did Go gain during this year?
-            go_gain = renewal_costs[year] - relocation_costs[year]
-
-            if go_gain > 0:
-                # Calculate what fraction of the year it took to close the gap
-                fraction_of_year = abs(gap_at_start) / go_gain
-                breakeven_month = (year - 1) * 12 + (fraction_of_year * 12)
-                # Format the display
-                years = int(breakeven_month // 12)
-                months = int(breakeven_month % 12)
-                breakeven_display = f"{years}yr {months}mo"
+
+if comps_index is not None:
+    perf_run.section('market_comps')
+    with st.sidebar:
+        with st.expander("📊 Market Comps", expanded=False):
+            comps_submarket = st.selectbox("Submarket", comps_index.submarkets, key="comps_submarket")
+            comps_class = st.selectbox("Property Class", comps_index.classes_for(comps_submarket), key="comps_class")
+            comps_years = st.selectbox("Signed Within", [None, 1, 2, 3, 5], key="comps_years",
+                                       format_func=lambda years: "All dates" if years is None else f"Last {years} years")
+            comps_since = None
+            if comps_years is not None and comps_index.latest_date is not None:
+                comps_since = comps_index.latest_date - np.timedelta64(int(comps_years * 365.25), 'D')
+
+            go_comps = comps_index.lookup(comps_submarket, comps_class, target_sf, since=comps_since)
+            stay_comps = comps_index.lookup(comps_submarket, comps_class, current_sf, since=comps_since)
+            if go_comps is None:
+                st.caption("No comps match.")
             else:
-                breakeven_month = year * 12
-                years = int(breakeven_month // 12)
-                months = int(breakeven_month % 12)
-                breakeven_display = f"{years}yr {months}mo"
-        break
+                st.caption(f"{go_comps['count']:,} comps · {go_comps['band']} (Go, {target_sf:,} SF)")
+                comps_table = "| | P25 | Median | P75 |\n|---|---|---|---|\n"
+                for label, name, fmt in [("Rent", 'base_rent', "${:.2f}"), ("Free Months", 'free_months', "{:.1f}"),
+                                         ("TI", 'ti', "${:.2f}")]:
+                    cells = [fmt.format(v) for v in go_comps[name]] if go_comps[name] else ["n/a"] * 3
+                    comps_table += f"| {label} | " + " | ".join(cells) + " |\n"
+                st.markdown(comps_table)
+                current_inputs = dict(scenario_inputs, monthly_mode=monthly_mode)
+                go_medians = comps_medians(go_comps, 'new')
+                stay_medians = comps_medians(stay_comps, 'renewal')
+                col1, col2 = st.columns(2)
+                col1.button("Use for Go", on_click=apply_comps, args=(current_inputs, go_medians),
+                            disabled=go_medians is None,
+                            help="Set Go rent, free rent and TI to the comp medians for the target size")
+                col2.button("Use for Stay", on_click=apply_comps, args=(current_inputs, stay_medians),
+                            disabled=stay_medians is None,
+                            help="Set renewal rent, free rent and TI to the comp medians for the current size")
 
 # Key Insights - Option C
+perf_run.section('executive_summary')
 st.subheader("💡 Executive Summary")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    upfront_investment = friction_cost + moving_cost + max(0, relocation_costs[0] - renewal_costs[0])
+    upfront_investment = float(results['upfront_investment'][0])
     st.metric(
         label="Upfront Investment Required",
         value=f"${upfront_investment:,.0f}",
@@ -307,222 +564,539 @@ with col3:
         help=f"Net Present Value at {discount_rate}% discount rate"
     )
 
+# The headline KPIs are on screen; everything below builds on them
+perf_run.mark('first_metric')
+
+# Investment metrics - Go vs. Stay savings stream
+decision_metrics = results['decision_metrics']
+incremental_irr = decision_metrics['incremental_irr'][0]
+payback_month = decision_metrics['discounted_payback_month'][0]
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.metric(
+        label="Incremental IRR (Go vs. Stay)",
+        value="N/A" if np.isnan(incremental_irr) else f"{incremental_irr:.1f}%",
+        help="Return on the relocation outlay from the annual savings it produces. N/A when the savings never change sign (Go is cheaper, or dearer, every year)."
+    )
+
+with col2:
+    st.metric(
+        label="Discounted Payback",
+        value="Never" if np.isnan(payback_month) else lease_engine.format_breakeven(payback_month),
+        help=f"When cumulative savings discounted at {discount_rate}% turn positive"
+    )
+
+with col3:
+    st.metric(
+        label="Net Effective Rent (Stay / Go)",
+        value=f"${results['renewal_ner'][0]:,.2f} / ${results['relocation_ner'][0]:,.2f}",
+        help="Average rent paid per SF per year over the term, net of free rent and TI allowance"
+    )
+
 st.markdown("---")
 
+# pandas is only needed from here on (streamlit has already loaded plotly)
+perf_run.section('imports.charts')
+import pandas as pd
+import plotly.graph_objects as go
+
+import payloads
+
 # Waterfall Chart - Annual Annuity (Fixed: proper math and total bar)
+perf_run.section('waterfall')
 st.subheader("💰 Executive Summary: Annual Annuity Waterfall",
             help="This chart bridges the financial gap between staying and relocating. It amortizes one-time costs (like moving and TI) and strategic benefits over the entire lease term to reveal the true annualized financial impact.")
 
-# Calculate average annual costs (already includes all strategic drivers and costs)
-avg_stay_cost = sum(renewal_costs) / lease_term
-avg_go_cost = sum(relocation_costs) / lease_term
-
-# FIX 2: Calculate average annual base rent (base_rent is already annual $/PSF, remove * 12)
-stay_base_rent_total = 0
-go_base_rent_total = 0
-for year in range(lease_term):
-    # Stay scenario base rent with escalation (base_rent is annual)
-    stay_rent_this_year = renewal_base_rent * current_sf * ((1 + escalation_rate/100) ** year)
-    stay_base_rent_total += stay_rent_this_year
-
-    # Go scenario base rent with escalation (base_rent is annual)
-    go_rent_this_year = new_base_rent * target_sf * ((1 + escalation_rate/100) ** year)
-    go_base_rent_total += go_rent_this_year
-
-avg_stay_base_rent = stay_base_rent_total / lease_term
-avg_go_base_rent = go_base_rent_total / lease_term
-
-# FIX 4: Calculate average annual TI benefit (annualized over lease term)
-avg_ti_stay = (renewal_ti * current_sf) / lease_term
-avg_ti_go = (new_ti * target_sf) / lease_term
-
-# Build waterfall showing how we get from Stay to Go
-# The math: avg_stay_cost + deltas = avg_go_cost
-rent_delta = avg_go_base_rent - avg_stay_base_rent  # Positive = Go costs more
-ti_delta = -(avg_ti_go - avg_ti_stay)  # Negative = Go gets more benefit (annualized)
-strategic_benefit_delta = -(recruiting_benefit + commute_benefit)  # Negative = Go gets benefit
-amortized_friction_delta = (friction_cost + moving_cost) / lease_term  # Positive = Go pays more
-# Note: turnover_risk cancels out (both scenarios pay it)
-
-waterfall_values = [
-    avg_stay_cost,              # Starting point
-    rent_delta,                 # Rent difference (positive if Go is more expensive)
-    ti_delta,                   # TI benefit difference (negative if Go gets more)
-    strategic_benefit_delta,    # Strategic benefits (negative = savings)
-    amortized_friction_delta,   # One-time costs amortized (positive = cost)
-    avg_go_cost                 # Ending point (TOTAL)
-]
-
-waterfall_labels = [
-    "Stay Cost",
-    "Rent Δ",
-    "TI Benefit Δ",
-    "Strategic Benefits",
-    "Amortized Friction",
-    "Go Cost"
-]
-
-waterfall_text = [f"${v:,.0f}" for v in waterfall_values]
-
-# Set measure types: first is absolute, middle are relative, last is total
-waterfall_measures = ["absolute", "relative", "relative", "relative", "relative", "total"]
-
-fig_waterfall = go.Figure(go.Waterfall(
-    x=waterfall_labels,
-    y=waterfall_values,
-    measure=waterfall_measures,  # FIX 1: Last bar is now "total" so it anchors to x-axis
-    text=waterfall_text,
-    textposition="outside",
-    connector={"line": {"color": "rgb(63, 63, 63)"}},
-    decreasing={"marker": {"color": "#2ca02c"}},
-    increasing={"marker": {"color": "#d62728"}},
-    totals={"marker": {"color": "#1f77b4"}}
-))
-
-fig_waterfall.update_layout(
-    title=f"Average Annual Cost Breakdown ({lease_term}-Year Annuity)",
-    yaxis_title="Annual Cost ($)",
-    height=500,
-    showlegend=False
-)
+with perf_run.span('waterfall.build'):
+    fig_waterfall = results['waterfall_figure']
 
-st.plotly_chart(fig_waterfall, use_container_width=True)
+show_figure('waterfall', fig_waterfall)
 
 st.markdown("---")
 
 # Cumulative Cost Chart
+perf_run.section('cumulative')
 st.subheader(f"📈 Cumulative Occupancy Cost ({lease_term}-Year Projection)")
 
-years = list(range(1, lease_term + 1))
-fig_cumulative = go.Figure()
-
-fig_cumulative.add_trace(go.Scatter(
-    x=years,
-    y=renewal_cumulative,
-    name="Stay (Renewal)",
-    mode='lines+markers',
-    line=dict(color='#1f77b4', width=3),
-    marker=dict(size=8)
-))
-
-fig_cumulative.add_trace(go.Scatter(
-    x=years,
-    y=relocation_cumulative,
-    name="Go (Relocate)",
-    mode='lines+markers',
-    line=dict(color='#ff7f0e', width=3),
-    marker=dict(size=8)
-))
-
-if breakeven_month and breakeven_month <= (lease_term * 12):
-    breakeven_year = breakeven_month / 12
-    breakeven_cost = np.interp(breakeven_year, years, renewal_cumulative)
-    fig_cumulative.add_trace(go.Scatter(
-        x=[breakeven_year],
-        y=[breakeven_cost],
-        mode='markers+text',
-        name='Breakeven',
-        marker=dict(size=15, color='green', symbol='star'),
-        text=['Breakeven'],
-        textposition='top center'
-    ))
-
-fig_cumulative.update_layout(
-    xaxis_title="Year",
-    yaxis_title="Cumulative Cost ($)",
-    hovermode='x unified',
-    height=500,
-    showlegend=True
-)
+with perf_run.span('cumulative.build'):
+    fig_cumulative = results['cumulative_figure']
 
-fig_cumulative.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#e5e5e5')
-fig_cumulative.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#e5e5e5')
-
-st.plotly_chart(fig_cumulative, use_container_width=True)
+show_figure('cumulative', fig_cumulative)
 
 st.markdown("---")
 
 # Year 1 Breakdown
+perf_run.section('year1')
 st.subheader("💵 Year 1 Cash Outflow Breakdown")
 
-# FIX 1 & 2 & 3: Remove opportunity_cost_annual, fix rent multiplier, handle free rent proration
-renewal_year1_base = (renewal_base_rent * current_sf) * (max(0, 12 - renewal_free_rent) / 12)
-renewal_year1_ti = renewal_ti * current_sf
-renewal_year1_strategic = turnover_risk  # FIX 1: Removed opportunity_cost_annual
-
-relocation_year1_base = (new_base_rent * target_sf) * (max(0, 12 - new_free_rent) / 12)
-relocation_year1_ti = new_ti * target_sf
-relocation_year1_moving = moving_cost
-relocation_year1_friction = friction_cost
-relocation_year1_turnover = turnover_risk
-relocation_year1_benefits = recruiting_benefit + commute_benefit
-
-fig_year1 = go.Figure()
-
-fig_year1.add_trace(go.Bar(
-    name='Base Rent',
-    x=['Stay (Renewal)', 'Go (Relocate)'],
-    y=[renewal_year1_base, relocation_year1_base],
-    marker_color='#1f77b4'
-))
-
-fig_year1.add_trace(go.Bar(
-    name='Moving/FF&E',
-    x=['Stay (Renewal)', 'Go (Relocate)'],
-    y=[0, relocation_year1_moving],
-    marker_color='#ff7f0e'
-))
-
-fig_year1.add_trace(go.Bar(
-    name='Friction + Turnover',
-    x=['Stay (Renewal)', 'Go (Relocate)'],
-    y=[turnover_risk, relocation_year1_friction + relocation_year1_turnover],
-    marker_color='#d62728'
-))
-
-# FIX 1: Removed 'Opportunity Cost' bar (opportunity_cost_annual no longer exists)
-
-fig_year1.add_trace(go.Bar(
-    name='TI Allowance (Benefit)',
-    x=['Stay (Renewal)', 'Go (Relocate)'],
-    y=[-renewal_year1_ti, -relocation_year1_ti],
-    marker_color='#2ca02c'
-))
-
-fig_year1.add_trace(go.Bar(
-    name='Strategic Benefits',
-    x=['Stay (Renewal)', 'Go (Relocate)'],
-    y=[0, -relocation_year1_benefits],
-    marker_color='#17becf'
-))
-
-fig_year1.update_layout(
-    barmode='relative',
-    xaxis_title="Scenario",
-    yaxis_title="Year 1 Cash Outflow ($)",
-    height=500,
-    showlegend=True
-)
-
-fig_year1.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#e5e5e5')
+with perf_run.span('year1.build'):
+    fig_year1 = results['year1_figure']
 
-st.plotly_chart(fig_year1, use_container_width=True)
+show_figure('year1', fig_year1)
 
 st.markdown("---")
 
 # Detailed Table
+perf_run.section('comparison_table')
 st.subheader(f"📋 Detailed Year-by-Year Comparison ({lease_term} Years)")
 
-df_comparison = pd.DataFrame({
-    'Year': years,
-    'Stay - Annual': [f'${x:,.0f}' for x in renewal_costs],
-    'Stay - Cumulative': [f'${x:,.0f}' for x in renewal_cumulative],
-    'Go - Annual': [f'${x:,.0f}' for x in relocation_costs],
-    'Go - Cumulative': [f'${x:,.0f}' for x in relocation_cumulative],
-    'Annual Δ': [f'${(relocation_costs[i] - renewal_costs[i]):,.0f}' for i in range(lease_term)]
-})
+with perf_run.span('comparison_table.format'):
+    df_comparison = results['comparison_table']
+
+COMPARISON_COLUMNS = {
+    name: st.column_config.NumberColumn(format="dollar", step=1)
+    for name in ('Stay - Annual', 'Stay - Cumulative', 'Go - Annual', 'Go - Cumulative', 'Annual Δ')
+}
+
+show_table('comparison_table', df_comparison, use_container_width=True, hide_index=True,
+           column_config=COMPARISON_COLUMNS)
+
+# Multi-Site Comparison
+import multi_site
 
-st.dataframe(df_comparison, use_container_width=True, hide_index=True)
+SITE_COLORS = ['#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+
+def build_site_trace(row, color):
+    """One candidate's cumulative Go line - cached per site so unchanged sites are reused"""
+    return go.Scatter(
+        x=years,
+        y=row['relocation_cumulative'][:lease_term],
+        name=row['site'],
+        mode='lines',
+        line=dict(color=color, width=2)
+    )
+
+
+@st.fragment
+def multi_site_section():
+    """Site table edits rerun only this section"""
+    st.markdown("---")
+    st.subheader("🏙️ Multi-Site Comparison",
+                help="Rank candidate buildings against the renewal. Each site overrides the Go rent, free rent, TI, square footage, moving cost and commute time saved; everything else comes from the sidebar.")
+
+    if 'site_table' not in st.session_state:
+        st.session_state.site_table = pd.DataFrame({
+            'site': ["Sidebar Go", "Building B", "Building C"],
+            'new_base_rent': [new_base_rent, new_base_rent + 2.0, new_base_rent - 2.0],
+            'new_free_rent': [new_free_rent, new_free_rent + 3, max(0, new_free_rent - 3)],
+            'new_ti': [new_ti, new_ti - 20.0, new_ti],
+            'target_sf': [target_sf, target_sf, target_sf],
+            'moving_costs_psf': [moving_costs_psf, moving_costs_psf, moving_costs_psf + 5.0],
+            'commute_time_saved': [commute_time_saved, 0, 0],
+        })
+
+    site_upload = st.file_uploader("Upload Site Table (CSV)", type=['csv'],
+                                   help=f"Columns: {', '.join(multi_site.SITE_COLUMNS)}")
+    if site_upload is not None:
+        site_source = pd.read_csv(site_upload)
+        site_editor_key = f"site_editor_{site_upload.name}_{site_upload.size}"
+    else:
+        site_source = st.session_state.site_table
+        site_editor_key = "site_editor"
+
+    sites = st.data_editor(
+        site_source,
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key=site_editor_key,
+        column_config={
+            'site': st.column_config.TextColumn("Site", required=True),
+            'new_base_rent': st.column_config.NumberColumn("Base Rent ($/PSF)", min_value=0.0, format="$%.2f"),
+            'new_free_rent': st.column_config.NumberColumn("Free Rent (Months)", min_value=0, max_value=max_free_rent),
+            'new_ti': st.column_config.NumberColumn("TI ($/PSF)", min_value=0.0, format="$%.2f"),
+            'target_sf': st.column_config.NumberColumn("Square Feet", min_value=1000, step=1000),
+            'moving_costs_psf': st.column_config.NumberColumn("Moving ($/PSF)", min_value=0.0, format="$%.2f"),
+            'commute_time_saved': st.column_config.NumberColumn("Commute Saved (Min/Day)", min_value=0),
+        }
+    )
+
+    try:
+        site_engine = monthly_engine.evaluate_monthly if monthly_mode else lease_engine.evaluate_scenarios
+        with perf_run.span('multi_site.price'):
+            priced_sites = multi_site.evaluate_sites(scenario_inputs, sites, cache=section_cache, evaluate=site_engine)
+    except ValueError as e:
+        st.error(f"Site table error: {e}")
+        priced_sites = []
+
+    if priced_sites:
+        show_table(
+            'site_ranking',
+            multi_site.ranking_table(priced_sites),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'NPV Savings': st.column_config.NumberColumn(format="dollar", step=1),
+                'Upfront Investment': st.column_config.NumberColumn(format="dollar", step=1),
+                'Go NER ($/PSF/yr)': st.column_config.NumberColumn(format="dollar", step=0.01),
+            }
+        )
+
+        fig_sites = go.Figure()
+        fig_sites.add_trace(go.Scatter(
+            x=years,
+            y=renewal_cumulative,
+            name="Stay (Renewal)",
+            mode='lines',
+            line=dict(color='#1f77b4', width=4)
+        ))
+        for i, row in enumerate(priced_sites):
+            color = SITE_COLORS[i % len(SITE_COLORS)]
+            fig_sites.add_trace(section_cache.get_or_compute(
+                result_cache.input_key('site_trace', [row['key'], row['site'], color, lease_term]),
+                lambda: build_site_trace(row, color)))
+        fig_sites.update_layout(
+            xaxis_title="Year",
+            yaxis_title="Cumulative Cost ($)",
+            hovermode='x unified',
+            height=500,
+            showlegend=True
+        )
+        show_figure('site_comparison', payloads.compact_figure(fig_sites, {'y': 0}))
+
+
+perf_run.section('multi_site')
+multi_site_section()
+
+# Sensitivity Analysis
+import sensitivity
+
+SENSITIVITY_LABELS = {
+    'discount_rate': "Discount Rate (%)",
+    'escalation_rate': "Annual Rent Escalation (%)",
+    'current_sf': "Current Square Footage",
+    'target_sf': "Target Square Footage",
+    'renewal_base_rent': "Renewal Base Rent ($/PSF)",
+    'renewal_free_rent': "Renewal Free Rent (Months)",
+    'renewal_ti': "Renewal TI Allowance ($/PSF)",
+    'new_base_rent': "New Base Rent ($/PSF)",
+    'new_free_rent': "New Free Rent (Months)",
+    'new_ti': "New TI Allowance ($/PSF)",
+    'moving_costs_psf': "Moving/FF&E Costs ($/PSF)",
+    'productivity_loss_hours': "Productivity Loss (Hours)",
+    'headcount': "Headcount",
+    'avg_salary': "Average Salary ($)",
+    'daily_revenue_loss': "Daily Revenue/Production Value ($)",
+    'machinery_rigging': "Machinery Rigging & Electrical ($/SF)",
+    'attrition_rate': "Estimated Attrition Rate (%)",
+    'open_roles_per_year': "Open Roles Per Year",
+    'revenue_per_employee': "Revenue Per Employee ($)",
+    'hiring_speed_boost': "Hiring Speed Boost (Days)",
+    'commute_time_saved': "Avg Commute Time Saved (Min/Day)",
+}
+OFFICE_ONLY_INPUTS = ('productivity_loss_hours', 'headcount', 'avg_salary', 'attrition_rate',
+                      'open_roles_per_year', 'revenue_per_employee', 'hiring_speed_boost', 'commute_time_saved')
+INDUSTRIAL_ONLY_INPUTS = ('daily_revenue_loss', 'machinery_rigging')
+
+
+@st.cache_data(show_spinner="Computing sensitivity grid...", max_entries=16)
+def compute_npv_grid(base_inputs, x_name, x_range, y_name, y_range, resolution, monthly):
+    """Cached heat map grid - changing only the colour scale reuses it"""
+    x_values = np.linspace(x_range[0], x_range[1], resolution)
+    y_values = np.linspace(y_range[0], y_range[1], resolution)
+    evaluate = monthly_engine.evaluate_monthly if monthly else lease_engine.evaluate_scenarios
+    return x_values, y_values, sensitivity.npv_grid(base_inputs, x_name, x_values, y_name, y_values, evaluate=evaluate)
+
+
+@st.cache_data(max_entries=16)
+def compute_tornado(base_inputs, names, pct, monthly):
+    """Cached tornado shocks"""
+    evaluate = monthly_engine.evaluate_monthly if monthly else lease_engine.evaluate_scenarios
+    return sensitivity.tornado(base_inputs, list(names), pct, evaluate=evaluate)
+
+
+@st.fragment
+def sensitivity_section():
+    """Heat map and tornado widgets rerun only this section"""
+    st.markdown("---")
+    st.subheader("🔬 Sensitivity Analysis",
+                help="How NPV savings respond to changes in the inputs, holding everything else at the sidebar values.")
+
+    excluded_inputs = INDUSTRIAL_ONLY_INPUTS if not industrial_mode else OFFICE_ONLY_INPUTS
+    sensitivity_inputs = [name for name in sensitivity.SENSITIVITY_INPUTS if name not in excluded_inputs]
+
+    tab_heatmap, tab_tornado = st.tabs(["Heat Map", "Tornado"])
+
+    with tab_heatmap:
+        col1, col2 = st.columns(2)
+        with col1:
+            heatmap_x = st.selectbox("X Axis", sensitivity_inputs, index=sensitivity_inputs.index('new_base_rent'),
+                                     format_func=SENSITIVITY_LABELS.get)
+            x_base = float(scenario_inputs[heatmap_x])
+            x_min = st.number_input("X Min", value=x_base * 0.5, key=f"heatmap_x_min_{heatmap_x}")
+            x_max = st.number_input("X Max", value=x_base * 1.5 if x_base else 10.0, key=f"heatmap_x_max_{heatmap_x}")
+        with col2:
+            heatmap_y = st.selectbox("Y Axis", sensitivity_inputs, index=sensitivity_inputs.index('discount_rate'),
+                                     format_func=SENSITIVITY_LABELS.get)
+            y_base = float(scenario_inputs[heatmap_y])
+            y_min = st.number_input("Y Min", value=y_base * 0.5, key=f"heatmap_y_min_{heatmap_y}")
+            y_max = st.number_input("Y Max", value=y_base * 1.5 if y_base else 10.0, key=f"heatmap_y_max_{heatmap_y}")
+
+        col1, col2 = st.columns(2)
+        heatmap_resolution = col1.slider("Grid Resolution", min_value=10, max_value=500, value=100, step=10)
+        heatmap_colorscale = col2.selectbox("Colour Scale", ["RdYlGn", "RdBu", "Viridis", "Cividis"])
+
+        if heatmap_x == heatmap_y:
+            st.warning("Choose two different inputs for the heat map axes.")
+        elif x_min >= x_max or y_min >= y_max:
+            st.warning("Each axis needs Min below Max.")
+        else:
+            with perf_run.span('heatmap.grid'):
+                x_values, y_values, npv_surface = compute_npv_grid(
+                    scenario_inputs, heatmap_x, (x_min, x_max), heatmap_y, (y_min, y_max), heatmap_resolution,
+                    monthly_mode)
+
+            fig_heatmap = go.Figure(go.Heatmap(
+                x=x_values,
+                y=y_values,
+                z=npv_surface,
+                colorscale=heatmap_colorscale,
+                zmid=0,
+                colorbar=dict(title="NPV Savings ($)"),
+                hovertemplate="X: %{x:,.2f}<br>Y: %{y:,.2f}<br>NPV Savings: $%{z:,.0f}<extra></extra>"
+            ))
+            fig_heatmap.add_trace(go.Scatter(
+                x=[x_base],
+                y=[y_base],
+                mode='markers',
+                name='Current Inputs',
+                marker=dict(size=12, color='black', symbol='x')
+            ))
+            fig_heatmap.update_layout(
+                xaxis_title=SENSITIVITY_LABELS[heatmap_x],
+                yaxis_title=SENSITIVITY_LABELS[heatmap_y],
+                height=550,
+                showlegend=False
+            )
+            show_figure('heatmap', payloads.compact_figure(fig_heatmap, {'z': 0}))
+
+    with tab_tornado:
+        tornado_pct = st.slider("Shock Size (±%)", min_value=1, max_value=50, value=10, step=1)
+        with perf_run.span('tornado.shocks'):
+            tornado_rows = compute_tornado(scenario_inputs, tuple(sensitivity_inputs), tornado_pct, monthly_mode)
+
+        if not tornado_rows:
+            st.info("All inputs are zero - nothing to shock.")
+        else:
+            # Largest swing at the top
+            tornado_rows = tornado_rows[::-1]
+            tornado_labels = [SENSITIVITY_LABELS[name] for name, _, _ in tornado_rows]
+
+            fig_tornado = go.Figure()
+            fig_tornado.add_trace(go.Bar(
+                name=f'-{tornado_pct}%',
+                y=tornado_labels,
+                x=[low - npv_savings for _, low, _ in tornado_rows],
+                base=npv_savings,
+                orientation='h',
+                marker_color='#d62728'
+            ))
+            fig_tornado.add_trace(go.Bar(
+                name=f'+{tornado_pct}%',
+                y=tornado_labels,
+                x=[high - npv_savings for _, _, high in tornado_rows],
+                base=npv_savings,
+                orientation='h',
+                marker_color='#2ca02c'
+            ))
+            fig_tornado.update_layout(
+                barmode='overlay',
+                xaxis_title="NPV Savings ($)",
+                height=max(400, 30 * len(tornado_rows)),
+                showlegend=True
+            )
+            fig_tornado.add_vline(x=npv_savings, line_color='rgb(63, 63, 63)')
+            show_figure('tornado', fig_tornado)
+
+
+perf_run.section('sensitivity')
+sensitivity_section()
+
+# Goal Seek
+import goal_seek
+
+@st.cache_data(max_entries=32)
+def compute_goal_seek(base_inputs, name, target, bracket, monthly):
+    """Cached indifference value for one input"""
+    evaluate = monthly_engine.evaluate_monthly if monthly else lease_engine.evaluate_scenarios
+    return goal_seek.solve_for_input(base_inputs, name, target=target, bracket=bracket, evaluate=evaluate)
+
+
+@st.fragment
+def goal_seek_section():
+    """Goal seek widgets rerun only this section"""
+    st.markdown("---")
+    st.subheader("🎯 Goal Seek",
+                help="Solves for the value of one input that makes the NPV of relocating hit a target, holding everything else at the sidebar values.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        solve_name = st.selectbox("Solve For", list(goal_seek.SOLVE_BRACKETS), format_func=SENSITIVITY_LABELS.get)
+    with col2:
+        solve_target = st.number_input("Target NPV Savings ($)", value=0, step=50000,
+                                       help="0 finds the break-even (NPV-neutral) value; e.g. 500,000 finds what it takes for Go to save $500k")
+
+    solve_bracket = goal_seek.SOLVE_BRACKETS[solve_name]
+    if solve_name in ('new_free_rent', 'renewal_free_rent'):
+        solve_bracket = (0.0, float(max_free_rent))
+    solution = compute_goal_seek(scenario_inputs, solve_name, float(solve_target), solve_bracket, monthly_mode)
+    solved_value = solution['value'][0]
+
+    if np.isnan(solved_value):
+        st.warning(f"No value of {SENSITIVITY_LABELS[solve_name]} between {solve_bracket[0]:,.0f} and "
+                   f"{solve_bracket[1]:,.0f} reaches ${solve_target:,.0f} of NPV savings.")
+    else:
+        col1, col2 = st.columns(2)
+        col1.metric(f"Required {SENSITIVITY_LABELS[solve_name]}", f"{solved_value:,.2f}",
+                    delta=f"{solved_value - float(scenario_inputs[solve_name]):+,.2f} vs. current",
+                    delta_color="off")
+        col2.metric("Current Value", f"{float(scenario_inputs[solve_name]):,.2f}")
+
+
+perf_run.section('goal_seek')
+goal_seek_section()
+
+# Monte Carlo Risk Analysis
+import monte_carlo
+
+@st.cache_data(show_spinner="Running Monte Carlo simulation...", max_entries=8)
+def run_risk_simulation(base_inputs, specs, n_draws, seed, workers, monthly):
+    """Cached Monte Carlo run - reruns with unchanged risk inputs reuse the draws"""
+    simulation = monte_carlo.run_simulation(base_inputs, specs, n_draws, seed=seed, workers=workers, monthly=monthly)
+    return simulation, monte_carlo.summarize_simulation(simulation)
+
+
+perf_run.section('monte_carlo')
+if simulation_mode:
+    st.markdown("---")
+    st.subheader("🎲 Monte Carlo Risk Analysis",
+                help="Each draw samples the uncertain inputs from their distributions and reprices the full Stay vs. Go comparison.")
+
+    if not distribution_specs:
+        st.info("Choose a distribution for at least one input under 🎲 Risk Simulation in the sidebar.")
+    else:
+        try:
+            simulation, simulation_summary = run_risk_simulation(
+                scenario_inputs, distribution_specs, simulation_draws, simulation_seed, simulation_workers, monthly_mode)
+        except ValueError as e:
+            st.error(f"Invalid distribution: {e}")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("P10 NPV Savings", f"${simulation_summary['npv_p10']:,.0f}",
+                        help="10% of draws save less than this")
+            col2.metric("P50 NPV Savings", f"${simulation_summary['npv_p50']:,.0f}")
+            col3.metric("P90 NPV Savings", f"${simulation_summary['npv_p90']:,.0f}",
+                        help="10% of draws save more than this")
+            col4.metric("Probability Go Wins", f"{simulation_summary['prob_go_wins']:.1%}",
+                        help="Share of draws where relocating has the lower NPV cost")
+
+            # Binned here so the browser gets one bar per quarter rather than every draw
+            fig_breakeven_hist = go.Figure(payloads.histogram_bars(
+                simulation['breakeven_month'],
+                start=0, end=lease_term * 12, size=3,
+                marker_color='#1f77b4'
+            ))
+            fig_breakeven_hist.update_layout(
+                title="Breakeven Month Distribution",
+                xaxis_title="Breakeven Month",
+                yaxis_title="Draws",
+                height=400,
+                showlegend=False
+            )
+            show_figure('breakeven_histogram', fig_breakeven_hist)
+            st.caption(f"{simulation_summary['draws']:,} draws · "
+                       f"{1 - simulation_summary['prob_breakeven']:.1%} never break even within the "
+                       f"{lease_term}-year term")
+
+# Write back the engine results this run evaluated - only those the sections read, so a
+# miss never forces the rest of the engine; a later run that reads more stores the superset
+perf_run.section('result_store')
+if store_missed or any(name in engine_keys for name in results.computed):
+    evaluated = {name: results.values[name] for name in engine_keys if name in results.values}
+    if evaluated:
+        store.put_results(stored_key, engine_name, evaluated)
+
+# Speculative precompute - sliders move in fixed steps, so once the page is drawn, price the
+# last-moved slider's neighbouring steps in the background; the next drag is then a cache hit
+perf_run.section('speculative')
+SLIDER_STEPS = {
+    'discount_rate': (0.0, 15.0, 0.5),
+    'escalation_rate': (0.0, 5.0, 0.25),
+}
+if not industrial_mode:
+    SLIDER_STEPS.update({
+        'productivity_loss_hours': (0, 80, 1),
+        'attrition_rate': (0.0, 50.0, 1.0),
+        'hiring_speed_boost': (0, 90, 5),
+        'commute_time_saved': (0, 120, 5),
+    })
+if precomputer is not None and results.changed:
+    moved = [name for name in results.changed if name in SLIDER_STEPS]
+    if len(moved) == 1:
+        # A single slider moved (not a scenario load or mode switch)
+        st.session_state.speculative_slider = moved[0]
+    slider = st.session_state.get('speculative_slider')
+    if 'speculative_session' not in st.session_state:
+        st.session_state.speculative_session = uuid.uuid4().hex
+    jobs = {}
+    if slider in SLIDER_STEPS:
+        graph = get_page_graph(monthly_mode)
+        for inputs in speculative.neighbours(scenario_inputs, slider, *SLIDER_STEPS[slider]):
+            jobs[scenario_store.result_key(engine_name, inputs)] = functools.partial(
+                speculative.warm, graph, inputs, section_cache, store, engine_name, engine_keys)
+    precomputer.submit(st.session_state.speculative_session, stored_key, jobs)
+
+# Close the timed sections and publish the rolling summary
+perf_run.finish()
+perf_recorder.record_cache('section_cache', section_cache.stats())
+if precomputer is not None:
+    perf_recorder.record_cache('speculative', precomputer.stats())
+perf_recorder.record_cache('discount_factors', lease_metrics.discount_factors.cache_info())
+if perf_active:
+    # Counts rows in SQLite and walks session_state, so only when profiling
+    perf_recorder.record_cache('scenario_store', store.stats())
+    session_bytes = perf.deep_size({key: value.values if isinstance(value, dependency_graph.Evaluator) else value
+                                    for key, value in st.session_state.items()})
+    perf_recorder.record_session_bytes(session_bytes)
+if PERF_EXPORT_PATH:
+    perf_recorder.export(PERF_EXPORT_PATH, min_interval=PERF_EXPORT_INTERVAL)
+
+if perf_debug:
+    with st.expander("⏱️ Performance", expanded=False):
+        st.markdown("**This rerun**")
+        st.dataframe(pd.DataFrame([(name, seconds * 1000) for name, seconds in perf_run.spans],
+                                  columns=['Span', 'Milliseconds']),
+                     use_container_width=True, hide_index=True,
+                     column_config={'Milliseconds': st.column_config.NumberColumn(format="%.2f")})
+
+        st.caption(f"Inputs changed: {', '.join(sorted(results.changed)) or 'none'} · "
+                   f"Nodes recomputed: {', '.join(results.computed) or 'none'}")
+
+        perf_summary = perf_recorder.summary()
+        st.markdown(f"**Rolling window** · {perf_summary['reruns']:,} reruns in this process")
+        st.dataframe(pd.DataFrame.from_dict(perf_summary['sections'], orient='index'),
+                     use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**Cache hit ratios**")
+            st.dataframe(pd.DataFrame.from_dict(perf_summary['caches'], orient='index')[['hits', 'misses', 'hit_ratio']],
+                         use_container_width=True)
+        with col2:
+            st.markdown("**Payload sizes (bytes)**")
+            st.dataframe(pd.Series(perf_summary['payload_bytes'], name='Bytes', dtype='int64'),
+                         use_container_width=True)
+            bytes_per_rerun = perf_summary['bytes_per_rerun']
+            st.caption(f"Sent this rerun: {sum(perf_run.payloads.values()):,} bytes · "
+                       f"p50 {bytes_per_rerun['p50']:,} · p95 {bytes_per_rerun['p95']:,} per rerun")
+            st.caption(f"Session memory: {session_bytes:,} bytes (session state and its figures) · "
+                       f"p50 {perf_summary['session_bytes']['p50']:,} per session")
+
+        st.download_button("Download Prometheus Metrics", perf_recorder.to_prometheus(),
+                           file_name="hhi_perf.prom", mime="text/plain")
 
 # HHI Team Contact Footer
 st.markdown("""
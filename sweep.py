@@ -0,0 +1,429 @@
+"""
+Out-of-core parameter sweeps over the full Cartesian grid of several inputs.
+
+A market study sweeps 5-6 inputs at once (rent, free months, TI, discount rate,
+escalation, target SF), which makes hundreds of millions of scenarios. That is
+more than fits in memory. A sweep lives in a directory:
+
+    sweep.json              the axes, base inputs and chunking
+    npv_savings.npy         one float32 per grid point, in C order over the axes
+    breakeven_month.npy     float32, NaN where Go never breaks even
+    done.npy                one flag per chunk
+
+The grid is cut into chunks of consecutive grid points. Worker processes open
+the result files as memory maps, price their chunk through
+the scenario graph and write it in place, so only chunk numbers
+travel back to the parent. A chunk is flagged done only after its results are
+flushed. After an interruption, running the sweep again prices just the chunks
+that aren't flagged.
+
+Sweep answers queries slab by slab through the memory maps, without loading a
+whole result array: the share of the grid where Go wins, means and marginals
+along one axis, and slices with some axes held fixed. Queries on an unfinished
+sweep cover the finished chunks only.
+
+Usage:
+    python sweep.py run study/ --axis new_base_rent=20:45:0.25 --axis new_free_rent=0:24:1 \\
+        --axis new_ti=0:100:2.5 --axis discount_rate=5:10:0.5 --axis escalation_rate=2:4:0.25 \\
+        --axis target_sf=10000:50000:1000 --set lease_term=10 --workers 8
+    python sweep.py query study/ --by new_base_rent --fix discount_rate=7
+    python sweep.py query study/ --stat mean --field breakeven_month --by new_free_rent
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import lease_engine
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Elements read per step of a query (32 MB of float64 working set)
+QUERY_BLOCK = 4_000_000
+
+FIELDS = ('npv_savings', 'breakeven_month')
+STATS = ('go_wins', 'breaks_even', 'mean')
+
+MANIFEST = 'sweep.json'
+DONE = 'done.npy'
+
+# Anything but the mode toggle can be an axis; set the mode with base inputs
+SWEEP_INPUTS = tuple(name for name in lease_engine.SCENARIO_FIELDS if name != 'industrial_mode')
+
+
+def parse_axis(text):
+    """'name=start:stop:step' (stop included) or 'name=v1,v2,...' -> (name, values)"""
+    name, _, spec = text.partition('=')
+    name = name.strip()
+    if name not in SWEEP_INPUTS:
+        raise ValueError(f"{name} cannot be swept; choose from {', '.join(SWEEP_INPUTS)}")
+    try:
+        if ':' in spec:
+            start, stop, step = (float(v) for v in spec.split(':'))
+            if step <= 0 or stop < start:
+                raise ValueError
+            n = int(math.floor((stop - start) / step + 1e-9)) + 1
+            values = np.round(start + step * np.arange(n), 10)
+        else:
+            values = np.array([float(v) for v in spec.split(',')])
+    except ValueError:
+        raise ValueError(f"Bad axis '{text}' - use name=start:stop:step or name=v1,v2,...") from None
+    if len(values) == 0 or len(np.unique(values)) != len(values):
+        raise ValueError(f"Axis {name} needs distinct values")
+    return name, values
+
+
+def _manifest_spec(axes, base_inputs, chunk_size):
+    return {
+        'axes': {name: [float(v) for v in values] for name, values in axes.items()},
+        'base_inputs': {name: (value.item() if isinstance(value, np.generic) else value)
+                        for name, value in sorted(base_inputs.items())},
+        'chunk_size': int(chunk_size),
+        'fields': list(FIELDS),
+    }
+
+
+def create_sweep(path, axes, base_inputs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Set up (or reopen, to resume) a sweep directory for the grid over axes, a dict of
+    name -> 1-D values. Other inputs come from base_inputs, then the sidebar defaults.
+    Returns the Sweep. A directory holding a different sweep raises ValueError.
+    """
+    base_inputs = dict(base_inputs or {})
+    if not axes:
+        raise ValueError("A sweep needs at least one axis")
+    for name in list(axes) + list(base_inputs):
+        if name not in lease_engine.SCENARIO_DEFAULTS:
+            raise ValueError(f"Unknown scenario input {name}")
+    overlap = set(axes) & set(base_inputs)
+    if overlap:
+        raise ValueError(f"{', '.join(sorted(overlap))} is both an axis and a base input")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    spec = _manifest_spec(axes, base_inputs, chunk_size)
+    manifest_path = os.path.join(path, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            existing = json.load(f)
+        if {k: existing[k] for k in spec} != spec:
+            raise ValueError(f"{path} holds a different sweep - pick a new directory to start another")
+        return Sweep(path, mode='r+')
+
+    os.makedirs(path, exist_ok=True)
+    size = math.prod(len(values) for values in axes.values())
+    n_chunks = -(-size // chunk_size)
+    for field in FIELDS:
+        np.lib.format.open_memmap(os.path.join(path, f'{field}.npy'), mode='w+', dtype=np.float32,
+                                  shape=(size,)).flush()
+    np.lib.format.open_memmap(os.path.join(path, DONE), mode='w+', dtype=np.uint8, shape=(n_chunks,)).flush()
+    # Manifest last, so a directory without one never looks like a sweep
+    spec.update(size=size, n_chunks=n_chunks, created_at=time.time())
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(spec, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return Sweep(path, mode='r+')
+
+
+class Sweep:
+    """An on-disk sweep: the grid, memory-mapped results and per-chunk progress"""
+
+    def __init__(self, path, mode='r'):
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        self.path = path
+        self.axes = {name: np.array(values) for name, values in manifest['axes'].items()}
+        self.base_inputs = manifest['base_inputs']
+        self.chunk_size = manifest['chunk_size']
+        self.shape = tuple(len(values) for values in self.axes.values())
+        self.size = manifest['size']
+        self.n_chunks = manifest['n_chunks']
+        self.results = {field: np.load(os.path.join(path, f'{field}.npy'), mmap_mode=mode) for field in FIELDS}
+        self.done = np.load(os.path.join(path, DONE), mmap_mode=mode)
+
+    @property
+    def progress(self):
+        """Share of chunks finished"""
+        return float(np.count_nonzero(self.done)) / self.n_chunks
+
+    def pending(self):
+        """Chunk numbers not yet priced"""
+        return np.flatnonzero(self.done == 0).tolist()
+
+    def chunk_inputs(self, chunk):
+        """Engine inputs for every grid point of one chunk"""
+        start = chunk * self.chunk_size
+        stop = min(start + self.chunk_size, self.size)
+        indices = np.unravel_index(np.arange(start, stop), self.shape)
+        inputs = dict(self.base_inputs)
+        for (name, values), index in zip(self.axes.items(), indices):
+            inputs[name] = values[index]
+        return inputs
+
+    def price_chunk(self, chunk):
+        """Price one chunk, write it through the memory maps and flag it done"""
+        start = chunk * self.chunk_size
+        # Only the swept fields: skips the (N, term) cash-flow matrices evaluate_scenarios builds
+        batch = lease_engine.broadcast_inputs(self.chunk_inputs(chunk))
+        results = lease_engine.SCENARIO_GRAPH.evaluate(batch, FIELDS)
+        for field in FIELDS:
+            out = self.results[field]
+            out[start:start + len(results[field])] = results[field]
+            out.flush()
+        self.done[chunk] = 1
+        self.done.flush()
+
+    def axis_index(self, name, value):
+        """Position of value on axis name"""
+        if name not in self.axes:
+            raise ValueError(f"{name} is not an axis of this sweep ({', '.join(self.axes)})")
+        matches = np.flatnonzero(np.isclose(self.axes[name], float(value), rtol=1e-9, atol=1e-9))
+        if len(matches) == 0:
+            raise ValueError(f"{value} is not on the {name} axis")
+        return int(matches[0])
+
+    def slice(self, field='npv_savings', **fixed):
+        """Results over the axes not fixed, e.g. a 2-D rent x free-rent table at one discount rate"""
+        grid = self.results[field].reshape(self.shape)
+        key = tuple(self.axis_index(name, fixed[name]) if name in fixed else slice(None) for name in self.axes)
+        self._check_fixed(fixed)
+        values = np.array(grid[key], dtype=np.float64)
+        if self.progress < 1:
+            values[~self._done_mask(key)] = np.nan
+        return values
+
+    def aggregate(self, stat='go_wins', field='npv_savings', by=None, **fixed):
+        """
+        One statistic over the grid (restricted to the fixed axis values), or per value of axis by.
+
+        stat 'go_wins' is the share of scenarios with positive NPV savings, 'breaks_even' the
+        share where Go breaks even, and 'mean' the mean of field (ignoring never-breakeven NaNs).
+        Returns a float, or (axis values, per-value array) with by. Points in unfinished chunks
+        are left out; NaN means no finished points.
+        """
+        if stat not in STATS:
+            raise ValueError(f"stat must be one of {', '.join(STATS)}")
+        if field not in FIELDS:
+            raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+        self._check_fixed(fixed)
+        if by is not None and (by not in self.axes or by in fixed):
+            raise ValueError(f"by must be an axis that isn't fixed ({', '.join(self.axes)})")
+
+        key = tuple(self.axis_index(name, fixed[name]) if name in fixed else slice(None) for name in self.axes)
+        free = [name for name in self.axes if name not in fixed]
+        target = free.index(by) if by is not None else None
+        buckets = len(self.axes[by]) if by is not None else 1
+        numerator = np.zeros(buckets)
+        denominator = np.zeros(buckets)
+        source = 'npv_savings' if stat == 'go_wins' else 'breakeven_month' if stat == 'breaks_even' else field
+        view = self.results[source].reshape(self.shape)[key]
+        complete = self.progress == 1
+
+        for lead, block in _slabs(view, QUERY_BLOCK):
+            values = np.asarray(block, dtype=np.float64)
+            valid = np.ones(values.shape, dtype=bool) if complete else self._done_mask(key, lead, values.shape)
+            if stat == 'go_wins':
+                hits = valid & (values > 0)
+            elif stat == 'breaks_even':
+                hits = valid & ~np.isnan(values)
+            else:
+                valid &= ~np.isnan(values)
+                hits = np.where(valid, values, 0.0)
+            if target is None:
+                numerator[0] += hits.sum()
+                denominator[0] += valid.sum()
+            elif target < len(lead):
+                numerator[lead[target]] += hits.sum()
+                denominator[lead[target]] += valid.sum()
+            else:
+                others = tuple(i for i in range(values.ndim) if i != target - len(lead))
+                numerator += hits.sum(axis=others)
+                denominator += valid.sum(axis=others)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = numerator / denominator
+        if by is None:
+            return float(result[0])
+        return self.axes[by], result
+
+    def summary(self):
+        """Grid size, progress, share of Go wins and breakevens, and the NPV savings range"""
+        mean = self.aggregate('mean')
+        return {
+            'axes': {name: (float(values[0]), float(values[-1]), len(values)) for name, values in self.axes.items()},
+            'scenarios': self.size,
+            'progress': self.progress,
+            'go_wins': self.aggregate('go_wins'),
+            'breaks_even': self.aggregate('breaks_even'),
+            'npv_savings_mean': mean,
+        }
+
+    def _check_fixed(self, fixed):
+        for name in fixed:
+            if name not in self.axes:
+                raise ValueError(f"{name} is not an axis of this sweep ({', '.join(self.axes)})")
+
+    def _done_mask(self, key, lead=(), shape=None):
+        """Which points of grid[key][lead] lie in finished chunks"""
+        strides = [math.prod(self.shape[i + 1:]) for i in range(len(self.shape))]
+        offset = 0
+        ranges = []
+        lead = list(lead)
+        for axis, k in enumerate(key):
+            if isinstance(k, int):
+                offset += k * strides[axis]
+            elif lead:
+                offset += lead.pop(0) * strides[axis]
+            else:
+                ranges.append(np.arange(self.shape[axis]) * strides[axis])
+        flat = np.full((), offset, dtype=np.int64)
+        for i, r in enumerate(ranges):
+            flat = flat[..., None] + r.reshape((1,) * i + (-1,))
+        mask = self.done[flat // self.chunk_size].astype(bool)
+        return mask if shape is None else mask.reshape(shape)
+
+
+def _slabs(view, max_elements):
+    """Yield (leading index tuple, sub-array) pieces of view with at most max_elements each"""
+    lead_dims = 0
+    while lead_dims < view.ndim and math.prod(view.shape[lead_dims:]) > max_elements:
+        lead_dims += 1
+    for lead in np.ndindex(*view.shape[:lead_dims]):
+        yield lead, view[lead]
+
+
+# Each worker process keeps its sweep open across chunks
+_open_sweeps = {}
+
+
+def price_chunk(path, chunk):
+    """Worker entry point: price one chunk of the sweep at path; returns (chunk, seconds)"""
+    start = time.perf_counter()
+    if path not in _open_sweeps:
+        _open_sweeps[path] = Sweep(path, mode='r+')
+    _open_sweeps[path].price_chunk(chunk)
+    return chunk, time.perf_counter() - start
+
+
+def run_sweep(path, workers=1, on_progress=None):
+    """
+    Price every pending chunk of the sweep at path. workers > 1 uses a process pool.
+    on_progress(done, total) is called as chunks finish. Returns (scenarios priced, seconds).
+    """
+    sweep = Sweep(path, mode='r')
+    pending = sweep.pending()
+    start = time.perf_counter()
+    finished = sweep.n_chunks - len(pending)
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(price_chunk, path, chunk) for chunk in pending]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    finished += 1
+                    if on_progress:
+                        on_progress(finished, sweep.n_chunks)
+            except BaseException:
+                # Interrupted: drop queued chunks; running ones finish and are flagged
+                for future in futures:
+                    future.cancel()
+                raise
+    else:
+        for chunk in pending:
+            price_chunk(path, chunk)
+            finished += 1
+            if on_progress:
+                on_progress(finished, sweep.n_chunks)
+    priced = sum(min(sweep.chunk_size, sweep.size - chunk * sweep.chunk_size) for chunk in pending)
+    return priced, time.perf_counter() - start
+
+
+def _parse_assignments(items, flag):
+    values = {}
+    for item in items:
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"{flag} takes name=value, got '{item}'")
+        values[name.strip()] = float(value)
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Out-of-core Stay vs. Go parameter sweeps")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Create or resume a sweep")
+    run.add_argument('path', help="Sweep directory")
+    run.add_argument('--axis', action='append', default=[], metavar='NAME=START:STOP:STEP',
+                     help="Swept input, stop included (or NAME=V1,V2,...); repeat for each axis")
+    run.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                     help="Fixed input for every scenario (others use the sidebar defaults)")
+    run.add_argument('--industrial', action='store_true', help="Price in industrial mode")
+    run.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                     help=f"Scenarios per chunk (default {DEFAULT_CHUNK_SIZE:,})")
+    run.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                     help="Worker processes (default: one per CPU)")
+
+    query = commands.add_parser('query', help="Summarize a sweep, or one statistic overall or by axis")
+    query.add_argument('path', help="Sweep directory")
+    query.add_argument('--stat', choices=STATS, help="Statistic (default: a summary of the whole sweep)")
+    query.add_argument('--field', choices=FIELDS, default='npv_savings', help="Field for --stat mean")
+    query.add_argument('--by', help="Report the statistic per value of this axis")
+    query.add_argument('--fix', action='append', default=[], metavar='NAME=VALUE',
+                       help="Restrict to one value of an axis; repeatable")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'run':
+            if args.chunk_size < 1 or args.workers < 1:
+                parser.error("--chunk-size and --workers must be positive")
+            axes = dict(parse_axis(text) for text in args.axis)
+            base_inputs = _parse_assignments(args.set, '--set')
+            if args.industrial:
+                base_inputs['industrial_mode'] = True
+            sweep = create_sweep(args.path, axes, base_inputs, args.chunk_size)
+            if sweep.progress:
+                print(f"Resuming: {sweep.progress:.1%} of {sweep.size:,} scenarios already priced")
+
+            def report(done, total):
+                if done == total or done % max(1, total // 20) == 0:
+                    print(f"  {done:,}/{total:,} chunks", flush=True)
+
+            scenarios, seconds = run_sweep(args.path, args.workers, report)
+            rate = scenarios / seconds if seconds > 0 else float('inf')
+            print(f"Priced {scenarios:,} scenarios in {seconds:.2f}s ({rate:,.0f}/s) -> {args.path}")
+            return 0
+
+        sweep = Sweep(args.path)
+        fixed = _parse_assignments(args.fix, '--fix')
+        if args.stat is None and not args.by and not fixed:
+            print(json.dumps(sweep.summary(), indent=2))
+            return 0
+        stat = args.stat or 'go_wins'
+        result = sweep.aggregate(stat, args.field, args.by, **fixed)
+        label = f"{stat}({args.field})" if stat == 'mean' else stat
+        if args.by:
+            print(f"{args.by:>20}  {label}")
+            for value, share in zip(*result):
+                print(f"{value:>20g}  {share:.6g}")
+        else:
+            print(f"{label}: {result:.6g}")
+        if sweep.progress < 1:
+            print(f"(over the {sweep.progress:.1%} of chunks finished so far)")
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("Interrupted - run the same command again to resume", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())